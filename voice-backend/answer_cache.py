@@ -0,0 +1,326 @@
+"""
+Semantic Answer Cache
+Students studying the same material ask the same questions in different
+words. Answers (text + synthesized audio) are cached per material and served
+for any sufficiently similar question, skipping RAG, LLM and TTS entirely.
+
+Questions are embedded as L2-normalized sparse vectors of hashed word
+unigrams/bigrams, so lookup is a handful of dict operations per cached entry
+and needs no model or extra dependency. It matches rephrasings that share
+most of their words ("what does chlorophyll do in plants" / "okay what does
+the chlorophyll do in a plant"), not ones worded entirely differently. The
+nearest question above the similarity threshold is a hit unless the two
+differ in numbers ("chapter 3" vs "chapter 4") or named entities ("Mendel"
+vs "Darwin"). Only full-length answers are stored: answers generated while
+the node sheds load are too brief to serve to later sessions. Entries are
+evicted LRU (by count and audio bytes) and dropped when the material's
+version changes.
+
+With a shared store (multi-worker deployments) answer text and audio live
+once in shared memory; each worker only indexes the question vectors and
+picks up answers generated by other workers for the same material version.
+"""
+
+import logging
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from shared_store import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9']+")
+_TOKEN = re.compile(r"[A-Za-z0-9']+")
+FILLERS = {"um", "uh", "er", "hmm", "hey", "alex", "so", "okay", "ok", "well", "like", "please", "just"}
+# Function words carry little meaning; content words dominate similarity
+STOPWORDS = {"what", "how", "why", "where", "when", "who", "which", "is", "are", "was", "were", "do", "does",
+             "did", "the", "a", "an", "in", "on", "of", "to", "and", "or", "for", "with", "about", "can",
+             "could", "you", "me", "i", "my", "explain", "tell", "exactly", "mean", "means"}
+# References to earlier turns make an answer depend on conversation history
+REFERENCES = {"it", "that", "this", "these", "those", "they", "them", "he", "she", "again", "previous", "above"}
+
+
+def normalize_question(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in FILLERS]
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def _numbers(words: List[str]) -> List[str]:
+    return [word for word in words if word.isdigit()]
+
+
+def named_entities(question: str) -> Set[str]:
+    """
+    Capitalized words after the first (names, places) and acronyms such as "DNA", lowercased
+    """
+    tokens = _TOKEN.findall(question)
+    return {token.lower() for index, token in enumerate(tokens)
+            if (token.isupper() and len(token) > 1) or (index > 0 and token[0].isupper() and token != "I")}
+
+
+class HashingEmbedder:
+    """
+    Sparse bag-of-words embedding (unigrams + bigrams, hashed into `dim` buckets).
+    Stopwords get `stopword_weight` so two questions differing in one content
+    word stay below the similarity threshold.
+    """
+
+    def __init__(self, dim: int = 1 << 18, stopword_weight: float = 0.25):
+        self.dim = dim
+        self.stopword_weight = stopword_weight
+
+    def _bucket(self, feature: str) -> int:
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(feature.encode("utf-8")) % self.dim
+
+    def embed(self, words: List[str]) -> Dict[int, float]:
+        stems = [_stem(word) for word in words]
+        vector: Dict[int, float] = {}
+        weights = [self.stopword_weight if word in STOPWORDS else 1.0 for word in words]
+        for stem, weight in zip(stems, weights):
+            bucket = self._bucket(stem)
+            vector[bucket] = vector.get(bucket, 0.0) + weight
+        for index in range(len(stems) - 1):
+            bucket = self._bucket(f"{stems[index]} {stems[index + 1]}")
+            vector[bucket] = vector.get(bucket, 0.0) + 0.5 * min(weights[index], weights[index + 1])
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {bucket: weight / norm for bucket, weight in vector.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+class CachedAnswer:
+    __slots__ = ("material_id", "version", "key", "question", "vector", "numbers", "text", "audio",
+                 "size", "generation_seconds", "hits")
+
+    def __init__(self, material_id: str, version: str, key: str, question: str, vector: Dict[int, float],
+                 text: str, audio: List[str], generation_seconds: float):
+        self.material_id = material_id
+        self.version = version
+        self.key = key
+        self.question = question
+        self.vector = vector
+        self.numbers = _numbers(key.split())
+        self.text = text
+        self.audio = audio  # base64 packets, ready to send
+        self.size = len(text) + sum(len(packet) for packet in audio)
+        self.generation_seconds = generation_seconds
+        self.hits = 0
+
+
+class AnswerCache:
+    """
+    Per-material semantic Q&A cache with LRU eviction and hit/latency metrics
+    """
+
+    def __init__(self, threshold: float = 0.87, min_words: int = 3, max_entries: int = 2000,
+                 max_bytes: int = 64 * 1024 * 1024, max_entries_per_material: int = 256,
+                 embedder: Optional[HashingEmbedder] = None, shared: Optional[SharedStore] = None,
+                 shared_ttl: float = 24 * 3600.0, sync_interval: float = 1.0):
+        self.threshold = threshold
+        self.min_words = min_words
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entries_per_material = max_entries_per_material
+        self.embedder = embedder or HashingEmbedder()
+        self._lru: "OrderedDict[Tuple[str, str], CachedAnswer]" = OrderedDict()
+        self._materials: Dict[str, Dict[str, CachedAnswer]] = {}
+        self.bytes = 0
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "skipped": 0, "skipped_brief": 0,
+                         "stores": 0, "evictions": 0}
+        self.latency_saved = 0.0
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.sync_interval = sync_interval
+        self._synced: Dict[Tuple[str, str], float] = {}
+
+    def cacheable(self, material_id: Optional[str], question: str) -> Optional[List[str]]:
+        """
+        Normalized words if the question can use the cache, else None
+        """
+        if not material_id:
+            return None
+        words = normalize_question(question)
+        if len(words) < self.min_words or REFERENCES.intersection(words):
+            return None
+        return words
+
+    async def lookup(self, material_id: Optional[str], version: str, question: str) -> Optional[CachedAnswer]:
+        words = self.cacheable(material_id, question)
+        if words is None:
+            if material_id:
+                self.counters["skipped"] += 1
+            return None
+        self.counters["lookups"] += 1
+        if self.shared:
+            await self._sync(material_id, version)
+        entries = self._materials.get(material_id, {})
+
+        key = " ".join(words)
+        best = entries.get(key)
+        score = 1.0 if best else 0.0
+        if best is None and entries:
+            vector = self.embedder.embed(words)
+            numbers = _numbers(words)
+            for entry in entries.values():
+                if entry.numbers != numbers:
+                    continue  # "chapter 3" vs "chapter 4" are never the same question
+                similarity = cosine(vector, entry.vector)
+                if similarity > score:
+                    best, score = entry, similarity
+
+        if best is not None and best.version != version:
+            self._evict_material(material_id)
+            best = None
+        if best is None or score < self.threshold:
+            self.counters["misses"] += 1
+            return None
+
+        if self.shared:
+            answer = await self._load(best)
+            if answer is None:
+                self._remove(best)  # Expired or trimmed from the shared store
+                self.counters["misses"] += 1
+                return None
+        else:
+            answer = best
+        if score < 1.0 and named_entities(answer.question) != named_entities(question):
+            # Checked on the loaded answer: entries indexed from other workers only know the lowercased key
+            self.counters["misses"] += 1
+            return None
+        best.hits += 1
+        self.counters["hits"] += 1
+        self._lru.move_to_end((material_id, best.key))
+        logger.info(f"⚡ Answer cache hit ({score:.2f}): '{question}' ≈ '{best.question}'")
+        return answer
+
+    def record_saved(self, entry: CachedAnswer, serve_seconds: float):
+        self.latency_saved += max(0.0, entry.generation_seconds - serve_seconds)
+
+    async def store(self, material_id: Optional[str], version: str, question: str, text: str,
+                    audio: List[str], generation_seconds: float, brief: bool = False):
+        words = self.cacheable(material_id, question)
+        if words is None or not text or not audio:
+            return
+        if brief:
+            self.counters["skipped_brief"] += 1  # Shedding-mode answer: too short for later sessions
+            return
+        if any(entry.version != version for entry in self._materials.get(material_id, {}).values()):
+            self._evict_material(material_id)
+
+        key = " ".join(words)
+        if self.shared:
+            await self.shared.aset_json("answers", _shared_key(material_id, version, key), {
+                "question": question, "text": text, "audio": audio, "generation_seconds": generation_seconds,
+            }, ttl=self.shared_ttl)
+            text, audio = "", []  # Index only; the payload is read back from the shared store on a hit
+        self._index(material_id, version, key, question, words, text, audio, generation_seconds)
+        self.counters["stores"] += 1
+
+    def _index(self, material_id: str, version: str, key: str, question: str, words: List[str],
+               text: str, audio: List[str], generation_seconds: float):
+        entries = self._materials.setdefault(material_id, {})
+        if key in entries:
+            self._remove(entries[key])
+        entry = CachedAnswer(material_id, version, key, question, self.embedder.embed(words),
+                             text, audio, generation_seconds)
+        entries[key] = entry
+        self._lru[(material_id, key)] = entry
+        self.bytes += entry.size
+
+        while len(entries) > self.max_entries_per_material:
+            self._remove(min(entries.values(), key=lambda e: e.hits))
+        while self._lru and (len(self._lru) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._lru.values())))
+
+    async def _sync(self, material_id: str, version: str):
+        """
+        Index answers other workers stored for this material version (at most every `sync_interval`)
+        """
+        now = time.monotonic()
+        if now - self._synced.get((material_id, version), 0.0) < self.sync_interval:
+            return
+        if len(self._synced) > 4096:
+            self._synced.clear()
+        self._synced[(material_id, version)] = now
+        prefix = _shared_key(material_id, version, "")
+        keys = [shared_key[len(prefix):] for shared_key in await self.shared.akeys("answers", prefix)]
+        if keys and any(entry.version != version for entry in self._materials.get(material_id, {}).values()):
+            self._evict_material(material_id)
+        entries = self._materials.get(material_id, {})
+        for key in keys:
+            if key not in entries:
+                # Keys are the normalized question, so they double as the question text
+                self._index(material_id, version, key, key, key.split(), "", [], 0.0)
+                entries = self._materials[material_id]
+
+    async def _load(self, entry: CachedAnswer) -> Optional[CachedAnswer]:
+        payload = await self.shared.aget_json("answers", _shared_key(entry.material_id, entry.version, entry.key))
+        if payload is None:
+            return None
+        return CachedAnswer(entry.material_id, entry.version, entry.key, payload["question"], entry.vector,
+                            payload["text"], payload["audio"], payload["generation_seconds"])
+
+    def _remove(self, entry: CachedAnswer):
+        self._lru.pop((entry.material_id, entry.key), None)
+        entries = self._materials.get(entry.material_id)
+        if entries is not None and entries.pop(entry.key, None) is not None:
+            self.bytes -= entry.size
+            self.counters["evictions"] += 1
+            if not entries:
+                del self._materials[entry.material_id]
+
+    def _evict_material(self, material_id: str):
+        for entry in list(self._materials.get(material_id, {}).values()):
+            self._remove(entry)
+        logger.info(f"🧹 Answer cache cleared for material {material_id} (new version)")
+
+    def stats(self) -> Dict:
+        lookups = self.counters["lookups"]
+        return {
+            **self.counters,
+            "entries": len(self._lru),
+            "bytes": self.bytes,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            "latency_saved_s": round(self.latency_saved, 2),
+            "avg_saved_ms": round(self.latency_saved / self.counters["hits"] * 1000, 1) if self.counters["hits"] else None,
+        }
+
+
+def _shared_key(material_id: str, version: str, key: str) -> str:
+    # "full" is the answer mode. Brief answers are never stored, so older keys without a mode never match
+    return f"{material_id}|{version}|full|{key}"
+
+
+class PendingAnswer:
+    """
+    Text and audio collected for one generated turn, stored once it completes
+    """
+
+    __slots__ = ("question", "version", "brief", "started", "text", "audio")
+
+    def __init__(self, question: str, version: str, brief: bool = False):
+        self.question = question
+        self.version = version
+        self.brief = brief  # Generated with the shedding-mode one-sentence instruction
+        self.started = time.perf_counter()
+        self.text = ""
+        self.audio: List[str] = []
+
+
+answer_cache = AnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.87")),
+    shared=shared_store,
+) if os.getenv("ANSWER_CACHE", "true").lower() == "true" else None
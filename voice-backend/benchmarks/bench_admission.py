@@ -0,0 +1,148 @@
+"""
+Turn latency at and beyond the session cap, with and without admission control
+
+    python benchmarks/bench_admission.py [--cap 12] [--seconds 12] [--cpu-per-char-ms 0.5]
+
+Runs N concurrent pipeline-engine sessions on one event loop. Each session
+streams 20 ms frames and asks a question every 3 s; the fake TTS burns
+`--cpu-per-char-ms` of loop CPU per character (standing in for in-process
+audio work), so the node saturates at some number of sessions. Turn latency
+is transcript -> first audio packet.
+
+- uncapped: every session admitted, no shedding (the old behaviour)
+- capped:   SessionManager with fast-fail at `--cap` and load shedding from
+            75% of the cap (the LLM then answers in one short sentence)
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fakes import FakeLLM, FakeSTT, FakeTTS, NoRetriever
+
+import pipeline_engine
+from pipeline_engine import VoicePipelineEngine
+from prompt_cache import BRIEF_INSTRUCTIONS
+from session_manager import CapacityExceeded, SessionManager
+
+FRAME = b"\x10\x02" * 960  # 20 ms of 48 kHz Int16 PCM
+
+
+class TimedSTT(FakeSTT):
+    def __init__(self, turn_started: list, **kwargs):
+        super().__init__(**kwargs)
+        self.turn_started = turn_started
+
+    async def send(self, audio_bytes: bytes):
+        if (self.frames + 1) % self.frames_per_turn == 0:
+            self.turn_started.append(time.perf_counter())
+        await super().send(audio_bytes)
+
+
+class BriefAwareLLM(FakeLLM):
+    """
+    Answers with a quarter of the words when the prompt asks for one sentence
+    """
+
+    async def stream(self, prompt, system=None):
+        tokens = self.tokens
+        if BRIEF_INSTRUCTIONS in prompt:
+            self.tokens = max(1, tokens // 4)
+        try:
+            async for chunk in super().stream(prompt, system):
+                yield chunk
+        finally:
+            self.tokens = tokens
+
+
+class CpuTTS(FakeTTS):
+    def __init__(self, cpu_per_char: float, **kwargs):
+        super().__init__(**kwargs)
+        self.cpu_per_char = cpu_per_char
+
+    async def synthesize(self, text):
+        deadline = time.perf_counter() + len(text) * self.cpu_per_char
+        while time.perf_counter() < deadline:
+            pass
+        async for chunk in super().synthesize(text):
+            yield chunk
+
+
+async def session(manager: SessionManager, seconds: float, cpu_per_char: float, latencies: list, outcome: dict):
+    try:
+        lease = await manager.acquire()
+    except CapacityExceeded:
+        outcome["rejected"] += 1
+        return
+    outcome["admitted"] += 1
+    turn_started = []
+    engine = VoicePipelineEngine(
+        stt=TimedSTT(turn_started, frames_per_turn=150),
+        llm=BriefAwareLLM(tokens=40, ttft=0.2, inter_token=0.01),
+        tts=CpuTTS(cpu_per_char),
+        retriever=NoRetriever(),
+        cache=None,
+    )
+    await engine.initialize()
+
+    async def consume():
+        answered = 0
+        async for message in engine.get_output_stream():
+            if message.get("type") == "audio" and answered < len(turn_started):
+                latencies.append(time.perf_counter() - turn_started[answered])
+                answered += 1
+            elif message.get("type") == "status" and message.get("data") == "complete":
+                answered = len(turn_started)
+
+    consumer = asyncio.create_task(consume())
+    next_at = time.perf_counter()
+    end = next_at + seconds
+    try:
+        while next_at < end:
+            await engine.process_audio_chunk(FRAME)
+            next_at += 0.02
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.sleep(1.0)
+    finally:
+        consumer.cancel()
+        await engine.cleanup()
+        manager.release(lease)
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000) if samples else None
+
+
+async def run(manager: SessionManager, sessions: int, seconds: float, cpu_per_char: float):
+    pipeline_engine.session_manager = manager  # LLMStage reads shedding from here
+    latencies, outcome = [], {"admitted": 0, "rejected": 0}
+    tasks = []
+    for index in range(sessions):
+        tasks.append(asyncio.create_task(session(manager, seconds, cpu_per_char, latencies, outcome)))
+        await asyncio.sleep(1.0 / sessions)  # arrivals spread over a second
+    await asyncio.gather(*tasks)
+    return {**outcome, "turns": len(latencies), "latency_p50_ms": pct(latencies, 0.5),
+            "latency_p95_ms": pct(latencies, 0.95)}
+
+
+async def main(cap: int, seconds: float, cpu_per_char: float):
+    results = {}
+    for sessions in (cap // 2, cap, cap * 3 // 2, cap * 2):
+        uncapped = SessionManager(max_sessions=10 ** 6, shed_at=1.0)
+        capped = SessionManager(max_sessions=cap, shed_at=0.75)
+        results[f"{sessions}_sessions"] = {
+            "uncapped": await run(uncapped, sessions, seconds, cpu_per_char),
+            "capped": await run(capped, sessions, seconds, cpu_per_char),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cap", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=12.0)
+    parser.add_argument("--cpu-per-char-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.cap, args.seconds, args.cpu_per_char_ms / 1000))
@@ -0,0 +1,79 @@
+"""
+Semantic answer cache: hit rate on paraphrased questions and lookup cost
+
+    python benchmarks/bench_answer_cache.py [--students 30]
+
+Each simulated student asks a mix of paraphrases of a few common questions
+plus unique ones. A miss "costs" the configured generation latency (RAG + LLM
++ TTS); a hit costs only the lookup. A `--shedding` share of the misses is
+answered while the node sheds load (one-sentence answers); those must never be
+stored, so `brief_served` should stay 0.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+
+from answer_cache import AnswerCache, normalize_question
+
+COMMON = [
+    ["What is photosynthesis?", "Um, what is photosynthesis", "So what is photosynthesis exactly?",
+     "Can you explain what photosynthesis is?"],
+    ["What does chlorophyll do in a plant?", "What does chlorophyll do in plants?",
+     "Okay what does the chlorophyll do in a plant"],
+    ["Where does the light reaction happen?", "Where do the light reactions happen?",
+     "Where does the light reaction take place?"],
+    ["Why do leaves change color in autumn?", "Why do leaves change colour in the autumn?",
+     "Why do the leaves change color in autumn"],
+]
+TOPICS = "osmosis mitosis enzymes respiration glucose xylem phloem stomata nitrogen ribosomes".split()
+
+
+async def main(students: int, generation_seconds: float, shedding: float):
+    rng = random.Random(3)
+    load = random.Random(4)  # Separate stream so the question mix doesn't depend on --shedding
+    cache = AnswerCache()
+    lookups, lookup_seconds, false_hits, brief_served = 0, 0.0, 0, 0
+    audio = ["A" * 5400] * 8  # ~30 KB of base64 packets per answer
+
+    for student in range(students):
+        for _ in range(6):
+            if rng.random() < 0.7:
+                group = rng.randrange(len(COMMON))
+                question = rng.choice(COMMON[group])
+            else:
+                group = None
+                question = f"How are {rng.choice(TOPICS)} and {rng.choice(TOPICS)} related in chapter {rng.randint(1, 40)}?"
+            started = time.perf_counter()
+            hit = await cache.lookup("material-1", "v1", question)
+            lookup_seconds += time.perf_counter() - started
+            lookups += 1
+            if hit:
+                same = sorted(normalize_question(hit.question)) == sorted(normalize_question(question))
+                if (group is None and not same) or (group is not None and hit.question not in COMMON[group]):
+                    false_hits += 1
+                brief_served += hit.text.startswith("Brief")
+                cache.record_saved(hit, 0.0)
+            else:
+                brief = load.random() < shedding
+                await cache.store("material-1", "v1", question, f"{'Brief answer' if brief else 'Answer'} to: {question}",
+                                  audio, generation_seconds, brief)
+
+    report = cache.stats()
+    report["false_hits"] = false_hits
+    report["brief_served"] = brief_served
+    report["avg_lookup_us"] = round(lookup_seconds / lookups * 1e6, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--generation-seconds", type=float, default=1.8)
+    parser.add_argument("--shedding", type=float, default=0.0, help="share of misses answered in shedding mode")
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.generation_seconds, args.shedding))
@@ -0,0 +1,90 @@
+"""
+check_availability: per-slot scans vs. the availability engine
+
+    python benchmarks/bench_availability.py [--appointments 100000] [--runs 20]
+
+Appointments are spread over a year at random minutes. For ranges of one
+day to one year the old approach (step hour by hour, scan every appointment
+for each business-hour slot) is timed against AvailabilityEngine, both over
+a plain sorted list (the SQLite path) and over a memory-mapped column (the
+mock dataset). The scan is only timed up to one week; beyond that it's
+extrapolated from slots x per-slot cost.
+"""
+
+import argparse
+import array
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "deepgram-demo"))
+
+from common.availability import AvailabilityEngine, candidate_slots  # noqa: E402
+
+START = datetime(2026, 1, 5)
+RANGES = {"1_day": 1, "1_week": 7, "1_month": 31, "3_months": 92, "1_year": 365}
+
+
+def scan_slots(start, end, appointments):
+    """get_available_appointment_slots before the engine (exact-match scan)"""
+    slots = []
+    current = start
+    while current <= end:
+        if current.hour >= 9 and current.hour < 17:
+            slot_time = current.isoformat()
+            taken = any(a["date"] == slot_time for a in appointments)
+            if not taken:
+                slots.append(slot_time)
+        current += timedelta(hours=1)
+    return slots
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)[len(samples) // 2], result
+
+
+def main(count: int, runs: int):
+    rng = random.Random(0)
+    dates = [START + timedelta(minutes=rng.randrange(365 * 24 * 60)) for _ in range(count)]
+    appointments = [{"date": date.isoformat()} for date in dates]
+
+    started = time.perf_counter()
+    listed = AvailabilityEngine.from_dates(appointment["date"] for appointment in appointments)
+    build_s = time.perf_counter() - started
+    column = array.array("i", sorted(int((date - START).total_seconds()) for date in dates))
+    mapped = AvailabilityEngine(memoryview(column), base=START)
+
+    results = {"appointments": count, "from_dates_build_ms": round(build_s * 1000, 1), "ranges": {}}
+    scan_per_slot = None
+    for label, days in RANGES.items():
+        start, end = START + timedelta(days=100), START + timedelta(days=100 + days)
+        slots = len(candidate_slots(start, end))
+        row = {"slots": slots}
+        if days <= 7:
+            scan_s, _ = timed(lambda: scan_slots(start, end, appointments), 1)
+            scan_per_slot = scan_s / slots
+            row["scan_ms"] = round(scan_s * 1000, 1)
+        else:
+            row["scan_ms_extrapolated"] = round(scan_per_slot * slots * 1000)
+        list_s, free = timed(lambda: listed.free_slots(start, end), runs)
+        mapped_s, mapped_free = timed(lambda: mapped.free_slots(start, end), runs)
+        assert free == mapped_free
+        row.update(engine_list_us=round(list_s * 1e6), engine_mmap_us=round(mapped_s * 1e6), free=len(free))
+        results["ranges"][label] = row
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    main(args.appointments, args.runs)
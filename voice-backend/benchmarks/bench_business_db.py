@@ -0,0 +1,132 @@
+"""
+Demo business data: the memory-mapped mock dataset vs. the SQLite backend
+
+    python benchmarks/bench_business_db.py [--sizes 10000,100000,1000000] [--calls 2000] [--concurrency 16]
+
+For each size (total rows, split 2:1:4 customers/appointments/orders like
+MOCK_DATA_SIZE) a mock dataset file is generated, then served both straight
+from the mapped file and from SQLite. The real business_logic functions are
+driven by `--concurrency` concurrent callers: customer lookup by phone, then
+that customer's appointments and orders, a one-week slot query every 10th
+call and a booking every 50th.
+Reports load time, resident size, per-call p50/p95 and the worst event-loop
+lag seen while the calls ran. 10M rows works (`--sizes 10000000`) but takes
+minutes to generate and load.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "deepgram-demo"))
+
+os.chdir(tempfile.mkdtemp())  # business_logic caches its dataset in mock_data_outputs/ on import
+from common import business_logic  # noqa: E402
+from common.config import ARTIFICIAL_DELAY  # noqa: E402
+from common.database import BusinessDatabase  # noqa: E402
+from common.mock_dataset import MockDataset, generate_columns, write_dataset  # noqa: E402
+
+ARTIFICIAL_DELAY["database"] = 0.0
+START = datetime(2026, 1, 5, 9)
+
+
+def generate(rows: int) -> MockDataset:
+    sizes = {"customers": rows * 2 // 7, "appointments": rows // 7}
+    sizes["orders"] = rows - sizes["customers"] - sizes["appointments"]
+    path = os.path.join(tempfile.mkdtemp(), "mock_data.bin")
+    write_dataset(path, sizes, rows, generate_columns(sizes, rows))
+    return MockDataset(path)
+
+
+def rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+async def drive(calls: int, concurrency: int, phones: list) -> dict:
+    rng = random.Random(0)
+    samples, lags = [], []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - started - 0.005)
+
+    async def caller(count: int):
+        for index in range(count):
+            started = time.perf_counter()
+            customer = await business_logic.get_customer(phone=rng.choice(phones))
+            await business_logic.get_customer_appointments(customer["id"])
+            await business_logic.get_customer_orders(customer["id"])
+            if index % 10 == 0:
+                day = START + timedelta(days=rng.randrange(300))
+                await business_logic.get_available_appointment_slots(
+                    day.isoformat(), (day + timedelta(days=7)).isoformat())
+            if index % 50 == 0:
+                await business_logic.schedule_appointment(customer["id"], START.isoformat(), "Review")
+            samples.append(time.perf_counter() - started)
+
+    probe = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(calls // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe
+    samples.sort()
+    return {
+        "calls_per_s": round(len(samples) / elapsed),
+        "call_p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "call_p95_ms": round(samples[int(0.95 * len(samples))] * 1000, 3),
+        "loop_lag_max_ms": round(max(lags, default=0) * 1000, 1),
+    }
+
+
+def run(rows: int, calls: int, concurrency: int) -> dict:
+    dataset = generate(rows)
+    phones = [f"+1555{i:07d}" for i in range(dataset.customer_count)]
+    report = {}
+
+    rss = rss_mb()
+    started = time.perf_counter()
+    business_logic.MOCK_DATASET = MockDataset(dataset.path)
+    business_logic.DATABASE = None
+    report["memory"] = {"load_s": round(time.perf_counter() - started, 3),
+                        "file_mb": round(os.path.getsize(dataset.path) / 2 ** 20),
+                        **asyncio.run(drive(calls, concurrency, phones)),
+                        "peak_rss_growth_mb": rss_mb() - rss}
+    business_logic.MOCK_DATASET = None
+
+    path = os.path.join(tempfile.mkdtemp(), "business_data.db")
+    started = time.perf_counter()
+    database = BusinessDatabase(path)
+    database.seed({"customers": dataset.customers, "appointments": dataset.appointments,
+                   "orders": dataset.orders})
+    business_logic.DATABASE = database
+    report["sqlite"] = {"load_s": round(time.perf_counter() - started, 2),
+                        "file_mb": round(sum(os.path.getsize(path + suffix) for suffix in ("", "-wal")
+                                             if os.path.exists(path + suffix)) / 2 ** 20),
+                        **asyncio.run(drive(calls, concurrency, phones))}
+    database.close()
+    return report
+
+
+def main(sizes, calls: int, concurrency: int):
+    print(json.dumps({f"{rows}_rows": run(rows, calls, concurrency) for rows in sizes}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.calls, args.concurrency)
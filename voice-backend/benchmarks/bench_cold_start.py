@@ -0,0 +1,91 @@
+"""
+Cold start: process spawn -> /health answering, per app, plus an import-time profile
+
+    python benchmarks/bench_cold_start.py [--runs 3] [--profile main_groq] [--top 15]
+
+Each app is started as a fresh `python -m uvicorn <app>:app` process (as a
+container would on scale-out) with the Deepgram pool disabled so nothing
+touches the network, and /health is polled every 5 ms until it answers.
+`--profile` prints the slowest imports of one app module (python -X importtime),
+aggregated per top-level package.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+PORT = 9203
+
+APPS = {
+    "main (engine)": ("main", {"VOICE_PIPELINE": "engine"}),
+    "main (legacy)": ("main", {"VOICE_PIPELINE": "legacy"}),
+    "main_groq": ("main_groq", {}),
+    "main_websocket": ("main_websocket", {}),
+    "main_websocket_v2": ("main_websocket_v2", {}),
+}
+
+
+def cold_start(module: str, env: dict, timeout: float = 30.0) -> dict:
+    env = {**os.environ, "DEEPGRAM_POOL_SIZE": "0", **env}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                error = process.stderr.read().strip().splitlines()
+                return {"error": error[-1] if error else f"exit {process.returncode}"}
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return {"ready_s": round(time.perf_counter() - started, 3)}
+            except OSError:
+                time.sleep(0.005)
+        return {"error": "timeout"}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_profile(module: str, top: int) -> dict:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BACKEND, capture_output=True, text=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # Header row
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    slowest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {"total_ms": round(sum(packages.values()) / 1000), **{name: round(us / 1000) for name, us in slowest}}
+
+
+def main(runs: int, profile: str, top: int):
+    results = {}
+    for label, (module, env) in APPS.items():
+        samples = [cold_start(module, env) for _ in range(runs)]
+        ready = sorted(sample["ready_s"] for sample in samples if "ready_s" in sample)
+        results[label] = {"ready_median_s": ready[len(ready) // 2]} if ready else samples[0]
+    if profile:
+        results[f"import_profile_ms ({profile})"] = import_profile(profile, top)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--profile", default="main_groq")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.runs, args.profile, args.top)
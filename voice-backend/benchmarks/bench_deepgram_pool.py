@@ -0,0 +1,104 @@
+"""
+Connection-ready time with and without the Deepgram warm pool
+
+    python benchmarks/bench_deepgram_pool.py [--sessions 20] [--handshake-ms 250] [--gap-ms 400]
+
+Runs a local fake Deepgram /v1/listen websocket server that delays each
+handshake by `--handshake-ms` (standing in for DNS + TCP + TLS + upgrade to
+api.deepgram.com), then has N sessions arrive `--gap-ms` apart. Each session
+measures the time from "browser connected" to "Deepgram connection ready",
+the moment the backend can send {"type": "status", "data": "connected"}.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+import websockets
+
+from deepgram_pool import DeepgramLivePool
+
+PORT = 9201
+
+
+def serve_fake_deepgram(ready, handshake_seconds: float):
+    async def delay_handshake(path, headers):
+        await asyncio.sleep(handshake_seconds)
+        return None
+
+    async def handler(websocket, path=None):
+        try:
+            async for _ in websocket:
+                pass
+        except websockets.ConnectionClosed:
+            pass
+
+    async def serve():
+        async with websockets.serve(handler, "127.0.0.1", PORT, process_request=delay_handshake):
+            ready.set()
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1) if samples else None
+
+
+async def run(pool_size: int, sessions: int, gap: float):
+    pool = DeepgramLivePool(api_key="fake-key", size=pool_size,
+                            websocket_url=f"ws://127.0.0.1:{PORT}/v1/listen")
+    await pool.start()
+    await asyncio.sleep(1.0)  # app startup: let the pool warm
+    ready_times, connections = [], []
+
+    async def session():
+        started = time.perf_counter()
+        connection = await pool.acquire()
+        ready_times.append(time.perf_counter() - started)
+        connections.append(connection)
+
+    tasks = []
+    for _ in range(sessions):
+        tasks.append(asyncio.create_task(session()))
+        await asyncio.sleep(gap)
+    await asyncio.gather(*tasks)
+    for connection in connections:
+        await connection.finish()
+    stats = pool.stats()
+    await pool.close()
+    return {
+        "ready_p50_ms": pct(ready_times, 0.50),
+        "ready_p99_ms": pct(ready_times, 0.99),
+        "ready_max_ms": pct(ready_times, 1.0),
+        "warm": stats["warm"],
+        "cold": stats["cold"],
+    }
+
+
+async def main(sessions: int, gap: float):
+    results = {
+        "no_pool": await run(0, sessions, gap),
+        "pool_2": await run(2, sessions, gap),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=250.0)
+    parser.add_argument("--gap-ms", type=float, default=400.0)
+    args = parser.parse_args()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve_fake_deepgram, args=(ready, args.handshake_ms / 1000), daemon=True)
+    server.start()
+    ready.wait()
+    try:
+        asyncio.run(main(args.sessions, args.gap_ms / 1000))
+    finally:
+        server.terminate()
@@ -0,0 +1,110 @@
+"""
+Deepgram agent docs: reading every page per call vs. the cached docs index
+
+    python benchmarks/bench_docs_index.py [--pages 50,500,2000] [--queries 200]
+
+The docs repo isn't vendored, so a synthetic corpus of .mdx pages (frontmatter,
+imports, JSX tags, 6 sections of a few paragraphs of Zipf-distributed words)
+is written per size.
+Reports the time to construct AgentTemplates("deepgram") before (every
+construction re-reads all pages) and after (the first construction in a
+process loads the cached index, later ones reuse it), the index build and
+cached-load times, the cache file size and
+search_docs p50/p95.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "deepgram-demo"))
+
+os.chdir(tempfile.mkdtemp())  # business_logic caches its dataset in mock_data_outputs/ on import
+from common import agent_functions, docs_index  # noqa: E402
+from common.agent_templates import AgentTemplates  # noqa: E402
+from common.config import DOCS_INDEX  # noqa: E402
+
+WORDS = (
+    "speech text audio stream model nova aura voice latency diarization language "
+    "transcript keyword punctuation utterance websocket batch callback encoding "
+    "sample rate channel redaction summary sentiment topic intent agent function "
+    "token pricing region endpoint request response header format container"
+).split()
+# Made-up words after the real ones, drawn with Zipf-like weights like prose
+VOCABULARY = WORDS + [f"term{i}" for i in range(20000)]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def paragraph(rng, words=60):
+    return " ".join(rng.choices(VOCABULARY, WEIGHTS, k=words)).capitalize() + "."
+
+
+def write_corpus(pages: int) -> str:
+    rng = random.Random(pages)
+    docs_dir = tempfile.mkdtemp()
+    for page in range(pages):
+        lines = ["---", f"title: Page {page}", "---", "", 'import { Card } from "@fern/ui";', ""]
+        for section in range(6):
+            lines += [f"## {rng.choice(WORDS).title()} {section}", "", "<Card>"]
+            lines += [paragraph(rng) + "\n" for _ in range(rng.randint(1, 4))]
+            lines += ["</Card>", ""]
+        Path(docs_dir, f"{rng.choice(WORDS)}-{page}.mdx").write_text("\n".join(lines))
+    return docs_dir
+
+
+def timed(fn, runs=1):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2], samples
+
+
+def run(pages: int, queries: int) -> dict:
+    docs_dir = write_corpus(pages)
+    cache_path = os.path.join(tempfile.mkdtemp(), "docs_index.bin")
+    DOCS_INDEX.update(docs_dir=docs_dir, path=cache_path)
+    docs_index._indexes.clear()
+
+    old_s, _ = timed(lambda: docs_index.read_documentation_files(docs_dir), 5)
+    build_s, _ = timed(lambda: docs_index.load_docs_index(docs_dir, cache_path))
+    load_s, _ = timed(lambda: docs_index.load_docs_index(docs_dir, cache_path), 3)
+    first_s, _ = timed(lambda: AgentTemplates("deepgram", docs_dir=docs_dir))  # cached load
+    next_s, _ = timed(lambda: AgentTemplates("deepgram", docs_dir=docs_dir), 20)
+
+    rng = random.Random(0)
+    texts = [" ".join(rng.choices(VOCABULARY[:2000], k=4)) for _ in range(queries)]
+    _, searches = timed(lambda: asyncio.run(agent_functions.search_docs({"query": rng.choice(texts)})), queries)
+    index = docs_index.get_docs_index(docs_dir, cache_path)
+    return {
+        "passages": len(index.passages),
+        "terms": len(index.terms),
+        "read_all_pages_ms": round(old_s * 1000, 1),
+        "index_build_ms": round(build_s * 1000, 1),
+        "index_cached_load_ms": round(load_s * 1000, 1),
+        "cache_file_kb": round(os.path.getsize(cache_path) / 1024),
+        "agent_templates_first_ms": round(first_s * 1000, 1),
+        "agent_templates_next_ms": round(next_s * 1000, 3),
+        "search_p50_ms": round(searches[len(searches) // 2] * 1000, 2),
+        "search_p95_ms": round(searches[int(0.95 * len(searches))] * 1000, 2),
+    }
+
+
+def main(sizes, queries: int):
+    print(json.dumps({f"{pages}_pages": run(pages, queries) for pages in sizes}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", default="50,500,2000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main([int(size) for size in args.pages.split(",")], args.queries)
@@ -0,0 +1,85 @@
+"""
+Stage throughput benchmark for the pipeline engine
+
+    python benchmarks/bench_engine.py [--frames 5000]
+
+Each stage is driven in isolation with synthetic input so its service time
+can be compared, then the whole engine runs end-to-end with fake providers.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fakes import FakeLLM, FakeSTT, FakeTTS, NoRetriever
+
+from pipeline_engine import (
+    CLOSED,
+    AudioChunk,
+    AudioFrame,
+    Channel,
+    PacketizerStage,
+    SegmenterStage,
+    TextDelta,
+    VADStage,
+    VoicePipelineEngine,
+)
+
+FRAME = (b"\x10\x02" * 960)  # 20 ms of 48 kHz Int16 PCM
+
+
+async def drain(channel: Channel):
+    while await channel.get() is not CLOSED:
+        pass
+
+
+async def bench_stage(stage, items):
+    inbox, outbox = Channel("in", len(items) + 1), Channel("out", 1 << 20)
+    for item in items:
+        inbox.put_nowait(item)
+    inbox.put_nowait(CLOSED)
+    started = time.perf_counter()
+    await asyncio.gather(stage.run(inbox, outbox), drain(outbox))
+    result = stage.stats.as_dict()
+    result["wall_s"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+async def bench_end_to_end(frames: int):
+    engine = VoicePipelineEngine(
+        stt=FakeSTT(frames_per_turn=250), llm=FakeLLM(), tts=FakeTTS(), retriever=NoRetriever()
+    )
+    await engine.initialize()
+    consumer = asyncio.create_task(_consume(engine))
+    started = time.perf_counter()
+    for _ in range(frames):
+        await engine.process_audio_chunk(FRAME)
+    await asyncio.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    consumer.cancel()
+    report = engine.stats()
+    await engine.cleanup()
+    return {"frames": frames, "wall_s": round(elapsed, 3), "stages": report}
+
+
+async def _consume(engine):
+    async for _ in engine.get_output_stream():
+        pass
+
+
+async def main(frames: int):
+    results = {
+        "vad": await bench_stage(VADStage(barge_in=True), [AudioFrame(FRAME) for _ in range(frames)]),
+        "segmenter": await bench_stage(SegmenterStage(), [TextDelta(1, f"word{i}{'.' if i % 12 == 11 else ''} ") for i in range(frames)]),
+        "packetizer": await bench_stage(PacketizerStage(), [AudioChunk(1, b"\x00" * 1500) for _ in range(frames)]),
+        "end_to_end": await bench_end_to_end(frames),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.frames))
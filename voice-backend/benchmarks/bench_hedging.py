@@ -0,0 +1,75 @@
+"""
+Hedged LLM routing against two local fake LLM servers
+
+    python benchmarks/bench_hedging.py [--requests 200]
+
+The primary server has a heavy tail (10% of requests stall for 2 s); the
+secondary is uniformly a bit slower. Reports client-observed TTFT with the
+primary alone vs. the hedging router, plus the router's own statistics, and
+fails if hedging doesn't cut the primary's stall tail (router p99 must stay
+below the 2 s stall).
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+from fake_llm_server import start_server
+
+from llm_router import LLMRouter
+from providers import OpenAICompatLLM, close_http_session
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": pick(1.0)}
+
+
+async def measure(llm, requests: int, concurrency: int = 8):
+    ttfts = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            first = None
+            async for _ in llm.stream("What is photosynthesis?"):
+                if first is None:
+                    first = time.perf_counter() - started
+            ttfts.append(first)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return percentiles(ttfts)
+
+
+async def main(requests: int):
+    primary_server = await start_server(9101, ttft=0.15, slow_ratio=0.10, slow_ttft=2.0, seed=1)
+    secondary_server = await start_server(9102, ttft=0.30, seed=2)
+    try:
+        primary = OpenAICompatLLM("http://127.0.0.1:9101/v1", label="primary")
+        secondary = OpenAICompatLLM("http://127.0.0.1:9102/v1", label="secondary")
+        router = LLMRouter([primary, secondary], default_hedge_delay=0.5, min_samples=10)
+        results = {
+            "primary_only": await measure(primary, requests),
+            "hedged_router": await measure(router, requests),
+            "router_stats": router.stats(),
+        }
+        print(json.dumps(results, indent=2))
+        hedged_p99 = results["hedged_router"]["p99_ms"]
+        primary_p99 = results["primary_only"]["p99_ms"]
+        assert hedged_p99 < 0.5 * primary_p99, (
+            f"hedging did not cut the tail: p99 {hedged_p99} ms vs {primary_p99} ms primary-only")
+    finally:
+        await close_http_session()
+        await primary_server.cleanup()
+        await secondary_server.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
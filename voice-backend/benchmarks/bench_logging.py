@@ -0,0 +1,152 @@
+"""
+Event-loop cost of logging: print(flush=True) vs. logging.StreamHandler vs. the queue pipeline
+
+    python benchmarks/bench_logging.py [--sessions 40] [--seconds 10] [--reader-kbps 4]
+
+Each mode runs in a child process whose stdout is a pipe read by this
+process at `--reader-kbps` (a log collector that can't keep up; 0 = read as
+fast as possible). The child runs `--sessions` simulated sessions on one
+event loop: 50 audio frames/s (a DEBUG line each, level INFO so it is
+filtered), 5 interim transcripts/s and a final transcript + a few turn
+lines every 2 s.
+
+- print:  what main_websocket.py did (f-string print(..., flush=True) per event)
+- stream: logging.basicConfig StreamHandler with f-string messages (main.py)
+- queue:  structured_logging (queue + writer thread, %-args, interims sampled 1/10)
+
+Reports time spent inside log calls and the worst event-loop lag.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+
+from structured_logging import SessionLogger, configure_logging
+
+TRANSCRIPT = "so what I wanted to ask is how does the light reaction work in photosynthesis"
+
+
+class Timed:
+    def __init__(self):
+        self.samples = []
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.started)
+
+
+async def session(index: int, mode: str, seconds: float, timed: Timed):
+    logger = logging.getLogger("bench")
+    log = SessionLogger(logger, f"s{index}")
+    frames = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        await asyncio.sleep(0.02)
+        frames += 1
+        words = TRANSCRIPT.split()[:frames % 16 + 1]
+        with timed:
+            if mode == "print":
+                if frames % 10 == 0:
+                    print(f"📝 Transcript (interim): {' '.join(words)}", flush=True)
+                if frames % 100 == 0:
+                    print(f"📝 Final transcript: {TRANSCRIPT}", flush=True)
+                    print(f"🔍 Starting RAG search for material: m-{index}", flush=True)
+                    print(f"✅ RAG search returned {len(TRANSCRIPT) * 10} characters", flush=True)
+                    print(f"🔊 TTS: {TRANSCRIPT[:50]}...", flush=True)
+            elif mode == "stream":
+                logger.debug(f"📤 Sent {1920} bytes to Deepgram")
+                if frames % 10 == 0:
+                    logger.info(f"📝 Transcript (interim): {' '.join(words)}")
+                if frames % 100 == 0:
+                    logger.info(f"📝 Transcript (final): {TRANSCRIPT}")
+                    logger.info(f"✅ RAG search returned {len(TRANSCRIPT) * 10} characters")
+                    logger.info(f"🔊 Converting to speech: {TRANSCRIPT[:50]}...")
+            else:
+                log.debug("📤 Sent %d bytes to Deepgram", 1920)
+                if frames % 10 == 0:
+                    log.sampled("interim", 10, "📝 Transcript (interim): %s", " ".join(words))
+                if frames % 100 == 0:
+                    log.next_turn()
+                    log.info("📝 Transcript (final): %s", TRANSCRIPT)
+                    log.info("✅ RAG search returned %d characters", len(TRANSCRIPT) * 10)
+                    log.debug("🔊 TTS: %s...", TRANSCRIPT[:50])
+
+
+async def child(mode: str, sessions: int, seconds: float):
+    if mode == "stream":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                            stream=sys.stdout)
+    elif mode == "queue":
+        configure_logging("INFO")
+    timed, lags = Timed(), []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    probe = asyncio.create_task(ticker())
+    await asyncio.gather(*(session(index, mode, seconds, timed) for index in range(sessions)))
+    probe.cancel()
+    samples = sorted(timed.samples)
+    report = {
+        "log_calls": len(samples),
+        "log_time_total_ms": round(sum(samples) * 1000, 1),
+        "log_call_p99_us": round(samples[int(0.99 * len(samples))] * 1e6, 1),
+        "log_call_max_ms": round(samples[-1] * 1000, 2),
+        "loop_lag_p99_ms": round(sorted(lags)[int(0.99 * len(lags))] * 1000, 1),
+        "loop_lag_max_ms": round(max(lags) * 1000, 1),
+    }
+    if mode == "queue":
+        report["dropped"] = logging.getLogger().handlers[0].dropped
+    print(json.dumps(report), file=sys.stderr)
+
+
+def run(mode: str, sessions: int, seconds: float, reader_kbps: float) -> dict:
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--child", mode,
+         "--sessions", str(sessions), "--seconds", str(seconds)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    written = 0
+    while True:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            break
+        written += len(chunk)
+        if reader_kbps:
+            time.sleep(len(chunk) / (reader_kbps * 1024))
+    report = json.loads(process.stderr.read().decode().strip().splitlines()[-1])
+    process.wait()
+    return {**report, "stdout_kb": round(written / 1024)}
+
+
+def main(sessions: int, seconds: float, reader_kbps: float):
+    results = {}
+    for kbps in (0, reader_kbps):
+        label = "fast_reader" if not kbps else f"reader_{kbps:g}_kbps"
+        results[label] = {mode: run(mode, sessions, seconds, kbps) for mode in ("print", "stream", "queue")}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--reader-kbps", type=float, default=4.0)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.child, args.sessions, args.seconds))
+    else:
+        main(args.sessions, args.seconds, args.reader_kbps)
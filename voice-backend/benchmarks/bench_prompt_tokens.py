@@ -0,0 +1,85 @@
+"""
+Input tokens per turn: legacy prompts vs. cached prefix + per-turn suffix
+
+    python benchmarks/bench_prompt_tokens.py [--turns 20]
+
+"Legacy" rebuilds the prompt the way voice_pipeline_streaming.py used to
+(persona + up to 2000 chars of material + question, every turn). "Prefix"
+uses PromptCache's defaults: the persona, instructions and a summary cut to
+1500 chars, built once as a stable prefix, plus a per-turn suffix. Both count
+every token sent each turn; providers with automatic prefix caching would
+bill the prefix part at a discount, which this bench does not model.
+"""
+
+import argparse
+import json
+import random
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+
+from conversation_memory import ConversationMemory, estimate_tokens
+from prompt_cache import PromptCache
+
+WORDS = ("cell energy light chlorophyll glucose oxygen carbon water plant reaction "
+         "membrane enzyme molecule stage cycle process leaf sugar photon electron").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def legacy_prompt(transcript: str, context: str, history: str) -> str:
+    history_section = f"{history}\n\n" if history else ""
+    return f"""You are an AI tutor helping students learn.
+
+{history_section}Context from learning materials:
+{context}
+
+Student said: {transcript}
+
+Provide a helpful, clear, and concise response. Be encouraging and educational. Keep it brief and conversational."""
+
+
+def main(turns: int):
+    rng = random.Random(7)
+    material = {
+        "title": "Biology: Photosynthesis",
+        "updatedAt": "2024-01-01T00:00:00Z",
+        "wholeSummary": " ".join(sentence(rng, 14) for _ in range(40)),
+    }
+    cache = PromptCache()
+    prefix = cache.build_prefix("bench", material, material["updatedAt"])
+    questions = [sentence(rng, 9).rstrip(".") + "?" for _ in range(turns)]
+    answers = [" ".join(sentence(rng, 12) for _ in range(3)) for _ in range(turns)]
+
+    results = {}
+    for mode in ("legacy", "prefix"):
+        memory = ConversationMemory()
+        tokens, build_seconds = [], 0.0
+        for question, answer in zip(questions, answers):
+            started = time.perf_counter()
+            if mode == "legacy":
+                prompt = legacy_prompt(question, material["wholeSummary"][:2000], memory.render())
+                built = time.perf_counter() - started
+                tokens.append(estimate_tokens(prompt))
+            else:
+                suffix = cache.render_turn(question, history=memory.render())
+                built = time.perf_counter() - started
+                tokens.append(prefix.tokens + estimate_tokens(suffix))
+            build_seconds += built
+            memory.add_turn(question, answer)
+        results[mode] = {
+            "avg_input_tokens": round(sum(tokens) / turns, 1),
+            "avg_build_us": round(build_seconds / turns * 1e6, 1),
+        }
+    results["prefix"]["prefix_tokens"] = prefix.tokens
+    results["prefix"]["avg_suffix_tokens"] = round(results["prefix"]["avg_input_tokens"] - prefix.tokens, 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+    main(args.turns)
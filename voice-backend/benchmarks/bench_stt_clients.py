@@ -0,0 +1,197 @@
+"""
+Threaded vs. asyncio Deepgram live clients under concurrent sessions
+
+    python benchmarks/bench_stt_clients.py [--sessions 50] [--seconds 5]
+
+Runs a local fake Deepgram /v1/listen websocket server and streams 20 ms PCM
+frames from N concurrent sessions using:
+
+- threaded: `listen.live` (what the Gemini/Groq/REST pipelines used) with
+  SDK listener/keepalive threads, run_coroutine_threadsafe per transcript and
+  a blocking send() on the event loop
+- asyncio:  `listen.asynclive` (what they use now), everything on the loop
+
+Reports threads per session, event-loop lag and delivered transcripts.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+import websockets
+from deepgram import DeepgramClient, DeepgramClientOptions, LiveOptions, LiveTranscriptionEvents
+
+PORT = 9200
+FRAME = b"\x00\x01" * 960  # 20 ms of 48 kHz mono linear16
+OPTIONS = LiveOptions(model="nova-2", language="en", encoding="linear16", sample_rate=48000, channels=1)
+
+
+def result_message(index: int, is_final: bool) -> str:
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": 0.2,
+        "start": index * 0.2,
+        "is_final": is_final,
+        "speech_final": is_final,
+        "channel": {"alternatives": [{"transcript": f"words {index}", "confidence": 0.9, "words": []}]},
+        "metadata": {"request_id": "fake", "model_uuid": "fake",
+                     "model_info": {"name": "nova-2", "version": "fake", "arch": "fake"}},
+    })
+
+
+async def fake_deepgram(websocket, path=None):
+    frames = 0
+    try:
+        async for message in websocket:
+            if isinstance(message, str):
+                continue  # KeepAlive / CloseStream
+            frames += 1
+            if frames % 10 == 0:
+                await websocket.send(result_message(frames // 10, is_final=frames % 50 == 0))
+    except websockets.ConnectionClosed:
+        pass
+
+
+def make_client() -> DeepgramClient:
+    return DeepgramClient("fake-key", DeepgramClientOptions(options={"keepalive": "true"}))
+
+
+class ThreadedSession:
+    def __init__(self, delivered: list):
+        self.loop = asyncio.get_running_loop()
+        self.delivered = delivered
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.connection = make_client().listen.live.v("1")
+        self.connection.websocket_url = f"ws://127.0.0.1:{PORT}/v1/listen"
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+
+    def _on_transcript(self, *args, **kwargs):
+        asyncio.run_coroutine_threadsafe(self.queue.put(kwargs["result"]), self.loop)
+        self.delivered[0] += 1
+
+    async def start(self):
+        return self.connection.start(OPTIONS)
+
+    async def send(self, frame: bytes):
+        self.connection.send(frame)
+
+    async def finish(self):
+        self.connection.finish()
+
+
+class AsyncSession:
+    def __init__(self, delivered: list):
+        self.delivered = delivered
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.connection = make_client().listen.asynclive.v("1")
+        self.connection.websocket_url = f"ws://127.0.0.1:{PORT}/v1/listen"
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+
+    async def _on_transcript(self, *args, **kwargs):
+        await self.queue.put(kwargs["result"])
+        self.delivered[0] += 1
+
+    async def start(self):
+        return await self.connection.start(OPTIONS)
+
+    async def send(self, frame: bytes):
+        await self.connection.send(frame)
+
+    async def finish(self):
+        await self.connection.finish()
+
+
+async def measure_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+def pct(samples, p):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2) if samples else None
+
+
+async def run(kind, sessions: int, seconds: float):
+    delivered = [0]
+    baseline_threads = threading.active_count()
+    session_cls = ThreadedSession if kind == "threaded" else AsyncSession
+    clients = [session_cls(delivered) for _ in range(sessions)]
+    for client in clients:
+        await client.start()
+    threads = threading.active_count() - baseline_threads
+
+    stop = asyncio.Event()
+    lag = []
+    monitor = asyncio.create_task(measure_lag(stop, lag))
+
+    async def stream(client):
+        next_at = time.perf_counter()
+        end = next_at + seconds
+        while next_at < end:
+            await client.send(FRAME)
+            next_at += 0.02
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+    await asyncio.gather(*(stream(client) for client in clients))
+    stop.set()
+    await monitor
+    await asyncio.sleep(0.3)  # let the last transcripts arrive
+    for client in clients:
+        await client.finish()
+
+    return {
+        "threads_per_session": round(threads / sessions, 2),
+        "loop_lag_p50_ms": pct(lag, 0.50),
+        "loop_lag_p99_ms": pct(lag, 0.99),
+        "loop_lag_max_ms": pct(lag, 1.0),
+        "transcripts_delivered": delivered[0],
+    }
+
+
+def serve_fake_deepgram(ready):
+    async def serve():
+        async with websockets.serve(fake_deepgram, "127.0.0.1", PORT, max_size=None):
+            ready.set()
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+def start_fake_deepgram():
+    """
+    Serve from a separate process: the threaded client's blocking connect would
+    deadlock against a server on the benchmark's own loop, and a server thread
+    would add its own GIL contention to the lag being measured
+    """
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=serve_fake_deepgram, args=(ready,), daemon=True)
+    process.start()
+    ready.wait()
+    return process
+
+
+async def main(sessions: int, seconds: float):
+    results = {
+        "threaded": await run("threaded", sessions, seconds),
+        "asyncio": await run("asyncio", sessions, seconds),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    server = start_fake_deepgram()
+    try:
+        asyncio.run(main(args.sessions, args.seconds))
+    finally:
+        server.terminate()
@@ -0,0 +1,198 @@
+"""
+Transcript loss across a Deepgram connection drop: restart vs. replay buffer
+
+    python benchmarks/bench_stt_reconnect.py [--seconds 6] [--drop-at 2.3] [--handshake-ms 100]
+
+A local fake Deepgram server "transcribes" synthetic speech: every 0.2 s
+word is a run of PCM frames carrying the word's index, and a final result
+with word timings is sent every 5 words. The first connection is killed
+(close code 1011) after `--drop-at` seconds of audio: the benchmark asks the
+server to drop it with a text "Blip" message. Compared:
+
+- restart: what main_websocket.py did - on a failed send open a new
+  connection and carry on, nothing buffered or replayed
+- resilient: ResilientLiveConnection (ring buffer, backoff, replay, seam de-dup)
+
+Reports missing and duplicated words in the delivered final transcripts.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import struct
+import time
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+import websockets
+from deepgram import LiveTranscriptionEvents
+
+from deepgram_pool import DeepgramLivePool
+from resilient_stt import ResilientLiveConnection
+
+PORT = 9202
+FRAME_BYTES = 1920  # 20 ms of 48 kHz mono linear16
+FRAMES_PER_WORD = 10
+
+
+def final_result(words) -> str:
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "start": words[0]["start"],
+        "duration": words[-1]["end"] - words[0]["start"],
+        "is_final": True,
+        "speech_final": True,
+        "channel": {"alternatives": [{"transcript": " ".join(word["word"] for word in words),
+                                      "confidence": 0.9, "words": words}]},
+        "metadata": {"request_id": "fake", "model_uuid": "fake",
+                     "model_info": {"name": "nova-2", "version": "fake", "arch": "fake"}},
+    })
+
+
+def serve_fake_deepgram(ready, handshake_seconds: float):
+    async def delay_handshake(path, headers):
+        await asyncio.sleep(handshake_seconds)
+        return None
+
+    async def handler(websocket, path=None):
+        pending, buffer = [], b""
+        run_value, run_start, run_frames, frame_index = None, 0, 0, 0
+
+        async def close_word():
+            pending.append({"word": f"w{run_value}", "start": run_start * 0.02,
+                            "end": (run_start + run_frames) * 0.02, "confidence": 0.9})
+            if len(pending) == 5:
+                await websocket.send(final_result(pending))
+                pending.clear()
+
+        try:
+            async for message in websocket:
+                if isinstance(message, str):
+                    if "Blip" in message:
+                        await websocket.close(1011, "upstream blip")
+                        return
+                    continue  # KeepAlive / CloseStream
+                buffer += message
+                while len(buffer) >= FRAME_BYTES:
+                    value = struct.unpack_from("<h", buffer)[0]
+                    buffer = buffer[FRAME_BYTES:]
+                    if value != run_value and run_value is not None:
+                        await close_word()
+                        run_frames = 0
+                    if run_frames == 0:
+                        run_start = frame_index
+                    run_value = value
+                    run_frames += 1
+                    frame_index += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    async def serve():
+        async with websockets.serve(handler, "127.0.0.1", PORT, process_request=delay_handshake):
+            ready.set()
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+class RestartSession:
+    """
+    The old behaviour: no buffer; a failed send re-opens the connection inline
+    """
+
+    def __init__(self, pool: DeepgramLivePool, words: list):
+        self.pool = pool
+        self.words = words
+
+    async def _on_transcript(self, _connection, *args, **kwargs):
+        result = kwargs["result"]
+        if result.is_final:
+            self.words.extend(result.channel.alternatives[0].transcript.split())
+
+    async def start(self):
+        self.connection = await self.pool.acquire()
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+
+    async def send(self, frame: bytes):
+        if not await self.connection.send(frame) or not self.connection.is_alive():
+            await self.start()
+
+    async def finish(self):
+        await self.connection.finish()
+
+
+class ResilientSession(RestartSession):
+    async def start(self):
+        self.connection = ResilientLiveConnection(pool=self.pool, initial_backoff=0.05)
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+        await self.connection.start()
+
+    async def send(self, frame: bytes):
+        await self.connection.send(frame)
+
+
+async def blip(session):
+    connection = session.connection
+    if isinstance(connection, ResilientLiveConnection):
+        connection = connection.connection
+    await connection.send(json.dumps({"type": "Blip"}))
+
+
+async def run(session_cls, pool_size: int, seconds: float, drop_at: float):
+    pool = DeepgramLivePool(api_key="fake-key", size=pool_size, websocket_url=f"ws://127.0.0.1:{PORT}/v1/listen")
+    await pool.start()
+    await asyncio.sleep(0.5)
+    words = []
+    session = session_cls(pool, words)
+    await session.start()
+
+    next_at = time.perf_counter()
+    for index in range(int(seconds / 0.02)):
+        if index == int(drop_at / 0.02):
+            await blip(session)
+        await session.send(struct.pack("<h", index // FRAMES_PER_WORD) * (FRAME_BYTES // 2))
+        next_at += 0.02
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+    await asyncio.sleep(0.5)
+    await session.finish()
+    await pool.close()
+
+    indices = [int(word[1:]) for word in words]
+    expected = set(range(max(indices) + 1)) if indices else set()
+    report = {
+        "words_delivered": len(indices),
+        "missing_words": len(expected - set(indices)),
+        "duplicate_words": len(indices) - len(set(indices)),
+    }
+    if isinstance(session.connection, ResilientLiveConnection):
+        report.update(session.connection.stats())
+    return report
+
+
+async def main(seconds: float, drop_at: float):
+    results = {}
+    for pool_size in (0, 2):
+        results[f"restart_pool_{pool_size}"] = await run(RestartSession, pool_size, seconds, drop_at)
+        results[f"resilient_pool_{pool_size}"] = await run(ResilientSession, pool_size, seconds, drop_at)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=6.0)
+    parser.add_argument("--drop-at", type=float, default=2.3)
+    parser.add_argument("--handshake-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve_fake_deepgram,
+        args=(ready, args.handshake_ms / 1000),
+        daemon=True,
+    )
+    server.start()
+    ready.wait()
+    try:
+        asyncio.run(main(args.seconds, args.drop_at))
+    finally:
+        server.terminate()
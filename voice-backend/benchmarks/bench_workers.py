@@ -0,0 +1,132 @@
+"""
+Multi-worker scaling: sessions per core and cross-worker cache sharing
+
+    python benchmarks/bench_workers.py [--workers 1,2] [--seconds 8] [--target-p95-ms 500]
+
+1. Scaling. W worker processes each run S concurrent pipeline-engine
+   sessions (the bench_admission.py load: a question every 3 s, fake TTS
+   burning loop CPU per character). For every W the largest S whose worst
+   worker p95 turn latency stays under the target is reported, as total
+   sessions and sessions per core.
+2. Sharing. W processes replay the same student question mix as
+   bench_answer_cache.py against their own AnswerCache, once with
+   per-process caches and once backed by one SharedStore. Reports hit rate
+   and the answer bytes held per worker vs. once in shared memory.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+
+import fakes  # noqa: F401  (adds the backend to sys.path)
+
+from answer_cache import AnswerCache
+from bench_admission import run as run_sessions
+from bench_answer_cache import COMMON, TOPICS
+from session_manager import SessionManager
+from shared_store import SharedStore
+
+
+def load_worker(sessions: int, seconds: float, cpu_per_char: float, results):
+    uncapped = SessionManager(max_sessions=10 ** 6, shed_at=1.0)
+    results.put(asyncio.run(run_sessions(uncapped, sessions, seconds, cpu_per_char)))
+
+
+def run_load(workers: int, sessions: int, seconds: float, cpu_per_char: float):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=load_worker, args=(sessions, seconds, cpu_per_char, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "sessions": workers * sessions,
+        "turns": sum(report["turns"] for report in reports),
+        "worst_p50_ms": max(report["latency_p50_ms"] or 0 for report in reports),
+        "worst_p95_ms": max(report["latency_p95_ms"] or 0 for report in reports),
+    }
+
+
+async def replay_questions(cache: AnswerCache, rng: random.Random, students: int):
+    audio = ["A" * 5400] * 8  # ~30 KB of base64 packets per answer
+    for _ in range(students * 6):
+        if rng.random() < 0.7:
+            question = rng.choice(rng.choice(COMMON))
+        else:
+            question = f"How are {rng.choice(TOPICS)} and {rng.choice(TOPICS)} related in chapter {rng.randint(1, 40)}?"
+        if not await cache.lookup("material-1", "v1", question):
+            await cache.store("material-1", "v1", question, f"Answer to: {question}", audio, 2.0)
+
+
+def cache_worker(index: int, students: int, shared_path, start, results):
+    rng = random.Random(index)
+    cache = AnswerCache(shared=SharedStore(shared_path) if shared_path else None, sync_interval=0.0)
+    start.wait()
+    asyncio.run(replay_questions(cache, rng, students))
+    results.put(cache.stats())
+
+
+def run_sharing(workers: int, students: int, shared: bool):
+    shared_path = os.path.join(tempfile.mkdtemp(), "cache.sqlite") if shared else None
+    start, results = multiprocessing.Event(), multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=cache_worker, args=(index, students, shared_path, start, results))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    start.set()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    lookups = sum(report["lookups"] for report in reports)
+    report = {
+        "hit_rate": round(sum(report["hits"] for report in reports) / lookups, 3) if lookups else None,
+        "generations": sum(report["misses"] for report in reports),
+        "answer_bytes_per_worker": round(sum(report["bytes"] for report in reports) / workers),
+    }
+    if shared_path:
+        with sqlite3.connect(shared_path) as db:
+            report["shared_answer_bytes"] = db.execute("SELECT SUM(LENGTH(value)) FROM store").fetchone()[0]
+    return report
+
+
+def main(worker_counts, seconds: float, cpu_per_char: float, target_ms: float, students: int):
+    cores = os.cpu_count() or 1
+    results = {"cores": cores, "target_p95_ms": target_ms, "scaling": {}, "sharing": {}}
+    for workers in worker_counts:
+        runs, best = [], 0
+        for sessions in (4, 8, 12, 16, 20):
+            report = run_load(workers, sessions, seconds, cpu_per_char)
+            runs.append(report)
+            if report["worst_p95_ms"] > target_ms:
+                break
+            best = report["sessions"]
+        results["scaling"][f"{workers}_workers"] = {
+            "max_sessions_under_target": best,
+            "sessions_per_core": round(best / min(workers, cores), 1),
+            "runs": runs,
+        }
+    for workers in worker_counts:
+        results["sharing"][f"{workers}_workers"] = {
+            "per_worker_cache": run_sharing(workers, students, shared=False),
+            "shared_cache": run_sharing(workers, students, shared=True),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2")
+    parser.add_argument("--seconds", type=float, default=8.0)
+    parser.add_argument("--cpu-per-char-ms", type=float, default=0.5)
+    parser.add_argument("--target-p95-ms", type=float, default=500.0)
+    parser.add_argument("--students", type=int, default=20)
+    args = parser.parse_args()
+    main([int(count) for count in args.workers.split(",")], args.seconds, args.cpu_per_char_ms / 1000,
+         args.target_p95_ms, args.students)
@@ -0,0 +1,65 @@
+"""
+Fake OpenAI-compatible streaming LLM server
+
+    python benchmarks/fake_llm_server.py --port 9101 --ttft 0.2 --slow-ratio 0.1 --slow-ttft 2.0
+
+Serves POST /v1/chat/completions as SSE with a configurable time-to-first-token
+distribution, so the LLM router can be exercised without real providers.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+
+def create_app(ttft: float = 0.2, jitter: float = 0.05, slow_ratio: float = 0.0, slow_ttft: float = 2.0,
+               tokens: int = 30, inter_token: float = 0.01, fail_ratio: float = 0.0, seed=None) -> web.Application:
+    rng = random.Random(seed)
+
+    async def chat_completions(request: web.Request):
+        await request.json()
+        if rng.random() < fail_ratio:
+            return web.json_response({"error": "overloaded"}, status=503)
+
+        delay = slow_ttft if rng.random() < slow_ratio else ttft
+        await asyncio.sleep(max(0.0, delay + rng.uniform(-jitter, jitter)))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        try:
+            await response.prepare(request)
+            for i in range(tokens):
+                chunk = {"choices": [{"delta": {"content": f"token{i} "}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(inter_token)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # Client cancelled (e.g. a hedged request that lost the race)
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+async def start_server(port: int, **kwargs) -> web.AppRunner:
+    runner = web.AppRunner(create_app(**kwargs))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--slow-ratio", type=float, default=0.0)
+    parser.add_argument("--slow-ttft", type=float, default=2.0)
+    parser.add_argument("--fail-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.ttft, args.jitter, args.slow_ratio, args.slow_ttft, fail_ratio=args.fail_ratio),
+                host="127.0.0.1", port=args.port)
@@ -0,0 +1,78 @@
+"""
+In-process fake providers for benchmarks (no network, deterministic timing)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from providers import LLMProvider, STTProvider, TTSProvider, register_provider  # noqa: E402
+
+
+@register_provider("stt", "fake")
+class FakeSTT(STTProvider):
+    """
+    Emits a final, speech_final transcript every `frames_per_turn` frames
+    """
+
+    def __init__(self, frames_per_turn: int = 50, text: str = "What is photosynthesis"):
+        self.frames_per_turn = frames_per_turn
+        self.text = text
+        self.frames = 0
+        self.turns = 0
+        self.on_transcript = None
+
+    async def start(self, on_transcript):
+        self.on_transcript = on_transcript
+
+    async def send(self, audio_bytes: bytes):
+        self.frames += 1
+        if self.frames % self.frames_per_turn == 0:
+            self.turns += 1
+            await self.on_transcript(f"{self.text} {self.turns}?", True, True)
+
+
+@register_provider("llm", "fake")
+class FakeLLM(LLMProvider):
+    """
+    Streams `tokens` words after `ttft` seconds, `inter_token` seconds apart
+    """
+
+    def __init__(self, tokens: int = 40, ttft: float = 0.0, inter_token: float = 0.0, name: str = "fake"):
+        self.tokens = tokens
+        self.ttft = ttft
+        self.inter_token = inter_token
+        self.provider_name = name
+
+    async def stream(self, prompt, system=None):
+        await asyncio.sleep(self.ttft)
+        for i in range(self.tokens):
+            if i and self.inter_token:
+                await asyncio.sleep(self.inter_token)
+            yield f"word{i}{'.' if i % 12 == 11 else ''} "
+
+
+@register_provider("tts", "fake")
+class FakeTTS(TTSProvider):
+    """
+    Yields `bytes_per_char` bytes of audio per input character in 4 KB chunks
+    """
+
+    def __init__(self, bytes_per_char: int = 200, latency: float = 0.0):
+        self.bytes_per_char = bytes_per_char
+        self.latency = latency
+
+    async def synthesize(self, text):
+        await asyncio.sleep(self.latency)
+        remaining = len(text) * self.bytes_per_char
+        while remaining > 0:
+            size = min(4096, remaining)
+            remaining -= size
+            yield b"\x00" * size
+
+
+class NoRetriever:
+    async def search(self, query):
+        return ""
@@ -0,0 +1,180 @@
+"""
+Conversation Memory
+Per-session history with a rolling summary plus a token-budgeted window of
+recent turns. Token counts are computed once per message when it is added and
+kept as a running total, so each turn costs O(1) bookkeeping and the rendered
+history never exceeds its budget no matter how long the session runs.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English)
+    """
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class Message:
+    role: str  # "student" or "tutor"
+    text: str
+    tokens: int
+
+
+class ConversationMemory:
+    """
+    Rolling summary + recent-turn window for one session.
+
+    Each message is cut to half of `window_tokens` when added, so the newest
+    student/tutor pair always fits; when the window exceeds `window_tokens`,
+    the oldest messages are folded into the summary. Folding is extractive
+    (first sentence of each message) and therefore free; an optional async
+    `summarizer` can rewrite the summary in the background without blocking
+    the turn.
+    """
+
+    def __init__(self, window_tokens: int = 600, summary_tokens: int = 200,
+                 summarizer: Optional[Callable[[str], Awaitable[str]]] = None):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.messages: Deque[Message] = deque()
+        self.window_total = 0
+        self.summary = ""
+        self.summary_total = 0
+        self.turns = 0
+        self._summary_task: Optional[asyncio.Task] = None
+        self._rendered: Optional[str] = None
+
+    def add(self, role: str, text: str):
+        text = text.strip()
+        if not text:
+            return
+        max_tokens = self.window_tokens // 2
+        if estimate_tokens(text) > max_tokens:
+            # A long answer must not evict the question it answers
+            text = _truncate(text, max_tokens * 4)
+        message = Message(role, text, estimate_tokens(text))
+        self.messages.append(message)
+        self.window_total += message.tokens
+        self._rendered = None
+
+        evicted = []
+        while self.window_total > self.window_tokens:
+            oldest = self.messages.popleft()
+            self.window_total -= oldest.tokens
+            evicted.append(oldest)
+        if evicted:
+            self._fold(evicted)
+
+    def add_turn(self, student_text: str, tutor_text: str):
+        self.turns += 1
+        self.add("student", student_text)
+        self.add("tutor", tutor_text)
+
+    def _fold(self, evicted):
+        notes = " ".join(f"{'Student' if m.role == 'student' else 'Tutor'}: {_first_sentence(m.text)}" for m in evicted)
+        self.summary = f"{self.summary} {notes}".strip()
+        self.summary_total = estimate_tokens(self.summary)
+        if self.summary_total > self.summary_tokens:
+            # Keep the most recent part of the summary within budget
+            self.summary = self.summary[-self.summary_tokens * 4:]
+            self.summary = self.summary[self.summary.find(" ") + 1:]
+            self.summary_total = estimate_tokens(self.summary)
+
+        if self.summarizer and (self._summary_task is None or self._summary_task.done()):
+            try:
+                self._summary_task = asyncio.get_running_loop().create_task(self._resummarize(self.summary))
+            except RuntimeError:
+                pass  # No running loop; keep the extractive summary
+
+    async def _resummarize(self, source: str):
+        try:
+            summary = (await self.summarizer(source)).strip()
+        except Exception as e:
+            logger.warning(f"⚠️ Conversation summarizer failed: {e}")
+            return
+        if summary and estimate_tokens(summary) <= self.summary_tokens and self.summary == source:
+            # Apply only if nothing was folded in meanwhile
+            self.summary = summary
+            self.summary_total = estimate_tokens(summary)
+            self._rendered = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.window_total + self.summary_total
+
+    def render(self) -> str:
+        """
+        History block for the prompt (empty for the first turn)
+        """
+        if self._rendered is None:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of earlier conversation: {self.summary}")
+            if self.messages:
+                lines = "\n".join(f"{'Student' if m.role == 'student' else 'Tutor'}: {m.text}" for m in self.messages)
+                parts.append(f"Recent conversation:\n{lines}")
+            self._rendered = "\n\n".join(parts)
+        return self._rendered
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    for mark in (". ", "? ", "! "):
+        index = text.find(mark)
+        if 0 < index < max_chars:
+            return text[:index + 1]
+    return text[:max_chars]
+
+
+class ConversationStore:
+    """
+    Process-wide session_id → ConversationMemory map with LRU and idle expiry,
+    so a client reconnecting with the same session_id keeps its history.
+    Connections without a session_id get a fresh memory that isn't kept.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 1800.0, **memory_kwargs):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_kwargs = memory_kwargs
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, session_id: Optional[str] = None) -> ConversationMemory:
+        if not session_id:
+            return ConversationMemory(**self.memory_kwargs)
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.pop(session_id, None)
+        memory = entry[1] if entry else ConversationMemory(**self.memory_kwargs)
+        self._sessions[session_id] = (now, memory)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return memory
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+conversation_store = ConversationStore()
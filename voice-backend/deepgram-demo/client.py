@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO
 try:
     import pyaudio
@@ -9,17 +9,18 @@ import websockets
 import os
 import json
 import threading
-import janus
-import queue
 import sys
 import time
-import requests
+from collections import deque
 from datetime import datetime
-from common.agent_functions import FUNCTION_MAP
+from common.agent_functions import FUNCTION_MAP, FunctionResultCache
 from common.agent_templates import AgentTemplates, AGENT_AUDIO_SAMPLE_RATE
 import logging
 from common.business_logic import MOCK_DATA
-from common.log_formatter import CustomFormatter
+from common.config import AGENT_EVENT_LOOPS, DOCS_INDEX, TTS_MODEL_CATALOG
+from common.docs_index import get_docs_index
+from common.log_formatter import CustomFormatter, SocketLogHandler, current_session
+from common.model_catalog import ModelCatalog, fetch_tts_models
 
 
 # Configure Flask and SocketIO
@@ -31,14 +32,67 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 # Create console handler with the custom formatter
+formatter = CustomFormatter()
 console_handler = logging.StreamHandler()
-console_handler.setFormatter(CustomFormatter(socketio=socketio))
+console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 
+# Mirror log lines to the browser, batched off the receive path
+socket_handler = SocketLogHandler(socketio)
+socket_handler.setFormatter(formatter)
+logger.addHandler(socket_handler)
+
 # Remove any existing handlers from the root logger to avoid duplicate messages
 logging.getLogger().handlers = []
 
 
+class FunctionLatency:
+    """Execution time samples per function name, with percentiles."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {}
+
+    def record(self, function_name, seconds):
+        samples = self._samples.setdefault(function_name, deque(maxlen=self.window))
+        samples.append(seconds)
+        return self.summary(function_name)
+
+    def summary(self, function_name):
+        ordered = sorted(self._samples.get(function_name, ()))
+        if not ordered:
+            return {"count": 0, "p50": None, "p95": None, "max": None}
+        return {
+            "count": len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            "max": ordered[-1],
+        }
+
+    def report(self):
+        return {name: self.summary(name) for name in self._samples}
+
+
+function_latency = FunctionLatency()
+
+# Fetched in the background at startup so the first page load doesn't wait on Deepgram
+tts_model_catalog = ModelCatalog(
+    lambda: fetch_tts_models(os.environ.get("DEEPGRAM_API_KEY")),
+    TTS_MODEL_CATALOG["path"],
+    ttl=TTS_MODEL_CATALOG["ttl"],
+)
+if tts_model_catalog.stale():
+    tts_model_catalog.refresh()
+
+# Load (or build) the docs index up front so the first "deepgram" call doesn't wait on it
+threading.Thread(
+    target=get_docs_index,
+    args=(DOCS_INDEX["docs_dir"], DOCS_INDEX["path"]),
+    name="docs-index",
+    daemon=True,
+).start()
+
+
 class VoiceAgent:
     def __init__(
         self,
@@ -46,12 +100,16 @@ class VoiceAgent:
         voiceModel="aura-2-thalia-en",
         voiceName="",
         browser_audio=False,
+        sid=None,
     ):
+        self.sid = sid  # Socket.IO session this agent talks to (None broadcasts)
         self.mic_audio_queue = asyncio.Queue()
         self.speaker = None
         self.ws = None
         self.is_running = False
         self.loop = None
+        self.future = None  # Set when the session is started on a shared loop
+        self.first_audio_logged = False
         self.audio = None
         self.stream = None
         self.input_device_id = None
@@ -59,38 +117,40 @@ class VoiceAgent:
         self.browser_audio = browser_audio  # For browser microphone input
         self.browser_output = browser_audio  # Use same setting for browser output
         self.agent_templates = AgentTemplates(industry, voiceModel, voiceName)
+        self.function_tasks = set()  # In-flight FunctionCallRequest handlers
+        self.function_cache = FunctionResultCache()  # Read-only results for this conversation
 
     def set_loop(self, loop):
         self.loop = loop
 
+    def enqueue_audio(self, data):
+        """Queue microphone audio from any thread without waiting on the loop."""
+        if self.is_running:
+            self.loop.call_soon_threadsafe(self.mic_audio_queue.put_nowait, data)
+
     async def setup(self):
         dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
         if dg_api_key is None:
             logger.error("DEEPGRAM_API_KEY env var not present")
             return False
 
-        settings = self.agent_templates.settings
-
         try:
             self.ws = await websockets.connect(
                 self.agent_templates.voice_agent_url,
                 extra_headers={"Authorization": f"Token {dg_api_key}"},
             )
-            await self.ws.send(json.dumps(settings))
+            # Pre-serialized and shared by every agent with the same industry and voice
+            await self.ws.send(self.agent_templates.settings_json)
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Deepgram: {e}")
             return False
 
     def audio_callback(self, input_data, frame_count, time_info, status_flag):
-        if self.is_running and self.loop and not self.loop.is_closed():
-            try:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.mic_audio_queue.put(input_data), self.loop
-                )
-                future.result(timeout=1)  # Add timeout to prevent blocking
-            except Exception as e:
-                logger.error(f"Error in audio callback: {e}")
+        try:
+            self.enqueue_audio(input_data)
+        except Exception as e:
+            logger.error(f"Error in audio callback: {e}")
         return (input_data, pyaudio.paContinue)
 
     async def start_microphone(self):
@@ -195,158 +255,77 @@ class VoiceAgent:
 
     async def receiver(self):
         try:
-            self.speaker = Speaker(browser_output=self.browser_output)
-            last_user_message = None
-            last_function_response_time = None
-            in_function_chain = False
+            self.speaker = Speaker(browser_output=self.browser_output, sid=self.sid)
+            self.last_user_message = None
+            self.last_function_response_time = None
+            self.in_function_chain = False
 
             with self.speaker:
                 async for message in self.ws:
                     if isinstance(message, str):
-                        logger.info(f"Server: {message}")
                         message_json = json.loads(message)
                         message_type = message_json.get("type")
+                        logger.info(
+                            "Server: %s",
+                            message,
+                            extra={
+                                "msg_type": message_type,
+                                "role": message_json.get("role"),
+                            },
+                        )
                         current_time = time.time()
 
                         if message_type == "UserStartedSpeaking":
                             self.speaker.stop()
+                        elif message_type == "AgentAudioDone":
+                            self.speaker.flush()
                         elif message_type == "ConversationText":
                             # Emit the conversation text to the client
-                            socketio.emit("conversation_update", message_json)
+                            socketio.emit(
+                                "conversation_update", message_json, to=self.sid
+                            )
 
                             if message_json.get("role") == "user":
-                                last_user_message = current_time
-                                in_function_chain = False
+                                self.last_user_message = current_time
+                                self.in_function_chain = False
                             elif message_json.get("role") == "assistant":
-                                in_function_chain = False
+                                self.in_function_chain = False
 
                         elif message_type == "FunctionCalling":
-                            if in_function_chain and last_function_response_time:
-                                latency = current_time - last_function_response_time
+                            if self.in_function_chain and self.last_function_response_time:
+                                latency = current_time - self.last_function_response_time
                                 logger.info(
-                                    f"LLM Decision Latency (chain): {latency:.3f}s"
+                                    f"LLM Decision Latency (chain): {latency:.3f}s",
+                                    extra={"category": "latency"},
                                 )
-                            elif last_user_message:
-                                latency = current_time - last_user_message
+                            elif self.last_user_message:
+                                latency = current_time - self.last_user_message
                                 logger.info(
-                                    f"LLM Decision Latency (initial): {latency:.3f}s"
+                                    f"LLM Decision Latency (initial): {latency:.3f}s",
+                                    extra={"category": "latency"},
                                 )
-                                in_function_chain = True
+                                self.in_function_chain = True
 
                         elif message_type == "FunctionCallRequest":
                             functions = message_json.get("functions", [])
-                            if len(functions) > 1:
-                                raise NotImplementedError(
-                                    "Multiple functions not supported"
-                                )
-                            function_name = functions[0].get("name")
-                            function_call_id = functions[0].get("id")
-                            parameters = json.loads(functions[0].get("arguments", {}))
-
-                            logger.info(f"Function call received: {function_name}")
-                            logger.info(f"Parameters: {parameters}")
-
-                            start_time = time.time()
-                            try:
-                                func = FUNCTION_MAP.get(function_name)
-                                if not func:
-                                    raise ValueError(
-                                        f"Function {function_name} not found"
-                                    )
-
-                                # Special handling for functions that need websocket
-                                if function_name in ["agent_filler", "end_call"]:
-                                    result = await func(self.ws, parameters)
-
-                                    if function_name == "agent_filler":
-                                        # Extract messages
-                                        inject_message = result["inject_message"]
-                                        function_response = result["function_response"]
-
-                                        # First send the function response
-                                        response = {
-                                            "type": "FunctionCallResponse",
-                                            "id": function_call_id,
-                                            "name": function_name,
-                                            "content": json.dumps(function_response),
-                                        }
-                                        await self.ws.send(json.dumps(response))
-                                        logger.info(
-                                            f"Function response sent: {json.dumps(function_response)}"
-                                        )
-
-                                        # Update the last function response time
-                                        last_function_response_time = time.time()
-                                        # Then just inject the message and continue
-                                        await inject_agent_message(
-                                            self.ws, inject_message
-                                        )
-                                        continue
-
-                                    elif function_name == "end_call":
-                                        # Extract messages
-                                        inject_message = result["inject_message"]
-                                        function_response = result["function_response"]
-                                        close_message = result["close_message"]
-
-                                        # First send the function response
-                                        response = {
-                                            "type": "FunctionCallResponse",
-                                            "id": function_call_id,
-                                            "name": function_name,
-                                            "content": json.dumps(function_response),
-                                        }
-                                        await self.ws.send(json.dumps(response))
-                                        logger.info(
-                                            f"Function response sent: {json.dumps(function_response)}"
-                                        )
-
-                                        # Update the last function response time
-                                        last_function_response_time = time.time()
-
-                                        # Then wait for farewell sequence to complete
-                                        await wait_for_farewell_completion(
-                                            self.ws, self.speaker, inject_message
-                                        )
-
-                                        # Finally send the close message and exit
-                                        logger.info(f"Sending ws close message")
-                                        await close_websocket_with_timeout(self.ws)
-                                        self.is_running = False
-                                        break
-                                else:
-                                    result = await func(parameters)
-
-                                execution_time = time.time() - start_time
-                                logger.info(
-                                    f"Function Execution Latency: {execution_time:.3f}s"
-                                )
+                            end_call = next(
+                                (f for f in functions if f.get("name") == "end_call"),
+                                None,
+                            )
+                            others = [f for f in functions if f is not end_call]
 
-                                # Send the response back
-                                response = {
-                                    "type": "FunctionCallResponse",
-                                    "id": function_call_id,
-                                    "name": function_name,
-                                    "content": json.dumps(result),
-                                }
-                                await self.ws.send(json.dumps(response))
-                                logger.info(
-                                    f"Function response sent: {json.dumps(result)}"
+                            # Run the calls in the background so audio keeps flowing
+                            if others:
+                                task = asyncio.create_task(
+                                    self.execute_function_calls(others)
                                 )
+                                self.function_tasks.add(task)
+                                task.add_done_callback(self.function_tasks.discard)
 
-                                # Update the last function response time
-                                last_function_response_time = time.time()
-
-                            except Exception as e:
-                                logger.error(f"Error executing function: {str(e)}")
-                                result = {"error": str(e)}
-                                response = {
-                                    "type": "FunctionCallResponse",
-                                    "id": function_call_id,
-                                    "name": function_name,
-                                    "content": json.dumps(result),
-                                }
-                                await self.ws.send(json.dumps(response))
+                            # end_call reads the farewell off the socket itself, so it runs inline
+                            if end_call:
+                                await self.end_call(end_call)
+                                break
 
                         elif message_type == "Welcome":
                             logger.info(
@@ -362,6 +341,113 @@ class VoiceAgent:
 
         except Exception as e:
             logger.error(f"Error in receiver: {e}")
+        finally:
+            for task in self.function_tasks:
+                task.cancel()
+
+    async def execute_function_calls(self, functions):
+        """Run every function of a FunctionCallRequest concurrently."""
+        # gather rather than a TaskGroup: one failed call must not cancel its
+        # siblings. This runs fire-and-forget, so failures (e.g. sending a
+        # response on a closed socket) are logged here or nobody sees them
+        results = await asyncio.gather(
+            *(self.execute_function_call(function) for function in functions),
+            return_exceptions=True,
+        )
+        for function, result in zip(functions, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"Error in function call {function.get('name')}: {result!r}"
+                )
+
+    async def send_function_response(self, function_call_id, function_name, result):
+        response = {
+            "type": "FunctionCallResponse",
+            "id": function_call_id,
+            "name": function_name,
+            "content": json.dumps(result),
+        }
+        await self.ws.send(json.dumps(response))
+        logger.info(
+            f"Function response sent: {json.dumps(result)}",
+            extra={"category": "function"},
+        )
+        # Update the last function response time
+        self.last_function_response_time = time.time()
+
+    async def execute_function_call(self, function):
+        """Execute one function call and send its response as soon as it's ready."""
+        function_name = function.get("name")
+        function_call_id = function.get("id")
+
+        try:
+            parameters = json.loads(function.get("arguments") or "{}")
+            logger.info(
+                f"Function call received: {function_name}",
+                extra={"category": "function"},
+            )
+            logger.info(
+                f"Parameters: {parameters}",
+                extra={"category": "function"},
+            )
+
+            start_time = time.time()
+            func = FUNCTION_MAP.get(function_name)
+            if not func:
+                raise ValueError(f"Function {function_name} not found")
+
+            if function_name == "agent_filler":
+                result = await func(self.ws, parameters)
+                # First send the function response, then inject the message
+                await self.send_function_response(
+                    function_call_id, function_name, result["function_response"]
+                )
+                await inject_agent_message(self.ws, result["inject_message"])
+                return
+
+            result, cached = await self.function_cache.call(
+                function_name, func, parameters
+            )
+            execution_time = time.time() - start_time
+            stats = function_latency.record(function_name, execution_time)
+            logger.info(
+                f"Function Execution Latency: {function_name} {execution_time:.3f}s"
+                f"{' (cached)' if cached else ''} "
+                f"(p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s, n={stats['count']})",
+                extra={"category": "latency"},
+            )
+            await self.send_function_response(function_call_id, function_name, result)
+
+        except Exception as e:
+            logger.error(f"Error executing function: {str(e)}")
+            await self.send_function_response(
+                function_call_id, function_name, {"error": str(e)}
+            )
+
+    async def end_call(self, function):
+        """Answer end_call, wait for the farewell to be spoken, then close the socket."""
+        function_name = function.get("name")
+        parameters = json.loads(function.get("arguments") or "{}")
+        logger.info(
+            f"Function call received: {function_name}",
+            extra={"category": "function"},
+        )
+        result = await FUNCTION_MAP[function_name](self.ws, parameters)
+
+        # First send the function response
+        await self.send_function_response(
+            function.get("id"), function_name, result["function_response"]
+        )
+
+        # Then wait for farewell sequence to complete
+        await wait_for_farewell_completion(
+            self.ws, self.speaker, result["inject_message"]
+        )
+
+        # Finally send the close message and exit
+        logger.info(f"Sending ws close message")
+        await close_websocket_with_timeout(self.ws)
+        self.is_running = False
 
     async def run(self):
         if not await self.setup():
@@ -386,88 +472,166 @@ class VoiceAgent:
                 await self.ws.close()
 
 
+class AudioRingBuffer:
+    """Byte ring buffer between the event loop (writer) and the PortAudio callback (reader)."""
+
+    def __init__(self, capacity):
+        self._data = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _grow(self, needed):
+        # Agent audio arrives faster than real time; keep everything that was sent
+        data = self._read(self._size)
+        self._data = bytearray(max(needed, 2 * len(self._data)))
+        self._data[: len(data)] = data
+        self._start = 0
+        self._size = len(data)
+
+    def write(self, chunk):
+        with self._lock:
+            if self._size + len(chunk) > len(self._data):
+                self._grow(self._size + len(chunk))
+            capacity = len(self._data)
+            end = (self._start + self._size) % capacity
+            first = min(len(chunk), capacity - end)
+            self._data[end : end + first] = chunk[:first]
+            self._data[: len(chunk) - first] = chunk[first:]
+            self._size += len(chunk)
+
+    def _read(self, count):
+        count = min(count, self._size)
+        first = min(count, len(self._data) - self._start)
+        data = bytes(self._data[self._start : self._start + first])
+        data += bytes(self._data[: count - first])
+        self._start = (self._start + count) % len(self._data)
+        self._size -= count
+        return data
+
+    def read(self, count):
+        """Return exactly `count` bytes, padded with silence when short."""
+        with self._lock:
+            data = self._read(count)
+        return data + bytes(count - len(data))
+
+    def clear(self):
+        with self._lock:
+            self._start = 0
+            self._size = 0
+
+
 class Speaker:
-    def __init__(self, agent_audio_sample_rate=None, browser_output=False):
-        self._queue = None
+    """Plays agent audio locally or forwards it to the browser.
+
+    Browser output needs no thread: chunks are coalesced into ~packet_ms
+    packets and emitted from the event loop, with a timer flushing the tail.
+    Local output is a PyAudio callback stream that pulls from a ring buffer.
+    """
+
+    def __init__(
+        self, agent_audio_sample_rate=None, browser_output=False, packet_ms=100, sid=None
+    ):
+        self.sid = sid  # Browser session to send audio to
         self._stream = None
-        self._thread = None
-        self._stop = None
+        self._audio = None
+        self._buffer = None
         self.agent_audio_sample_rate = (
-            agent_audio_sample_rate if agent_audio_sample_rate else 16000
+            agent_audio_sample_rate if agent_audio_sample_rate else AGENT_AUDIO_SAMPLE_RATE
         )
         self.browser_output = browser_output
+        self.packet_ms = packet_ms
+        # 16-bit mono: 2 bytes per sample
+        self.packet_bytes = 2 * (self.agent_audio_sample_rate * packet_ms // 1000)
+        self._pending = bytearray()
+        self._flush_handle = None
+        self._seq = 0  # Sequence counter for browser audio packets
 
     def __enter__(self):
-        audio = pyaudio.PyAudio()
-        self._stream = audio.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self.agent_audio_sample_rate,
-            input=False,
-            output=True,
-        )
-        self._queue = janus.Queue()
-        self._stop = threading.Event()
-        self._thread = threading.Thread(
-            target=_play,
-            args=(self._queue, self._stream, self._stop, self.browser_output),
-            daemon=True,
-        )
-        self._thread.start()
+        if not self.browser_output:
+            self._buffer = AudioRingBuffer(2 * self.agent_audio_sample_rate * 10)
+            self._audio = pyaudio.PyAudio()
+            self._stream = self._audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.agent_audio_sample_rate,
+                input=False,
+                output=True,
+                stream_callback=self._callback,
+            )
+        return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self._stop.set()
-        self._thread.join()
+        if self.browser_output:
+            self.flush()
+            return
+        self._stream.stop_stream()
         self._stream.close()
+        self._audio.terminate()
         self._stream = None
-        self._queue = None
-        self._thread = None
-        self._stop = None
+        self._audio = None
+        self._buffer = None
 
-    async def play(self, data):
-        return await self._queue.async_q.put(data)
+    def _callback(self, in_data, frame_count, time_info, status):
+        return (self._buffer.read(2 * frame_count), pyaudio.paContinue)
 
-    def stop(self):
-        if self._queue and self._queue.async_q:
-            while not self._queue.async_q.empty():
-                try:
-                    self._queue.async_q.get_nowait()
-                except janus.QueueEmpty:
-                    break
-
-
-def _play(audio_out, stream, stop, browser_output=False):
-    # Sequence counter for browser audio chunks
-    seq = 0
-    while not stop.is_set():
+    def _emit(self, data):
         try:
-            data = audio_out.sync_q.get(True, 0.05)
+            # Send audio data to browser clients with sample rate information
+            socketio.emit(
+                "audio_output",
+                {
+                    "audio": data,
+                    "sampleRate": self.agent_audio_sample_rate,
+                    "seq": self._seq,
+                },
+                to=self.sid,
+            )
+            self._seq += 1
+        except Exception as e:
+            logger.error(f"Error sending audio to browser: {e}")
+
+    def flush(self):
+        """Send whatever browser audio is still pending (whole samples only)."""
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        size = len(self._pending) & ~1
+        if size:
+            self._emit(bytes(self._pending[:size]))
+            del self._pending[:size]
 
-            # If browser output is enabled, send audio to browser via WebSocket
-            if browser_output and socketio:
-                try:
-                    # Send audio data to browser clients with sample rate information
-                    socketio.emit(
-                        "audio_output",
-                        {
-                            "audio": data,
-                            "sampleRate": AGENT_AUDIO_SAMPLE_RATE,
-                            "seq": seq,
-                        },
-                    )
-                    seq += 1
-                except Exception as e:
-                    logger.error(f"Error sending audio to browser: {e}")
+    async def play(self, data):
+        if not self.browser_output:
+            self._buffer.write(data)
+            return
 
-            elif not browser_output and stream is not None:
-                stream.write(data)
-        except queue.Empty:
-            pass
+        self._pending += data
+        while len(self._pending) >= self.packet_bytes:
+            self._emit(bytes(self._pending[: self.packet_bytes]))
+            del self._pending[: self.packet_bytes]
+        # Don't hold a short tail back for longer than one packet
+        if self._pending and not self._flush_handle:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.packet_ms / 1000, self.flush
+            )
+
+    def stop(self):
+        if self.browser_output:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._pending.clear()
+        elif self._buffer:
+            self._buffer.clear()
 
 
 async def inject_agent_message(ws, inject_message):
     """Simple helper to inject an agent message."""
-    logger.info(f"Sending InjectAgentMessage: {json.dumps(inject_message)}")
+    logger.info(
+        f"Sending InjectAgentMessage: {json.dumps(inject_message)}",
+        extra={"category": "agent"},
+    )
     await ws.send(json.dumps(inject_message))
 
 
@@ -494,7 +658,14 @@ async def wait_for_farewell_completion(ws, speaker, inject_message):
 
         try:
             message_json = json.loads(message)
-            logger.info(f"Server: {message}")
+            logger.info(
+                "Server: %s",
+                message,
+                extra={
+                    "msg_type": message_json.get("type"),
+                    "role": message_json.get("role"),
+                },
+            )
             if message_json.get("type") == "AgentStartedSpeaking" or (
                 message_json.get("type") == "ConversationText"
                 and message_json.get("role") == "assistant"
@@ -514,8 +685,16 @@ async def wait_for_farewell_completion(ws, speaker, inject_message):
 
         try:
             message_json = json.loads(message)
-            logger.info(f"Server: {message}")
+            logger.info(
+                "Server: %s",
+                message,
+                extra={
+                    "msg_type": message_json.get("type"),
+                    "role": message_json.get("role"),
+                },
+            )
             if message_json.get("type") == "AgentAudioDone":
+                speaker.flush()
                 audio_done = True
         except json.JSONDecodeError:
             continue
@@ -559,6 +738,12 @@ def audio_devices():
     return {"devices": devices}
 
 
+@app.route("/function-latency")
+def get_function_latency():
+    # Execution time percentiles (seconds) per function name
+    return jsonify(function_latency.report())
+
+
 @app.route("/industries")
 def get_industries():
     # Get available industries from AgentTemplates
@@ -567,107 +752,92 @@ def get_industries():
 
 @app.route("/tts-models")
 def get_tts_models():
-    # Get TTS models from Deepgram API
+    # Aura-2 TTS models, served from the in-memory catalog
     try:
-        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if not dg_api_key:
-            return jsonify({"error": "DEEPGRAM_API_KEY not set"}), 500
-
-        response = requests.get(
-            "https://api.deepgram.com/v1/models",
-            headers={"Authorization": f"Token {dg_api_key}"},
-        )
-
-        if response.status_code != 200:
-            return (
-                jsonify(
-                    {"error": f"API request failed with status {response.status_code}"}
-                ),
-                500,
-            )
-
-        data = response.json()
-
-        # Process TTS models
-        formatted_models = []
-
-        # Check if 'tts' key exists in the response
-        if "tts" in data:
-            # Filter for only aura-2 models
-            for model in data["tts"]:
-                if model.get("architecture") == "aura-2":
-                    # Extract language from languages array if available
-                    language = "en"
-                    if model.get("languages") and len(model.get("languages")) > 0:
-                        language = model["languages"][0]
-
-                    # Extract metadata for additional information
-                    metadata = model.get("metadata", {})
-                    accent = metadata.get("accent", "")
-                    tags = ", ".join(metadata.get("tags", []))
-
-                    formatted_models.append(
-                        {
-                            "name": model.get("canonical_name", model.get("name")),
-                            "display_name": model.get("name"),
-                            "language": language,
-                            "accent": accent,
-                            "tags": tags,
-                            "description": f"{accent} accent. {tags}",
-                        }
-                    )
-
-        return jsonify({"models": formatted_models})
+        return jsonify({"models": tts_model_catalog.models()})
     except Exception as e:
         logger.error(f"Error fetching TTS models: {e}")
         return jsonify({"error": str(e)}), 500
 
 
-voice_agent = None
-
-
-def run_async_voice_agent():
-    try:
-        # Create a new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Set the loop in the voice agent
-        voice_agent.set_loop(loop)
+class AgentLoop:
+    """An event loop running forever on its own thread, shared by many sessions."""
+
+    def __init__(self, name):
+        self.loop = asyncio.new_event_loop()
+        self.sessions = 0
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+
+class SessionRegistry:
+    """Voice agent sessions keyed by Socket.IO sid.
+
+    Agents run as tasks on a small pool of shared event loops (started on
+    first use), each new session going to the loop with the fewest sessions.
+    A session leaves the registry when its agent finishes or is stopped.
+    """
+
+    def __init__(self, loop_count=None):
+        self.loop_count = loop_count or os.cpu_count() or 1
+        self._loops = []
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, sid):
+        return self._sessions.get(sid)
+
+    def start(self, sid, agent):
+        """Run `agent` for `sid`; returns False if that sid already has one."""
+        with self._lock:
+            if sid in self._sessions:
+                return False
+            if not self._loops:
+                self._loops = [
+                    AgentLoop(f"voice-agent-loop-{i}") for i in range(self.loop_count)
+                ]
+            worker = min(self._loops, key=lambda worker: worker.sessions)
+            worker.sessions += 1
+            self._sessions[sid] = agent
+        agent.set_loop(worker.loop)
+        agent.future = asyncio.run_coroutine_threadsafe(
+            self._run(sid, agent, worker), worker.loop
+        )
+        return True
 
+    async def _run(self, sid, agent, worker):
+        current_session.set(sid)
         try:
-            # Run the voice agent
-            loop.run_until_complete(voice_agent.run())
+            await agent.run()
         except asyncio.CancelledError:
             logger.info("Voice agent task was cancelled")
         except Exception as e:
-            logger.error(f"Error in voice agent thread: {e}")
+            logger.error(f"Error in voice agent session: {e}")
         finally:
-            # Clean up the loop
-            try:
-                # Cancel all running tasks
-                pending = asyncio.all_tasks(loop)
-                for task in pending:
-                    task.cancel()
-
-                # Allow cancelled tasks to complete
-                if pending:
-                    loop.run_until_complete(
-                        asyncio.gather(*pending, return_exceptions=True)
-                    )
+            with self._lock:
+                worker.sessions -= 1
+                if self._sessions.get(sid) is agent:
+                    del self._sessions[sid]
 
-                loop.run_until_complete(loop.shutdown_asyncgens())
-            finally:
-                loop.close()
-    except Exception as e:
-        logger.error(f"Error in voice agent thread setup: {e}")
+    def stop(self, sid):
+        with self._lock:
+            agent = self._sessions.pop(sid, None)
+        if agent:
+            agent.is_running = False
+            # Cancels the agent's task on its loop; other sessions keep running
+            agent.future.cancel()
+
+
+sessions = SessionRegistry(AGENT_EVENT_LOOPS)
 
 
 @socketio.on("start_voice_agent")
 def handle_start_voice_agent(data=None):
-    global voice_agent
     logger.info(f"Starting voice agent with data: {data}")
-    if voice_agent is None:
+    if sessions.get(request.sid) is None:
         # Get industry from data or default to deepgram
         industry = data.get("industry", "deepgram") if data else "deepgram"
         voiceModel = (
@@ -683,32 +853,28 @@ def handle_start_voice_agent(data=None):
             voiceModel=voiceModel,
             voiceName=voiceName,
             browser_audio=browser_audio,
+            sid=request.sid,
         )
         if data:
             voice_agent.input_device_id = data.get("inputDeviceId")
             voice_agent.output_device_id = data.get("outputDeviceId")
-        # Start the voice agent in a background thread
-        socketio.start_background_task(target=run_async_voice_agent)
+        # Run the voice agent on one of the shared event loops
+        sessions.start(request.sid, voice_agent)
 
 
 @socketio.on("stop_voice_agent")
 def handle_stop_voice_agent():
-    global voice_agent
-    if voice_agent:
-        voice_agent.is_running = False
-        if voice_agent.loop and not voice_agent.loop.is_closed():
-            try:
-                # Cancel all running tasks
-                for task in asyncio.all_tasks(voice_agent.loop):
-                    task.cancel()
-            except Exception as e:
-                logger.error(f"Error stopping voice agent: {e}")
-        voice_agent = None
+    sessions.stop(request.sid)
+
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    sessions.stop(request.sid)
 
 
 @socketio.on("audio_data")
 def handle_audio_data(data):
-    global voice_agent
+    voice_agent = sessions.get(request.sid)
     if voice_agent and voice_agent.is_running and voice_agent.browser_audio:
         try:
             # Get the audio buffer and sample rate
@@ -726,7 +892,7 @@ def handle_audio_data(data):
                         audio_bytes = audio_buffer.tobytes()
 
                         # Log detailed info about the first chunk
-                        if not hasattr(handle_audio_data, "first_log_done"):
+                        if not voice_agent.first_audio_logged:
                             import numpy as np
 
                             # Peek at the data to verify it's in the right format
@@ -751,18 +917,14 @@ def handle_audio_data(data):
                             return
 
                     # Log the first time we receive audio data
-                    if not hasattr(handle_audio_data, "first_log_done"):
+                    if not voice_agent.first_audio_logged:
                         logger.info(
                             f"Received first browser audio chunk: {len(audio_bytes)} bytes, sample rate: {sample_rate}Hz"
                         )
-                        handle_audio_data.first_log_done = True
+                        voice_agent.first_audio_logged = True
 
                     # Put the audio data in the queue for processing
-                    if voice_agent.loop and not voice_agent.loop.is_closed():
-                        asyncio.run_coroutine_threadsafe(
-                            voice_agent.mic_audio_queue.put(audio_bytes),
-                            voice_agent.loop,
-                        )
+                    voice_agent.enqueue_audio(audio_bytes)
                 except Exception as e:
                     logger.error(
                         f"Error converting audio buffer: {e}, type: {type(audio_buffer)}"
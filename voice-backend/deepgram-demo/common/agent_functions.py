@@ -10,6 +10,8 @@ from .business_logic import (
     prepare_agent_filler_message,
     prepare_farewell_message,
 )
+from .config import DOCS_INDEX
+from .docs_index import get_docs_index
 
 
 async def find_customer(params):
@@ -69,6 +71,34 @@ async def check_availability(params):
     return result
 
 
+def _search_docs_index(query, limit):
+    index = get_docs_index(DOCS_INDEX["docs_dir"], DOCS_INDEX["path"])
+    return index.search(query, limit)
+
+
+async def search_docs(params):
+    """Search the Deepgram documentation for passages relevant to a question."""
+    query = params.get("query")
+    if not query:
+        return {"error": "query is required"}
+
+    limit = params.get("limit")
+    try:
+        limit = 3 if limit is None else int(limit)
+    except (TypeError, ValueError):
+        return {"error": "limit must be a number"}
+    if limit < 1:
+        return {"error": "limit must be at least 1"}
+    limit = min(limit, 10)
+
+    # The first call may wait for the index to load, and long posting lists
+    # take a few ms to score, so both stay off the event loop
+    results = await asyncio.to_thread(_search_docs_index, query, limit)
+    if not results:
+        return {"results": [], "message": "No matching documentation found"}
+    return {"results": results}
+
+
 async def agent_filler(websocket, params):
     """
     Handle agent filler messages while maintaining proper function call protocol.
@@ -271,6 +301,34 @@ FUNCTION_DEFINITIONS = [
     },
 ]
 
+# Only offered to the "deepgram" industry agent, which answers product questions
+SEARCH_DOCS_DEFINITION = {
+    "name": "search_docs",
+    "description": """Search Deepgram's product documentation. Use this function when:
+    - The user asks how a Deepgram product or feature works
+    - The user asks about supported languages, models, formats, or limits
+    - You are not sure about a detail before answering
+
+    Pass the user's question, or its key terms, as the query. Answer from the returned
+    passages in your own words; don't read them out verbatim.""",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "What to look up, e.g. 'diarization in streaming' or 'Aura voices available in Spanish'",
+            },
+            "limit": {
+                "type": "integer",
+                "minimum": 1,
+                "maximum": 10,
+                "description": "Number of passages to return (1-10). Optional - defaults to 3.",
+            },
+        },
+        "required": ["query"],
+    },
+}
+
 # Map function names to their implementations
 FUNCTION_MAP = {
     "find_customer": find_customer,
@@ -278,6 +336,94 @@ FUNCTION_MAP = {
     "get_orders": get_orders,
     "create_appointment": create_appointment,
     "check_availability": check_availability,
+    "search_docs": search_docs,
     "agent_filler": agent_filler,
     "end_call": end_call,
 }
+
+# Read-only functions whose results can be reused within a conversation
+CACHEABLE_FUNCTIONS = {
+    "find_customer",
+    "get_appointments",
+    "get_orders",
+    "check_availability",
+    "search_docs",
+}
+
+# Write function -> cached results it makes stale: (function, param that must
+# match the write's param of the same name, or None to drop every entry)
+INVALIDATIONS = {
+    "create_appointment": [
+        ("check_availability", None),
+        ("get_appointments", "customer_id"),
+    ],
+}
+
+
+class FunctionResultCache:
+    """Per-conversation cache of read-only function results.
+
+    Keyed by function name and canonicalized params, so the LLM re-calling
+    find_customer etc. doesn't pay the database latency again. Concurrent
+    identical calls share one execution. Error results are not kept, and
+    writes drop the entries listed in INVALIDATIONS once they complete.
+    Each invalidation bumps the key's generation, so a read that was in
+    flight across a write is returned to its caller but never kept.
+    """
+
+    def __init__(self):
+        self._entries = {}  # function name -> {params key: (params, future)}
+        self._generations = {}  # (function name, params key) -> invalidation count
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def canonical(params):
+        """Params with empty values dropped and string values trimmed, as a stable key."""
+        cleaned = {
+            key: value.strip() if isinstance(value, str) else value
+            for key, value in params.items()
+            if value not in (None, "")
+        }
+        return cleaned, json.dumps(cleaned, sort_keys=True, separators=(",", ":"))
+
+    async def call(self, function_name, func, params):
+        """Run `func(params)` through the cache; returns (result, cache_hit)."""
+        if function_name not in CACHEABLE_FUNCTIONS:
+            result = await func(params)
+            self.invalidate_after(function_name, params)
+            return result, False
+
+        params, key = self.canonical(params)
+        entries = self._entries.setdefault(function_name, {})
+        entry = entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return await asyncio.shield(entry[1]), True
+
+        self.misses += 1
+        generation = self._generations.get((function_name, key), 0)
+        future = asyncio.ensure_future(func(params))
+        entries[key] = (params, future)
+        try:
+            result = await asyncio.shield(future)
+        except BaseException:
+            if entries.get(key, (None, None))[1] is future:
+                del entries[key]
+            raise
+        stale = self._generations.get((function_name, key), 0) != generation
+        if stale or (isinstance(result, dict) and "error" in result):
+            if entries.get(key, (None, None))[1] is future:
+                del entries[key]
+        return result, False
+
+    def invalidate_after(self, function_name, params):
+        params, _ = self.canonical(params)
+        for target, match in INVALIDATIONS.get(function_name, ()):
+            entries = self._entries.get(target, {})
+            for key, (cached_params, _) in list(entries.items()):
+                if match is None or cached_params.get(match) == params.get(match):
+                    del entries[key]
+                    self._generations[(target, key)] = (
+                        self._generations.get((target, key), 0) + 1
+                    )
@@ -1,31 +1,13 @@
-from common.agent_functions import FUNCTION_DEFINITIONS
+from common.agent_functions import FUNCTION_DEFINITIONS, SEARCH_DOCS_DEFINITION
+from common.config import DOCS_INDEX
+from common.docs_index import get_docs_index
 from common.prompt_templates import DEEPGRAM_PROMPT_TEMPLATE, PROMPT_TEMPLATE
 from datetime import datetime
-import os
-import glob
-
-
-# Function to read documentation files from the deepgram-docs/fern/docs directory
-def read_documentation_files(docs_dir):
-    """Read all .mdx files in the specified directory and return their contents as a dictionary."""
-    documentation = {}
-    if not os.path.exists(docs_dir):
-        return documentation
-
-    # Get all .mdx files in the directory
-    mdx_files = glob.glob(os.path.join(docs_dir, "*.mdx"))
-
-    for file_path in mdx_files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                content = file.read()
-                # Use the filename without extension as the key
-                key = os.path.basename(file_path).replace(".mdx", "")
-                documentation[key] = content
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
-
-    return documentation
+from functools import lru_cache
+from types import MappingProxyType
+import json
+
+
 VOICE = "aura-2-thalia-en"
 
 # audio settings
@@ -87,13 +69,66 @@ AGENT_SETTINGS = {
 SETTINGS = {"type": "Settings", "audio": AUDIO_SETTINGS, "agent": AGENT_SETTINGS}
 
 
+def freeze(value):
+    """Read-only copy of nested settings: dicts become mappingproxies, lists tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=32)
+def industry_prompt(industry, docs_dir, current_date):
+    """Think prompt for an industry and whether it offers search_docs.
+
+    Cached per day, since the date is part of the prompt.
+    """
+    if industry != "deepgram":
+        return PROMPT_TEMPLATE.format(current_date=current_date), False
+
+    # deepgram has its own specific prompt based on the product documentation
+    doc_text = ""
+    # Indexed once per process; the agent pulls passages with search_docs
+    documentation = get_docs_index(docs_dir, DOCS_INDEX["path"])
+    if documentation.topics:
+        doc_text = "Available documentation topics: " + ", ".join(documentation.topics)
+        doc_text += "\nUse the search_docs function to look up details in these pages before answering."
+    return DEEPGRAM_PROMPT_TEMPLATE.format(documentation=doc_text), bool(documentation.topics)
+
+
+@lru_cache(maxsize=256)
+def compile_settings(voice_model, prompt, greeting, search_docs):
+    """Settings message for one agent, built from SETTINGS without changing it.
+
+    Returns the read-only settings and their JSON text, which is what gets
+    sent. Cached, so agents with the same industry and voice share both.
+    """
+    functions = FUNCTION_DEFINITIONS
+    if search_docs:
+        functions = FUNCTION_DEFINITIONS + [SEARCH_DOCS_DEFINITION]
+    settings = {
+        **SETTINGS,
+        "agent": {
+            **AGENT_SETTINGS,
+            "think": {**THINK_SETTINGS, "prompt": prompt, "functions": functions},
+            "speak": {
+                **SPEAK_SETTINGS,
+                "provider": {**SPEAK_SETTINGS["provider"], "model": voice_model},
+            },
+            "greeting": greeting,
+        },
+    }
+    return freeze(settings), json.dumps(settings)
+
+
 class AgentTemplates:
     def __init__(
         self,
         industry="deepgram",
         voiceModel="aura-2-thalia-en",
         voiceName="",
-        docs_dir="deepgram-docs/fern/docs",
+        docs_dir=None,
     ):
         self.voiceModel = voiceModel
         if voiceName == "":
@@ -109,7 +144,6 @@ class AgentTemplates:
         self.industry = industry
 
         self.voice_agent_url = VOICE_AGENT_URL
-        self.settings = SETTINGS
         self.user_audio_sample_rate = USER_AUDIO_SAMPLE_RATE
         self.user_audio_secs_per_chunk = USER_AUDIO_SECS_PER_CHUNK
         self.user_audio_samples_per_chunk = USER_AUDIO_SAMPLES_PER_CHUNK
@@ -119,18 +153,6 @@ class AgentTemplates:
         match self.industry:
             case "deepgram":
                 self.deepgram()
-
-                # Format documentation for the prompt
-                doc_text = ""
-                # Read documentation files
-                self.documentation = read_documentation_files(docs_dir)
-
-                if self.documentation:
-                    doc_text = "Available documentation topics: " + ", ".join(
-                        self.documentation.keys()
-                    )
-
-                self.prompt = DEEPGRAM_PROMPT_TEMPLATE.format(documentation=doc_text)
             case "healthcare":
                 self.healthcare()
             case "banking":
@@ -142,17 +164,18 @@ class AgentTemplates:
             case "travel":
                 self.travel()
 
-        if self.industry != "deepgram":
-            # deepgram has its own specific prompt based on the product documentation
-            self.prompt = PROMPT_TEMPLATE.format(
-                current_date=datetime.now().strftime("%A, %B %d, %Y")
-            )
+        self.prompt, self.search_docs = industry_prompt(
+            self.industry,
+            docs_dir or DOCS_INDEX["docs_dir"],
+            datetime.now().strftime("%A, %B %d, %Y"),
+        )
 
         self.first_message = f"Hello! I'm {self.voiceName} from {self.company} customer service. {self.capabilities} How can I help you today?"
 
-        self.settings["agent"]["speak"]["provider"]["model"] = self.voiceModel
-        self.settings["agent"]["think"]["prompt"] = self.prompt
-        self.settings["agent"]["greeting"] = self.first_message
+        # Shared with every other agent of the same industry and voice; never mutate
+        self.settings, self.settings_json = compile_settings(
+            self.voiceModel, self.prompt, self.first_message, self.search_docs
+        )
 
         self.prompt = self.personality + "\n\n" + self.prompt
 
@@ -0,0 +1,104 @@
+from bisect import bisect_right, insort
+from datetime import datetime, time, timedelta
+
+OPEN_HOUR = 9  # First slot of the day starts at 9 AM
+CLOSE_HOUR = 17  # Last slot ends at 5 PM
+SLOT = timedelta(hours=1)
+SLOT_SECONDS = SLOT.total_seconds()
+EPOCH = datetime(1970, 1, 1)
+
+
+def candidate_slots(start, end):
+    """Business-hour slot start times from `start` to `end`, one hour apart.
+
+    Same slots as stepping hour by hour from `start` and keeping 9 AM-5 PM,
+    but built per day, so multi-month ranges skip the closed hours.
+    """
+    offset = timedelta(
+        minutes=start.minute, seconds=start.second, microseconds=start.microsecond
+    )
+    slots = []
+    day = datetime.combine(start.date(), time())
+    while day <= end:
+        for hour in range(OPEN_HOUR, CLOSE_HOUR):
+            slot = day + timedelta(hours=hour) + offset
+            if slot > end:
+                break
+            if slot >= start:
+                slots.append(slot)
+        day += timedelta(days=1)
+    return slots
+
+
+class AvailabilityEngine:
+    """Free appointment slots from sorted appointment start times.
+
+    Each appointment occupies one hour from its start, and a slot is free
+    when it overlaps none of them. Start times are kept as sorted seconds
+    from `base`. `starts` may be any sorted sequence (e.g. a memory-mapped
+    column) and is never copied; appointments added later go in a small
+    sorted list next to it. Each slot costs one bisect per list, and slot
+    times are computed as offsets from the start of their day, so only
+    free slots are turned back into datetimes and strings.
+    """
+
+    def __init__(self, starts=(), base=EPOCH):
+        self.base = base
+        self._starts = starts
+        self._added = []
+
+    @classmethod
+    def from_dates(cls, dates):
+        """Build from ISO date strings in any order."""
+        engine = cls()
+        engine._starts = sorted(engine._seconds(datetime.fromisoformat(d)) for d in dates)
+        return engine
+
+    def _seconds(self, moment):
+        return (moment - self.base).total_seconds()
+
+    def add(self, date):
+        insort(self._added, self._seconds(datetime.fromisoformat(date)))
+
+    def is_free(self, seconds):
+        """True when no appointment overlaps the hour starting `seconds` after base."""
+        span = SLOT_SECONDS
+        for starts in (self._starts, self._added):
+            # First appointment that ends after the slot starts
+            i = bisect_right(starts, seconds - span)
+            if i < len(starts) and starts[i] < seconds + span:
+                return False
+        return True
+
+    def free_slots(self, start, end):
+        """ISO start times of the free slots between `start` and `end`."""
+        offset = timedelta(
+            minutes=start.minute, seconds=start.second, microseconds=start.microsecond
+        )
+        span = SLOT_SECONDS
+        starts, count = self._starts, len(self._starts)
+        free = []
+        day = datetime.combine(start.date(), time())
+        while day <= end:
+            first = self._seconds(day + offset)
+            partial = day.date() in (start.date(), end.date())
+            for hour in range(OPEN_HOUR, CLOSE_HOUR):
+                slot = None
+                if partial:
+                    # First/last day: check the bounds on real datetimes
+                    slot = day + timedelta(hours=hour) + offset
+                    if slot < start:
+                        continue
+                    if slot > end:
+                        break
+                seconds = first + hour * span
+                # Inlined is_free() for the main list; it runs once per slot
+                i = bisect_right(starts, seconds - span)
+                if i < count and starts[i] < seconds + span:
+                    continue
+                if self._added and not self.is_free(seconds):
+                    continue
+                slot = slot or day + timedelta(hours=hour) + offset
+                free.append(slot.isoformat())
+            day += timedelta(days=1)
+        return free
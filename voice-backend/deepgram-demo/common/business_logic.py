@@ -1,145 +1,79 @@
 import asyncio
-import json
-from datetime import datetime, timedelta
-import random
-from common.config import ARTIFICIAL_DELAY, MOCK_DATA_SIZE
-import pathlib
-
-
-def save_mock_data(data):
-    """Save mock data to a timestamped file in mock_data_outputs directory."""
-    # Create mock_data_outputs directory if it doesn't exist
-    output_dir = pathlib.Path("mock_data_outputs")
-    output_dir.mkdir(exist_ok=True)
-
-    # Clean up old mock data files
-    cleanup_mock_data_files(output_dir)
-
-    # Generate timestamp for filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = output_dir / f"mock_data_{timestamp}.json"
-
-    # Save the data with pretty printing
-    with open(output_file, "w") as f:
-        json.dump(data, f, indent=2)
-
-    print(f"\nMock data saved to: {output_file}")
-
-
-def cleanup_mock_data_files(output_dir):
-    """Remove all existing mock data files in the output directory."""
-    for file in output_dir.glob("mock_data_*.json"):
-        try:
-            file.unlink()
-        except Exception as e:
-            print(f"Warning: Could not delete {file}: {e}")
-
-
-# Mock data generation
-def generate_mock_data():
-    customers = []
-    appointments = []
-    orders = []
-
-    # Generate customers
-    for i in range(MOCK_DATA_SIZE["customers"]):
-        customer = {
-            "id": f"CUST{i:04d}",
-            "name": f"Customer {i}",
-            "phone": f"+1555{i:07d}",
-            "email": f"customer{i}@example.com",
-            "joined_date": (
-                datetime.now() - timedelta(days=random.randint(0, 7))
-            ).isoformat(),
-        }
-        customers.append(customer)
-
-    # Generate appointments
-    for i in range(MOCK_DATA_SIZE["appointments"]):
-        customer = random.choice(customers)
-        appointment = {
-            "id": f"APT{i:04d}",
-            "customer_id": customer["id"],
-            "customer_name": customer["name"],
-            "date": (datetime.now() + timedelta(days=random.randint(0, 7))).isoformat(),
-            "service": random.choice(
-                ["Consultation", "Follow-up", "Review", "Planning"]
-            ),
-            "status": random.choice(["Scheduled", "Completed", "Cancelled"]),
-        }
-        appointments.append(appointment)
-
-    # Generate orders
-    for i in range(MOCK_DATA_SIZE["orders"]):
-        customer = random.choice(customers)
-        order = {
-            "id": f"ORD{i:04d}",
-            "customer_id": customer["id"],
-            "customer_name": customer["name"],
-            "date": (datetime.now() - timedelta(days=random.randint(0, 7))).isoformat(),
-            "items": random.randint(1, 5),
-            "total": round(random.uniform(10.0, 500.0), 2),
-            "status": random.choice(["Pending", "Shipped", "Delivered", "Cancelled"]),
-        }
-        orders.append(order)
-
-    # Format sample data for display
-    sample_data = []
-    sample_customers = random.sample(customers, 3)
-    for customer in sample_customers:
-        customer_data = {
-            "Customer": customer["name"],
-            "ID": customer["id"],
-            "Phone": customer["phone"],
-            "Email": customer["email"],
-            "Appointments": [],
-            "Orders": [],
-        }
-
-        # Add appointments
-        customer_appointments = [
-            a for a in appointments if a["customer_id"] == customer["id"]
-        ]
-        for apt in customer_appointments[:2]:
-            customer_data["Appointments"].append(
-                {
-                    "Service": apt["service"],
-                    "Date": apt["date"][:10],
-                    "Status": apt["status"],
-                }
-            )
-
-        # Add orders
-        customer_orders = [o for o in orders if o["customer_id"] == customer["id"]]
-        for order in customer_orders[:2]:
-            customer_data["Orders"].append(
-                {
-                    "ID": order["id"],
-                    "Total": f"${order['total']}",
-                    "Status": order["status"],
-                    "Date": order["date"][:10],
-                    "# Items": order["items"],
-                }
-            )
-
-        sample_data.append(customer_data)
-
-    # Create data object
-    mock_data = {
-        "customers": customers,
-        "appointments": appointments,
-        "orders": orders,
-        "sample_data": sample_data,
+from datetime import datetime
+from common.config import (
+    ARTIFICIAL_DELAY,
+    MOCK_DATA_SIZE,
+    MOCK_DATA_SEED,
+    DATABASE_CONFIG,
+)
+from common.availability import SLOT, AvailabilityEngine
+from common.database import BusinessDatabase
+from common.mock_dataset import dataset_key, load_mock_dataset
+
+
+def format_sample_customer(customer, appointments, orders):
+    """Shape one customer and their first appointments/orders for the UI table."""
+    customer_data = {
+        "Customer": customer["name"],
+        "ID": customer["id"],
+        "Phone": customer["phone"],
+        "Email": customer["email"],
+        "Appointments": [],
+        "Orders": [],
     }
 
-    # Save the mock data
-    save_mock_data(mock_data)
+    # Add appointments
+    for apt in appointments[:2]:
+        customer_data["Appointments"].append(
+            {
+                "Service": apt["service"],
+                "Date": apt["date"][:10],
+                "Status": apt["status"],
+            }
+        )
 
-    return mock_data
+    # Add orders
+    for order in orders[:2]:
+        customer_data["Orders"].append(
+            {
+                "ID": order["id"],
+                "Total": f"${order['total']}",
+                "Status": order["status"],
+                "Date": order["date"][:10],
+                "# Items": order["items"],
+            }
+        )
 
+    return customer_data
+
+
+# Initialize data: the cached mock dataset (generated on first run), served from
+# memory or, when DATABASE_CONFIG["enable"] is set, loaded into SQLite. Dates are
+# relative to the load time, so the SQLite copy is re-seeded when the sizes, the
+# seed or the day change, like the in-memory dataset on every start
+DATABASE = None
+MOCK_DATASET = None
+if DATABASE_CONFIG["enable"]:
+    DATABASE = BusinessDatabase(DATABASE_CONFIG["path"], DATABASE_CONFIG["pool_size"])
+    key = f"{dataset_key(MOCK_DATA_SIZE, MOCK_DATA_SEED)}@{datetime.now().date().isoformat()}"
+    if DATABASE.dataset_key() != key:
+        dataset = load_mock_dataset(MOCK_DATA_SIZE, MOCK_DATA_SEED)
+        DATABASE.seed(
+            {
+                "customers": dataset.customers,
+                "appointments": dataset.appointments,
+                "orders": dataset.orders,
+            },
+            key,
+        )
+    sample_customers = DATABASE.random_customers(3)
+else:
+    MOCK_DATASET = load_mock_dataset(MOCK_DATA_SIZE, MOCK_DATA_SEED)
+    sample_customers = MOCK_DATASET.sample_customers(3)
 
-# Initialize mock data
-MOCK_DATA = generate_mock_data()
+MOCK_DATA = {
+    "sample_data": [format_sample_customer(*rows) for rows in sample_customers]
+}
 
 
 async def simulate_delay(delay_type):
@@ -151,17 +85,18 @@ async def get_customer(phone=None, email=None, customer_id=None):
     """Look up a customer by phone, email, or ID."""
     await simulate_delay("database")
 
-    if phone:
-        customer = next(
-            (c for c in MOCK_DATA["customers"] if c["phone"] == phone), None
-        )
-    elif email:
-        customer = next(
-            (c for c in MOCK_DATA["customers"] if c["email"] == email), None
-        )
-    elif customer_id:
-        customer = next(
-            (c for c in MOCK_DATA["customers"] if c["id"] == customer_id), None
+    if DATABASE:
+        if phone:
+            customer = await DATABASE.get_customer("phone", phone)
+        elif email:
+            customer = await DATABASE.get_customer("email", email)
+        elif customer_id:
+            customer = await DATABASE.get_customer("id", customer_id)
+        else:
+            return {"error": "No search criteria provided"}
+    elif phone or email or customer_id:
+        customer = MOCK_DATASET.find_customer(
+            phone=phone, email=email, customer_id=customer_id
         )
     else:
         return {"error": "No search criteria provided"}
@@ -173,9 +108,10 @@ async def get_customer_appointments(customer_id):
     """Get all appointments for a customer."""
     await simulate_delay("database")
 
-    appointments = [
-        a for a in MOCK_DATA["appointments"] if a["customer_id"] == customer_id
-    ]
+    if DATABASE:
+        appointments = await DATABASE.get_customer_appointments(customer_id)
+    else:
+        appointments = MOCK_DATASET.appointments_for(customer_id)
     return {"customer_id": customer_id, "appointments": appointments}
 
 
@@ -183,7 +119,10 @@ async def get_customer_orders(customer_id):
     """Get all orders for a customer."""
     await simulate_delay("database")
 
-    orders = [o for o in MOCK_DATA["orders"] if o["customer_id"] == customer_id]
+    if DATABASE:
+        orders = await DATABASE.get_customer_orders(customer_id)
+    else:
+        orders = MOCK_DATASET.orders_for(customer_id)
     return {"customer_id": customer_id, "orders": orders}
 
 
@@ -197,9 +136,7 @@ async def schedule_appointment(customer_id, date, service):
         return customer
 
     # Create new appointment
-    appointment_id = f"APT{len(MOCK_DATA['appointments']):04d}"
     appointment = {
-        "id": appointment_id,
         "customer_id": customer_id,
         "customer_name": customer["name"],
         "date": date,
@@ -207,7 +144,11 @@ async def schedule_appointment(customer_id, date, service):
         "status": "Scheduled",
     }
 
-    MOCK_DATA["appointments"].append(appointment)
+    if DATABASE:
+        return await DATABASE.add_appointment(appointment)
+
+    appointment = {"id": f"APT{len(MOCK_DATASET.appointments):04d}", **appointment}
+    MOCK_DATASET.add_appointment(appointment)
     return appointment
 
 
@@ -219,17 +160,15 @@ async def get_available_appointment_slots(start_date, end_date):
     start = datetime.fromisoformat(start_date)
     end = datetime.fromisoformat(end_date)
 
-    # Generate available slots (9 AM to 5 PM, 1-hour slots)
-    slots = []
-    current = start
-    while current <= end:
-        if current.hour >= 9 and current.hour < 17:
-            slot_time = current.isoformat()
-            # Check if slot is already taken
-            taken = any(a["date"] == slot_time for a in MOCK_DATA["appointments"])
-            if not taken:
-                slots.append(slot_time)
-        current += timedelta(hours=1)
+    # Free 1-hour slots from 9 AM to 5 PM that don't overlap an appointment
+    if DATABASE:
+        dates = await DATABASE.appointment_dates(
+            (start - SLOT).isoformat(), (end + SLOT).isoformat()
+        )
+        availability = AvailabilityEngine.from_dates(dates)
+    else:
+        availability = MOCK_DATASET.availability
+    slots = availability.free_slots(start, end)
 
     return {"available_slots": slots}
 
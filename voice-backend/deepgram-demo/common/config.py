@@ -11,10 +11,34 @@ MOCK_DATA_SIZE = {
     "appointments": 500,
     "orders": 2000
 }
+# Seed for the generated mock data; the dataset is cached in mock_data_outputs/
+# and only regenerated when MOCK_DATA_SIZE or the seed changes
+MOCK_DATA_SEED = 42
 
 # Database settings (if using SQLite)
-# Not in use in this reference implementation but left as an example for how to potentially integrate with a DB
+# When enabled, business_logic reads and writes a SQLite file (re-seeded from the mock data when it or the day changes)
 DATABASE_CONFIG = {
     "path": "business_data.db",
-    "enable": False  # Set to True to use actual SQLite instead of mock data
-} 
\ No newline at end of file
+    "enable": False,  # Set to True to use actual SQLite instead of mock data
+    "pool_size": 4  # Read connections; queries run on worker threads off the event loop
+} 
+
+# Documentation search for the "deepgram" industry agent (search_docs function)
+# The .mdx pages in `docs_dir` are indexed once and the index is cached at `path`;
+# it's rebuilt when a page is added, removed or modified
+DOCS_INDEX = {
+    "docs_dir": "deepgram-docs/fern/docs",
+    "path": "docs_index.bin"
+}
+
+# Deepgram TTS model catalog behind /tts-models
+# Kept in memory, refreshed in the background after `ttl` seconds, and saved to
+# `path` so the voice list is available at startup and offline
+TTS_MODEL_CATALOG = {
+    "path": "tts_models_cache.json",
+    "ttl": 3600
+}
+
+# Event loops shared by all voice agent sessions, each on its own thread.
+# Sessions go to the loop with the fewest of them; None uses one loop per CPU core.
+AGENT_EVENT_LOOPS = None
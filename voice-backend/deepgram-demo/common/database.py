@@ -0,0 +1,174 @@
+import asyncio
+import queue
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email TEXT NOT NULL,
+    joined_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    service TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    total REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (phone);
+CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email);
+CREATE INDEX IF NOT EXISTS idx_appointments_customer ON appointments (customer_id);
+CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (date);
+CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders (customer_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Statements are fixed strings with ? placeholders so each pooled connection
+# compiles them once and reuses them from its statement cache.
+CUSTOMER_BY = {
+    "id": "SELECT * FROM customers WHERE id = ? LIMIT 1",
+    "phone": "SELECT * FROM customers WHERE phone = ? ORDER BY rowid LIMIT 1",
+    "email": "SELECT * FROM customers WHERE email = ? ORDER BY rowid LIMIT 1",
+}
+APPOINTMENTS_FOR = "SELECT * FROM appointments WHERE customer_id = ? ORDER BY rowid"
+ORDERS_FOR = "SELECT * FROM orders WHERE customer_id = ? ORDER BY rowid"
+DATES_BETWEEN = "SELECT date FROM appointments WHERE date > ? AND date < ?"
+NEXT_APPOINTMENT = "SELECT COALESCE(MAX(rowid), 0) FROM appointments"
+INSERT = {
+    "customers": "INSERT INTO customers VALUES (:id, :name, :phone, :email, :joined_date)",
+    "appointments": "INSERT INTO appointments VALUES "
+    "(:id, :customer_id, :customer_name, :date, :service, :status)",
+    "orders": "INSERT INTO orders VALUES "
+    "(:id, :customer_id, :customer_name, :date, :items, :total, :status)",
+}
+
+
+class BusinessDatabase:
+    """SQLite store for customers, appointments and orders.
+
+    Opens ``pool_size`` WAL-mode connections up front. Queries run on a
+    worker thread with a connection checked out of the pool, so the event
+    loop never blocks on disk I/O. Writes are serialized through one
+    connection.
+    """
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._write_lock = threading.Lock()
+        self._pool = queue.SimpleQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _fetch(self, sql, params):
+        with self._connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    async def fetch(self, sql, params=()):
+        """Run a read query off the event loop and return rows as dicts."""
+        return await asyncio.to_thread(self._fetch, sql, params)
+
+    def dataset_key(self):
+        """Key of the data the tables were seeded with, or None if never seeded."""
+        row = self._writer.execute(
+            "SELECT value FROM meta WHERE key = 'dataset'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def seed(self, data, key=None):
+        """Replace all rows with generated mock data in one transaction."""
+        with self._writer:
+            self._writer.execute("BEGIN")
+            for table, sql in INSERT.items():
+                self._writer.execute(f"DELETE FROM {table}")
+                self._writer.executemany(sql, data[table])
+            if key is not None:
+                self._writer.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('dataset', ?)", (key,)
+                )
+
+    def random_customers(self, count):
+        """Pick customers with their appointments and orders, for the UI sample table."""
+        (last,) = self._writer.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()
+        rowids = random.sample(range(1, last + 1), min(count, last))
+        customers = self._fetch(
+            f"SELECT * FROM customers WHERE rowid IN ({', '.join('?' * len(rowids))})",
+            rowids,
+        )
+        return [
+            (
+                customer,
+                self._fetch(APPOINTMENTS_FOR, (customer["id"],)),
+                self._fetch(ORDERS_FOR, (customer["id"],)),
+            )
+            for customer in customers
+        ]
+
+    async def get_customer(self, field, value):
+        rows = await self.fetch(CUSTOMER_BY[field], (value,))
+        return rows[0] if rows else None
+
+    async def get_customer_appointments(self, customer_id):
+        return await self.fetch(APPOINTMENTS_FOR, (customer_id,))
+
+    async def get_customer_orders(self, customer_id):
+        return await self.fetch(ORDERS_FOR, (customer_id,))
+
+    async def appointment_dates(self, after, before):
+        """Dates of appointments starting strictly between two ISO timestamps."""
+        rows = await self.fetch(DATES_BETWEEN, (after, before))
+        return [row["date"] for row in rows]
+
+    def _insert_appointment(self, appointment):
+        with self._write_lock, self._writer:
+            self._writer.execute("BEGIN IMMEDIATE")
+            (count,) = self._writer.execute(NEXT_APPOINTMENT).fetchone()
+            appointment = {"id": f"APT{count:04d}", **appointment}
+            self._writer.execute(INSERT["appointments"], appointment)
+        return appointment
+
+    async def add_appointment(self, appointment):
+        """Insert an appointment, assigning the next APT id; returns the stored row."""
+        return await asyncio.to_thread(self._insert_appointment, appointment)
+
+    def close(self):
+        self._writer.close()
+        while not self._pool.empty():
+            self._pool.get().close()
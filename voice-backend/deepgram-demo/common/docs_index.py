@@ -0,0 +1,240 @@
+import array
+import glob
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from collections import Counter
+
+FORMAT_VERSION = 1
+MAGIC = b"DOCSINDX"
+PASSAGE_WORDS = 150  # Long sections are split into passages of about this many words
+RESULT_CHARS = 600  # Passages returned to the agent are cut to this length
+K1, B = 1.2, 0.75  # BM25 parameters
+
+HEADING = re.compile(r"^(#{1,4})\s+(.*)$")
+TAG = re.compile(r"</?[A-Za-z][^>]*>")
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = set(
+    "a an and are as at be by can do does for from how i if in is it its of on or "
+    "so that the this to was what when where which who why will with you your".split()
+)
+
+
+def read_documentation_files(docs_dir):
+    """Read all .mdx files in the specified directory and return their contents as a dictionary."""
+    documentation = {}
+    if not os.path.exists(docs_dir):
+        return documentation
+
+    # Get all .mdx files in the directory
+    mdx_files = glob.glob(os.path.join(docs_dir, "*.mdx"))
+
+    for file_path in mdx_files:
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                content = file.read()
+                # Use the filename without extension as the key
+                key = os.path.basename(file_path).replace(".mdx", "")
+                documentation[key] = content
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+
+    return documentation
+
+
+def tokenize(text):
+    """Lowercase words without stopwords, plurals folded ("voices" -> "voice")."""
+    return [
+        token[:-1] if len(token) > 3 and token[-1] == "s" and token[-2] not in "su" else token
+        for token in TOKEN.findall(text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+def split_sections(text):
+    """(heading, body) pairs of an .mdx page, without frontmatter, imports or JSX tags."""
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        text = text[end + 4 :] if end != -1 else text
+    sections, heading, lines = [], "", []
+    for line in text.splitlines():
+        match = HEADING.match(line)
+        if match:
+            sections.append((heading, lines))
+            heading, lines = match.group(2).strip(), []
+        elif not line.startswith(("import ", "export ")):
+            lines.append(TAG.sub(" ", line))
+    sections.append((heading, lines))
+    return [
+        (heading, "\n".join(lines).strip())
+        for heading, lines in sections
+        if "".join(lines).strip()
+    ]
+
+
+def split_passages(body, size=PASSAGE_WORDS):
+    """Split a section body on paragraph breaks into passages of about `size` words."""
+    passages, current, count = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", body):
+        words = len(paragraph.split())
+        if current and count + words > size:
+            passages.append("\n\n".join(current))
+            current, count = [], 0
+        current.append(paragraph.strip())
+        count += words
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+def corpus_signature(docs_dir):
+    """Hash of the .mdx file names, sizes and modification times (no file reads)."""
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for file_path in sorted(glob.glob(os.path.join(docs_dir, "*.mdx"))):
+        stat = os.stat(file_path)
+        digest.update(f"{os.path.basename(file_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class DocsIndex:
+    """BM25 search over the sections of the documentation pages.
+
+    Pages are split into passages at headings (and paragraph breaks for
+    long sections); each passage is indexed with its page and section
+    titles. All postings live in one int32 array as ``passage, term
+    frequency`` pairs, and ``terms`` maps a term to the offset and count of
+    its pairs, so a cached index is read without building per-posting
+    objects.
+    """
+
+    def __init__(self, topics, passages, terms, postings, lengths, signature=None):
+        self.topics = topics
+        self.passages = passages  # [page, section, text]
+        self.terms = terms
+        self.postings = postings
+        self.lengths = lengths  # Indexed tokens per passage
+        self.signature = signature
+        self.average_length = sum(lengths) / len(lengths) if len(lengths) else 0
+
+    @classmethod
+    def build(cls, documentation, signature=None):
+        """Index a {page name: .mdx text} dict."""
+        passages, lengths, by_term = [], array.array("i"), {}
+        for page, text in sorted(documentation.items()):
+            title = page.replace("-", " ").replace("_", " ")
+            for section, body in split_sections(text):
+                for passage in split_passages(body):
+                    tokens = tokenize(f"{title} {section} {passage}")
+                    for term, tf in Counter(tokens).items():
+                        by_term.setdefault(term, array.array("i")).extend((len(passages), tf))
+                    passages.append([page, section, passage])
+                    lengths.append(len(tokens))
+
+        terms, postings = {}, array.array("i")
+        for term, pairs in by_term.items():
+            terms[term] = [len(postings), len(pairs) // 2]
+            postings.extend(pairs)
+        return cls(sorted(documentation), passages, terms, postings, lengths, signature)
+
+    def write(self, path):
+        """Write a JSON header followed by the postings and lengths arrays."""
+        header = json.dumps(
+            {
+                "version": FORMAT_VERSION,
+                "signature": self.signature,
+                "topics": self.topics,
+                "passages": self.passages,
+                "terms": self.terms,
+                "postings": len(self.postings),
+            }
+        ).encode()
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(self.postings.tobytes())
+            f.write(self.lengths.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, path):
+        """Open a written index; the arrays stay memory-mapped."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a docs index file")
+        (header_size,) = struct.unpack_from("<I", mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(mm[start : start + header_size])
+        data = memoryview(mm)[start + header_size :].cast("i")
+        count = header["postings"]
+        return cls(
+            header["topics"],
+            header["passages"],
+            header["terms"],
+            data[:count],
+            data[count:],
+            header["signature"],
+        )
+
+    def search(self, query, limit=3):
+        """Best-matching passages for `query`, highest BM25 score first."""
+        count = len(self.passages)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            if term not in self.terms:
+                continue
+            offset, matches = self.terms[term]
+            idf = math.log(1 + (count - matches + 0.5) / (matches + 0.5))
+            pairs = iter(self.postings[offset : offset + 2 * matches])
+            for passage, tf in zip(pairs, pairs):
+                norm = K1 * (1 - B + B * self.lengths[passage] / self.average_length)
+                scores[passage] += idf * tf * (K1 + 1) / (tf + norm)
+        return [
+            {
+                "page": self.passages[passage][0],
+                "section": self.passages[passage][1],
+                "text": self.passages[passage][2][:RESULT_CHARS],
+            }
+            for passage, _ in scores.most_common(limit)
+        ]
+
+
+def load_docs_index(docs_dir, cache_path):
+    """Open the cached index for `docs_dir`, rebuilding it when the .mdx files changed."""
+    signature = corpus_signature(docs_dir)
+    try:
+        index = DocsIndex.read(cache_path)
+        # The signature covers FORMAT_VERSION too, so old formats are rebuilt
+        if index.signature == signature:
+            return index
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not read {cache_path}: {e}")
+
+    index = DocsIndex.build(read_documentation_files(docs_dir), signature)
+    if index.passages:
+        try:
+            index.write(cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save {cache_path}: {e}")
+    return index
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_docs_index(docs_dir, cache_path):
+    """The process-wide index for `docs_dir`, loaded on first use."""
+    with _indexes_lock:
+        if docs_dir not in _indexes:
+            _indexes[docs_dir] = load_docs_index(docs_dir, cache_path)
+        return _indexes[docs_dir]
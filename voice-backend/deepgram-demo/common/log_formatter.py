@@ -1,16 +1,24 @@
+import contextvars
 import logging
-import json
+import threading
+from collections import deque
 from datetime import datetime
 from flask_socketio import SocketIO
 
+# Socket.IO sid of the voice agent session the current task belongs to.
+# Records logged while it's set go only to that browser.
+current_session = contextvars.ContextVar("current_session", default=None)
+
 
 class CustomFormatter(
     logging.Formatter,
 ):
-    """Custom formatter to color-code log messages based on their content."""
+    """Custom formatter to color-code log messages based on structured fields.
 
-    def __init__(self, socketio: SocketIO = None):
-        self.socketio = socketio
+    Callers tag records with ``extra=``: server messages pass ``msg_type`` (and
+    ``role`` for ConversationText), other lines pass a ``category``. Untagged
+    records fall back to a keyword check on the unformatted message template.
+    """
 
     # ANSI escape codes for colors - using accessible palette
     COLORS = {
@@ -22,74 +30,107 @@ class CustomFormatter(
         "YELLOW": "\033[38;5;186m",  # Latency info
     }
 
-    def format(self, record):
-        # Default format string
-        format_str = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
+    FORMAT = "%(asctime)s.%(msecs)03d %(levelname)s: %(message)s"
+
+    # Server message type -> color
+    MESSAGE_TYPES = {
+        "UserStartedSpeaking": "BLUE",
+        "EndOfThought": "BLUE",
+        "AgentStartedSpeaking": "GREEN",
+        "AgentAudioDone": "GREEN",
+        "FunctionCalling": "VIOLET",
+        "FunctionCallRequest": "VIOLET",
+    }
+    ROLES = {"user": "BLUE", "assistant": "GREEN"}
 
-        # Default to white
-        color = self.COLORS["WHITE"]
+    # extra={"category": ...} -> color
+    CATEGORIES = {"function": "VIOLET", "agent": "GREEN", "latency": "YELLOW"}
+
+    # Fallback for records logged without structured fields
+    KEYWORDS = (
+        (("function response", "parameters", "function call"), "VIOLET"),
+        (("injectagentmessage",), "GREEN"),
+        (("decision latency", "function execution latency"), "YELLOW"),
+    )
+
+    def __init__(self):
+        super().__init__()
+        # One formatter per color, built once instead of per record
+        self._formatters = {
+            name: logging.Formatter(
+                code + self.FORMAT + self.COLORS["RESET"], datefmt="%H:%M:%S"
+            )
+            for name, code in self.COLORS.items()
+            if name != "RESET"
+        }
+
+    def color_for(self, record):
+        msg_type = getattr(record, "msg_type", None)
+        if msg_type is not None:
+            if msg_type == "ConversationText":
+                return self.ROLES.get(getattr(record, "role", None), "WHITE")
+            return self.MESSAGE_TYPES.get(msg_type, "WHITE")
+
+        category = getattr(record, "category", None)
+        if category is not None:
+            return self.CATEGORIES.get(category, "WHITE")
 
         msg = str(record.msg).lower()
+        if "server:" not in msg:
+            for phrases, color in self.KEYWORDS:
+                if any(phrase in msg for phrase in phrases):
+                    return color
+        return "WHITE"
 
-        # Check for JSON content
-        if "server:" in msg and "{" in msg:
-            try:
-                # Extract the JSON part
-                json_str = msg[msg.find("{") : msg.rfind("}") + 1]
-                data = json.loads(json_str)
-
-                # User/STT related messages
-                if data.get("type") in ["userstartedspeaking", "endofthought"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "user"
-                ):
-                    color = self.COLORS["BLUE"]
-
-                # Agent speaking/TTS related messages
-                elif data.get("type") in ["agentstartedspeaking", "agentaudiodone"] or (
-                    data.get("type") == "conversationtext"
-                    and data.get("role") == "assistant"
-                ):
-                    color = self.COLORS["GREEN"]
-
-                # Agent thinking/function calling
-                elif data.get("type") in ["functioncalling", "functioncallrequest"]:
-                    color = self.COLORS["VIOLET"]
-
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Non-JSON messages
-        else:
-            if any(
-                phrase in msg
-                for phrase in ["function response", "parameters", "function call"]
-            ):
-                color = self.COLORS["VIOLET"]
-            elif "injectagentmessage" in msg:
-                color = self.COLORS["GREEN"]
-            elif any(
-                phrase in msg
-                for phrase in ["decision latency", "function execution latency"]
-            ):
-                color = self.COLORS["YELLOW"]
-
-        # Apply the color to the format string
-        formatter = logging.Formatter(
-            color + format_str + self.COLORS["RESET"], datefmt="%H:%M:%S"
-        )
-        formatted_message = formatter.format(record)
-        # Emit the log message to the client with timestamp
-        if self.socketio:
+    def format(self, record):
+        return self._formatters[self.color_for(record)].format(record)
+
+
+class SocketLogHandler(logging.Handler):
+    """Forward log lines to the browser in batches from a background task.
+
+    ``emit`` only appends the record to a bounded buffer; records are formatted
+    and sent as one ``log_batch`` event per session every ``interval`` seconds.
+    Records logged outside a session are broadcast.
+    """
+
+    def __init__(self, socketio: SocketIO, interval=0.1, max_buffer=1000):
+        super().__init__()
+        self.socketio = socketio
+        self.interval = interval
+        self._buffer = deque(maxlen=max_buffer)
+        self._started = False
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        record.session = current_session.get()
+        self._buffer.append(record)
+        if not self._started:
+            with self._lock:
+                if not self._started:
+                    self._started = True
+                    self.socketio.start_background_task(self._flush_loop)
+
+    def flush(self):
+        batches = {}
+        while self._buffer:
+            record = self._buffer.popleft()
             try:
-                self.socketio.emit(
-                    "log_message",
+                batches.setdefault(record.session, []).append(
                     {
-                        "message": formatted_message,
-                        "timestamp": datetime.now().isoformat(),
-                    },
+                        "message": self.format(record),
+                        "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+                    }
                 )
+            except Exception:
+                self.handleError(record)
+        for session, batch in batches.items():
+            try:
+                self.socketio.emit("log_batch", batch, to=session)
             except Exception as e:
-                print(f"Error emitting log message: {e}")
+                print(f"Error emitting log messages: {e}")
 
-        return formatted_message
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            self.flush()
@@ -0,0 +1,312 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import random
+import struct
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from common.availability import AvailabilityEngine
+
+SERVICES = ["Consultation", "Follow-up", "Review", "Planning"]
+APPOINTMENT_STATUSES = ["Scheduled", "Completed", "Cancelled"]
+ORDER_STATUSES = ["Pending", "Shipped", "Delivered", "Cancelled"]
+
+FORMAT_VERSION = 1
+MAGIC = b"MOCKDATA"
+DAY = 86400
+
+
+def _layout(sizes):
+    """Column name -> (array typecode, length) for a dataset of the given sizes."""
+    customers, appointments, orders = (
+        sizes["customers"],
+        sizes["appointments"],
+        sizes["orders"],
+    )
+    return {
+        # Dates are stored as second offsets from "now" and rebuilt at load,
+        # so the data stays relative to the current day like freshly generated data
+        "customer_joined": ("i", customers),
+        "appointment_customer": ("i", appointments),
+        "appointment_date": ("i", appointments),
+        "appointment_service": ("B", appointments),
+        "appointment_status": ("B", appointments),
+        "order_customer": ("i", orders),
+        "order_date": ("i", orders),
+        "order_items": ("B", orders),
+        "order_cents": ("i", orders),
+        "order_status": ("B", orders),
+        # Per-customer row lists: rows of customer c are by_customer[start[c]:start[c + 1]]
+        "appointment_by_customer": ("i", appointments),
+        "appointment_start": ("i", customers + 1),
+        "order_by_customer": ("i", orders),
+        "order_start": ("i", customers + 1),
+        # Sorted appointment dates, for the availability engine
+        "appointment_dates_sorted": ("i", appointments),
+    }
+
+
+def _group_by_customer(owners, customers):
+    """Counting sort of row numbers by owning customer, keeping row order within a customer."""
+    start = array.array("i", bytes(4 * (customers + 1)))
+    for customer in owners:
+        start[customer + 1] += 1
+    for i in range(customers):
+        start[i + 1] += start[i]
+    rows = array.array("i", bytes(4 * len(owners)))
+    fill = array.array("i", start[:-1])
+    for row, customer in enumerate(owners):
+        rows[fill[customer]] = row
+        fill[customer] += 1
+    return rows, start
+
+
+def generate_columns(sizes, seed):
+    """Generate the mock customers, appointments and orders as typed columns."""
+    rng = random.Random(seed)
+    customers = sizes["customers"]
+    columns = {name: array.array(code) for name, (code, _) in _layout(sizes).items()}
+
+    for _ in range(customers):
+        columns["customer_joined"].append(-rng.randint(0, 7) * DAY)
+
+    for _ in range(sizes["appointments"]):
+        columns["appointment_customer"].append(rng.randrange(customers))
+        columns["appointment_date"].append(rng.randint(0, 7) * DAY)
+        columns["appointment_service"].append(rng.randrange(len(SERVICES)))
+        columns["appointment_status"].append(rng.randrange(len(APPOINTMENT_STATUSES)))
+
+    for _ in range(sizes["orders"]):
+        columns["order_customer"].append(rng.randrange(customers))
+        columns["order_date"].append(-rng.randint(0, 7) * DAY)
+        columns["order_items"].append(rng.randint(1, 5))
+        columns["order_cents"].append(round(rng.uniform(10.0, 500.0) * 100))
+        columns["order_status"].append(rng.randrange(len(ORDER_STATUSES)))
+
+    (
+        columns["appointment_by_customer"],
+        columns["appointment_start"],
+    ) = _group_by_customer(columns["appointment_customer"], customers)
+    columns["order_by_customer"], columns["order_start"] = _group_by_customer(
+        columns["order_customer"], customers
+    )
+    columns["appointment_dates_sorted"] = array.array(
+        "i", sorted(columns["appointment_date"])
+    )
+    return columns
+
+
+def write_dataset(path, sizes, seed, columns):
+    """Write columns to `path` as a header followed by 8-byte aligned raw arrays."""
+    layout, offset = {}, 0
+    for name, (code, length) in _layout(sizes).items():
+        layout[name] = [code, offset, length]
+        offset += -(-columns[name].itemsize * length // 8) * 8
+    header = json.dumps(
+        {"version": FORMAT_VERSION, "sizes": sizes, "seed": seed, "columns": layout}
+    ).encode()
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name in layout:
+            data = columns[name].tobytes()
+            f.write(data + bytes(-len(data) % 8))
+    os.replace(tmp_path, path)
+
+
+class _Rows(Sequence):
+    """Read-only list view that builds each record dict on access."""
+
+    def __init__(self, length, build):
+        self._length = length
+        self._build = build
+
+    def __len__(self):
+        return self._length()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._build(index)
+
+
+class MockDataset:
+    """Memory-mapped mock business data.
+
+    Columns are read straight from the mapped file and record dicts are only
+    built for rows a lookup returns, so opening the dataset costs the same at
+    any size. Customer ids, names, phones and emails are derived from the row
+    number, which makes them their own O(1) index. Appointments booked at
+    runtime are kept in memory on top of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a mock dataset file")
+        (header_size,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.meta = json.loads(self._mm[start : start + header_size])
+        data = memoryview(self._mm)[start + header_size :]
+        for name, (code, offset, length) in self.meta["columns"].items():
+            size = array.array(code).itemsize * length
+            setattr(self, name, data[offset : offset + size].cast(code))
+
+        self.now = datetime.now()
+        self.customer_count = self.meta["sizes"]["customers"]
+        self.appointment_count = self.meta["sizes"]["appointments"]
+        self._new_appointments = []
+        self._new_by_customer = {}
+        self.availability = AvailabilityEngine(self.appointment_dates_sorted, self.now)
+
+        self.customers = _Rows(lambda: self.customer_count, self.customer)
+        self.appointments = _Rows(
+            lambda: self.appointment_count + len(self._new_appointments),
+            self.appointment,
+        )
+        self.orders = _Rows(lambda: len(self.order_customer), self.order)
+
+    def _date(self, offset):
+        return (self.now + timedelta(seconds=offset)).isoformat()
+
+    def customer(self, i):
+        return {
+            "id": f"CUST{i:04d}",
+            "name": f"Customer {i}",
+            "phone": f"+1555{i:07d}",
+            "email": f"customer{i}@example.com",
+            "joined_date": self._date(self.customer_joined[i]),
+        }
+
+    def appointment(self, row):
+        if row >= self.appointment_count:
+            return self._new_appointments[row - self.appointment_count]
+        customer = self.appointment_customer[row]
+        return {
+            "id": f"APT{row:04d}",
+            "customer_id": f"CUST{customer:04d}",
+            "customer_name": f"Customer {customer}",
+            "date": self._date(self.appointment_date[row]),
+            "service": SERVICES[self.appointment_service[row]],
+            "status": APPOINTMENT_STATUSES[self.appointment_status[row]],
+        }
+
+    def order(self, row):
+        customer = self.order_customer[row]
+        return {
+            "id": f"ORD{row:04d}",
+            "customer_id": f"CUST{customer:04d}",
+            "customer_name": f"Customer {customer}",
+            "date": self._date(self.order_date[row]),
+            "items": self.order_items[row],
+            "total": self.order_cents[row] / 100,
+            "status": ORDER_STATUSES[self.order_status[row]],
+        }
+
+    def _customer_index(self, value, field, prefix, suffix=""):
+        """Row number of the customer whose `field` equals `value`, or None."""
+        if not (value and value.startswith(prefix) and value.endswith(suffix)):
+            return None
+        digits = value[len(prefix) : len(value) - len(suffix)]
+        if not (digits.isascii() and digits.isdigit()):
+            return None
+        i = int(digits)
+        if i >= self.customer_count or self.customer(i)[field] != value:
+            return None
+        return i
+
+    def find_customer(self, phone=None, email=None, customer_id=None):
+        if phone:
+            i = self._customer_index(phone, "phone", "+1555")
+        elif email:
+            i = self._customer_index(email, "email", "customer", "@example.com")
+        else:
+            i = self._customer_index(customer_id, "id", "CUST")
+        return self.customer(i) if i is not None else None
+
+    def appointments_for(self, customer_id):
+        i = self._customer_index(customer_id, "id", "CUST")
+        rows = []
+        if i is not None:
+            rows = [
+                self.appointment(row)
+                for row in self.appointment_by_customer[
+                    self.appointment_start[i] : self.appointment_start[i + 1]
+                ]
+            ]
+        return rows + self._new_by_customer.get(customer_id, [])
+
+    def orders_for(self, customer_id):
+        i = self._customer_index(customer_id, "id", "CUST")
+        if i is None:
+            return []
+        return [
+            self.order(row)
+            for row in self.order_by_customer[
+                self.order_start[i] : self.order_start[i + 1]
+            ]
+        ]
+
+    def add_appointment(self, appointment):
+        self._new_appointments.append(appointment)
+        self._new_by_customer.setdefault(appointment["customer_id"], []).append(
+            appointment
+        )
+        self.availability.add(appointment["date"])
+
+    def sample_customers(self, count):
+        """Pick `count` customers (stable for a given seed) with their appointments and orders."""
+        rng = random.Random(f"{self.meta['seed']}-sample")
+        picked = rng.sample(range(self.customer_count), min(count, self.customer_count))
+        return [
+            (
+                self.customer(i),
+                self.appointments_for(f"CUST{i:04d}"),
+                self.orders_for(f"CUST{i:04d}"),
+            )
+            for i in picked
+        ]
+
+
+def dataset_key(sizes, seed):
+    """Digest of everything the generated data depends on."""
+    key = json.dumps(
+        {"version": FORMAT_VERSION, "sizes": sizes, "seed": seed}, sort_keys=True
+    )
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def dataset_path(sizes, seed, output_dir="mock_data_outputs"):
+    return pathlib.Path(output_dir) / f"mock_data_{dataset_key(sizes, seed)}.bin"
+
+
+def cleanup_mock_data_files(output_dir):
+    """Remove all existing mock data files in the output directory."""
+    for file in output_dir.glob("mock_data_*"):
+        try:
+            file.unlink()
+        except Exception as e:
+            print(f"Warning: Could not delete {file}: {e}")
+
+
+def load_mock_dataset(sizes, seed, output_dir="mock_data_outputs"):
+    """Open the cached dataset for `sizes` and `seed`, generating it on first use."""
+    path = dataset_path(sizes, seed, output_dir)
+    if not path.exists():
+        path.parent.mkdir(exist_ok=True)
+        cleanup_mock_data_files(path.parent)
+        write_dataset(path, sizes, seed, generate_columns(sizes, seed))
+        print(f"\nMock data generated and cached at: {path}")
+    return MockDataset(path)
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+MODELS_URL = "https://api.deepgram.com/v1/models"
+
+
+def format_tts_models(data):
+    """Aura-2 voices from a /v1/models response, in the shape the voice picker uses."""
+    formatted_models = []
+    for model in data.get("tts", []):
+        if model.get("architecture") != "aura-2":
+            continue
+        # Extract language from languages array if available
+        language = "en"
+        if model.get("languages"):
+            language = model["languages"][0]
+
+        # Extract metadata for additional information
+        metadata = model.get("metadata", {})
+        accent = metadata.get("accent", "")
+        tags = ", ".join(metadata.get("tags", []))
+
+        formatted_models.append(
+            {
+                "name": model.get("canonical_name", model.get("name")),
+                "display_name": model.get("name"),
+                "language": language,
+                "accent": accent,
+                "tags": tags,
+                "description": f"{accent} accent. {tags}",
+            }
+        )
+    return formatted_models
+
+
+def fetch_tts_models(api_key, timeout=10):
+    """Download the model catalog from Deepgram and keep the aura-2 voices."""
+    if not api_key:
+        raise ValueError("DEEPGRAM_API_KEY not set")
+    response = requests.get(
+        MODELS_URL, headers={"Authorization": f"Token {api_key}"}, timeout=timeout
+    )
+    if response.status_code != 200:
+        raise Exception(f"API request failed with status {response.status_code}")
+    return format_tts_models(response.json())
+
+
+class ModelCatalog:
+    """TTS model list served from memory.
+
+    `fetch` runs on a background thread, at most one at a time. A copy is
+    fresh for `ttl` seconds; after that it's still served while a refresh
+    runs (stale-while-revalidate), and failed refreshes are retried after
+    `retry` seconds. The last good copy is saved to `path` and loaded on
+    startup, so the voice list also works offline.
+    """
+
+    def __init__(self, fetch, path, ttl=3600, retry=60, wait=10):
+        self._fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.retry = retry
+        self.wait = wait  # Seconds a request may wait when there's no copy yet
+        self._models = None
+        self._fetched_at = 0.0
+        self._failed_at = 0.0
+        self._error = None
+        self._refresh = None  # Event of the running refresh, if any
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self._models, self._fetched_at = cached["models"], cached["fetched_at"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read {self.path}: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": self._fetched_at, "models": self._models}, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Start a background fetch unless one is running; returns an Event set when it ends."""
+        with self._lock:
+            if self._refresh is None:
+                self._refresh = threading.Event()
+                threading.Thread(
+                    target=self._run_refresh,
+                    args=(self._refresh,),
+                    name="tts-model-catalog",
+                    daemon=True,
+                ).start()
+            return self._refresh
+
+    def _run_refresh(self, done):
+        try:
+            models = self._fetch()
+        except Exception as e:
+            self._error, self._failed_at = e, time.time()
+        else:
+            self._models, self._fetched_at, self._error = models, time.time(), None
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Warning: Could not save {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._refresh = None
+            done.set()
+
+    def stale(self):
+        """True when the copy is past `ttl` and a refresh may be tried."""
+        now = time.time()
+        return now - self._fetched_at >= self.ttl and now - self._failed_at >= self.retry
+
+    def models(self):
+        """The cached models, refreshed in the background once they're older than `ttl`.
+
+        Only blocks (for up to `wait` seconds) while there is no copy at all and
+        a fetch is running; raises the last fetch error if there's still nothing to serve.
+        """
+        done = self.refresh() if self.stale() else self._refresh
+        if self._models is None and done is not None:
+            done.wait(self.wait)
+        if self._models is None:
+            raise self._error or TimeoutError("TTS model catalog is still loading")
+        return self._models
@@ -0,0 +1,248 @@
+"""
+Deepgram Live Connection Pool
+Keeps a few live transcription sockets open (TLS + WebSocket handshake already
+done, kept alive with Deepgram KeepAlive messages) so a new session can start
+streaming immediately instead of waiting for the upstream handshake.
+
+Checked-out connections belong to the session and are finished by it; the
+pool refills in the background. When no session has checked one out for
+`idle_timeout`, the pool lets its connections expire and goes cold until the
+next session arrives.
+
+The Deepgram SDK is imported on first use (in a worker thread when the pool
+warms), so importing this module doesn't slow down app startup.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Options every pipeline streams with: raw PCM Int16 from the browser
+STANDARD_LIVE_OPTIONS = {
+    "model": "nova-2",
+    "language": "en-US",
+    "encoding": "linear16",
+    "sample_rate": 48000,
+    "channels": 1,
+    "interim_results": True,
+    "punctuate": True,
+    "smart_format": True,
+    "endpointing": 500,  # ms of silence before finalizing
+}
+
+_EVENTS = ("Open", "Transcript", "Metadata", "UtteranceEnd", "SpeechStarted", "Error", "Close")
+
+
+class PooledLiveConnection:
+    """
+    An already-started AsyncLiveClient whose handlers can be attached after start.
+
+    Mirrors the AsyncLiveClient surface the pipelines use (on/start/send/finish),
+    so `await connection.start(options)` on a warm connection returns immediately.
+    """
+
+    def __init__(self, client, options: Dict):
+        from deepgram import LiveTranscriptionEvents
+
+        self.client = client
+        self.options = options
+        self.handlers: Dict["LiveTranscriptionEvents", List[Callable]] = {}
+        self.opened_at = time.monotonic()
+        self.closed = False
+        for name in _EVENTS:
+            client.on(LiveTranscriptionEvents[name], self._dispatcher(LiveTranscriptionEvents[name]))
+
+    def _dispatcher(self, event):
+        closing = event.name in ("Close", "Error")
+
+        async def dispatch(_client, *args, **kwargs):
+            if closing:
+                self.closed = True
+            for handler in self.handlers.get(event, ()):
+                await handler(self, *args, **kwargs)
+        return dispatch
+
+    def on(self, event: "LiveTranscriptionEvents", handler: Callable):
+        self.handlers.setdefault(event, []).append(handler)
+        return handler
+
+    async def start(self, options=None, **kwargs) -> bool:
+        from deepgram import LiveOptions
+
+        if options is not None:
+            requested = options.to_dict() if isinstance(options, LiveOptions) else dict(options)
+            if requested != self.options:
+                logger.warning("⚠️ Pooled Deepgram connection was opened with different LiveOptions")
+        return self.is_alive()
+
+    async def send(self, data) -> bool:
+        return await self.client.send(data)
+
+    async def finish(self) -> bool:
+        self.closed = True
+        return await self.client.finish()
+
+    def is_alive(self) -> bool:
+        exit_event = getattr(self.client, "_exit_event", None)
+        socket = getattr(self.client, "_socket", None)
+        # A clean upstream close (1000) ends the SDK listener without signalling exit
+        return (not self.closed and socket is not None and getattr(socket, "open", True)
+                and not (exit_event is not None and exit_event.is_set()))
+
+
+class DeepgramLivePool:
+    """
+    Warm pool of live transcription connections opened with STANDARD_LIVE_OPTIONS
+    """
+
+    def __init__(self, api_key: Optional[str] = None, size: int = 2, idle_timeout: float = 300.0,
+                 options: Optional[Dict] = None, websocket_url: Optional[str] = None):
+        self.api_key = api_key
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.options = dict(options or STANDARD_LIVE_OPTIONS)
+        self.websocket_url = websocket_url
+        self._client: Optional["DeepgramClient"] = None
+        self._idle: Deque[PooledLiveConnection] = deque()
+        self._last_checkout = 0.0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+        self.counters = {"checkouts": 0, "warm": 0, "cold": 0, "opened": 0, "expired": 0, "dead": 0, "failed": 0}
+
+    def _deepgram(self) -> "DeepgramClient":
+        from deepgram import DeepgramClient, DeepgramClientOptions
+
+        if self._client is None:
+            self._client = DeepgramClient(self.api_key or os.getenv("DEEPGRAM_API_KEY"),
+                                          DeepgramClientOptions(options={"keepalive": "true"}))
+        return self._client
+
+    async def start(self):
+        """
+        Pre-open `size` connections and start the idle reaper
+        """
+        if self.size <= 0 or self._reaper_task is not None:
+            return
+        self._last_checkout = time.monotonic()
+        self._reaper_task = asyncio.create_task(self._reap(), name="deepgram-pool-reaper")
+        self._schedule_refill()
+        logger.info(f"🏊 Deepgram pool warming {self.size} connection(s)")
+
+    async def open(self, options: Optional[Dict] = None) -> PooledLiveConnection:
+        """
+        Open and start a new live connection (the slow path the pool hides)
+        """
+        from deepgram import LiveOptions
+
+        options = dict(options or self.options)
+        client = self._deepgram().listen.asynclive.v("1")
+        if self.websocket_url:
+            client.websocket_url = self.websocket_url
+        connection = PooledLiveConnection(client, options)
+        if not await client.start(LiveOptions(**options)):
+            raise Exception("Failed to start Deepgram connection")
+        self.counters["opened"] += 1
+        return connection
+
+    async def acquire(self, options: Optional[Dict] = None) -> PooledLiveConnection:
+        """
+        Check out a warm connection, or open one if the pool is empty or the options differ
+        """
+        self.counters["checkouts"] += 1
+        self._last_checkout = time.monotonic()
+        if options is None or dict(options) == self.options:
+            while self._idle:
+                connection = self._idle.popleft()
+                if connection.is_alive():
+                    self.counters["warm"] += 1
+                    self._schedule_refill()
+                    return connection
+                self.counters["dead"] += 1
+            self._schedule_refill()
+        self.counters["cold"] += 1
+        return await self.open(options)
+
+    def _schedule_refill(self):
+        if self.size > 0 and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.create_task(self._refill(), name="deepgram-pool-refill")
+
+    async def _refill(self):
+        if "deepgram" not in sys.modules:
+            await asyncio.to_thread(importlib.import_module, "deepgram")  # Keep the SDK import off the loop
+        while len(self._idle) < self.size:
+            if time.monotonic() - self._last_checkout > self.idle_timeout:
+                return  # No demand lately: stay cold
+            # Open the whole deficit concurrently so a burst of sessions refills in one handshake
+            missing = self.size - len(self._idle)
+            opened = await asyncio.gather(*(self.open() for _ in range(missing)), return_exceptions=True)
+            failed = [result for result in opened if isinstance(result, Exception)]
+            self._idle.extend(result for result in opened if not isinstance(result, Exception))
+            if failed:
+                self.counters["failed"] += len(failed)
+                logger.warning(f"⚠️ Deepgram pool refill failed: {failed[0]}")
+                await asyncio.sleep(5)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(min(30.0, self.idle_timeout / 4))
+            now = time.monotonic()
+            cold = now - self._last_checkout > self.idle_timeout
+            keep: Deque[PooledLiveConnection] = deque()
+            while self._idle:
+                connection = self._idle.popleft()
+                if not connection.is_alive():
+                    self.counters["dead"] += 1
+                elif cold or now - connection.opened_at > self.idle_timeout:
+                    self.counters["expired"] += 1
+                    await self._close(connection)
+                else:
+                    keep.append(connection)
+            self._idle = keep
+            self._schedule_refill()
+
+    @staticmethod
+    async def _close(connection: PooledLiveConnection):
+        try:
+            await connection.finish()
+        except Exception as e:
+            logger.debug(f"Deepgram pool close error: {e}")
+
+    async def close(self):
+        for task in (self._reaper_task, self._refill_task):
+            if task:
+                task.cancel()
+        self._reaper_task = self._refill_task = None
+        while self._idle:
+            await self._close(self._idle.popleft())
+
+    def stats(self) -> Dict:
+        return {**self.counters, "idle": len(self._idle), "size": self.size}
+
+
+deepgram_pool = DeepgramLivePool(
+    size=int(os.getenv("DEEPGRAM_POOL_SIZE", "2")),
+    idle_timeout=float(os.getenv("DEEPGRAM_POOL_IDLE_TIMEOUT", "300")),
+)
+
+
+def install_deepgram_pool(app, pool: DeepgramLivePool = deepgram_pool) -> DeepgramLivePool:
+    """
+    Warm the pool when the FastAPI app starts and close it on shutdown
+    """
+
+    @app.on_event("startup")
+    async def start_deepgram_pool():
+        await pool.start()
+
+    @app.on_event("shutdown")
+    async def close_deepgram_pool():
+        await pool.close()
+
+    return pool
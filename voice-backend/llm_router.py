@@ -0,0 +1,290 @@
+"""
+LLM Provider Router with hedged requests
+Sends the turn to the primary provider; if no first token arrives within the
+primary's p95 time-to-first-token, fires the same request at the next provider,
+streams whichever answers first and cancels the loser. Errors before the first
+token fail over immediately.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from providers import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class TTFTHistogram:
+    """
+    Log-bucketed time-to-first-token histogram (5 ms .. ~60 s).
+
+    Counts are halved once `max_samples` is exceeded so percentiles track
+    recent behaviour instead of the whole process lifetime.
+    """
+
+    BOUNDS = [0.005 * (1.25 ** i) for i in range(43)]
+
+    def __init__(self, max_samples: int = 500):
+        self.max_samples = max_samples
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.total += 1
+        if self.total > self.max_samples:
+            self.counts = [count // 2 for count in self.counts]
+            self.total = sum(self.counts)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.total:
+            return None
+        target = p * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        return {
+            "samples": self.total,
+            "p50_ms": _ms(self.percentile(0.50)),
+            "p95_ms": _ms(self.percentile(0.95)),
+            "p99_ms": _ms(self.percentile(0.99)),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class _Attempt:
+    """
+    One in-flight request to one provider, buffering its chunks in a queue
+    """
+
+    def __init__(self, label: str, provider: LLMProvider, prompt: str, system: Optional[str]):
+        self.label = label
+        self.provider = provider
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.started = time.perf_counter()
+        self.task = asyncio.create_task(self._run(prompt, system), name=f"llm:{label}")
+
+    async def _run(self, prompt: str, system: Optional[str]):
+        try:
+            async for chunk in self.provider.stream(prompt, system=system):
+                await self.queue.put(chunk)
+            await self.queue.put(_DONE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.queue.put(_Failure(e))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class LLMRouter(LLMProvider):
+    """
+    Hedging/failover router over an ordered list of LLM providers.
+
+    The router is itself an LLMProvider, so any pipeline that streams from a
+    provider can stream from a router instead.
+    """
+
+    provider_name = "router"
+
+    def __init__(self, providers: List[LLMProvider], hedge_percentile: float = 0.95,
+                 default_hedge_delay: float = 1.0, min_hedge_delay: float = 0.15,
+                 max_hedge_delay: float = 3.0, min_samples: int = 20, hedging: bool = True):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = providers
+        self.labels = [self._label(provider, index) for index, provider in enumerate(providers)]
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.hedging = hedging
+        self.histograms: Dict[str, TTFTHistogram] = {label: TTFTHistogram() for label in self.labels}
+        self.counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+        self.wins: Dict[str, int] = {label: 0 for label in self.labels}
+        # Losers cancelled before their first token: their TTFT is unknown (only a
+        # lower bound), so they're counted here and kept out of the histograms
+        self.censored: Dict[str, int] = {label: 0 for label in self.labels}
+
+    @staticmethod
+    def _label(provider: LLMProvider, index: int) -> str:
+        label = getattr(provider, "label", None) or provider.provider_name
+        model = getattr(provider, "model_name", None)
+        label = f"{label}:{model}" if model else label
+        return label if index == 0 else f"{label}#{index}"
+
+    def hedge_delay(self, label: str) -> float:
+        """
+        p95 TTFT of the provider, clamped; default until enough samples exist
+        """
+        histogram = self.histograms[label]
+        if histogram.total < self.min_samples:
+            return self.default_hedge_delay
+        delay = histogram.percentile(self.hedge_percentile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    async def stream(self, prompt: str, system: Optional[str] = None):
+        self.counters["requests"] += 1
+        attempts: List[_Attempt] = []
+        waiting: Dict[asyncio.Task, _Attempt] = {}
+        winner: Optional[_Attempt] = None
+        first_chunk = None
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            index = len(attempts)
+            if index >= len(self.providers):
+                return False
+            attempt = _Attempt(self.labels[index], self.providers[index], prompt, system)
+            attempts.append(attempt)
+            waiting[asyncio.ensure_future(attempt.queue.get())] = attempt
+            return True
+
+        try:
+            launch()
+            hedge_at = attempts[0].started + self.hedge_delay(self.labels[0])
+
+            while winner is None:
+                if not waiting and not launch():
+                    raise last_error or RuntimeError("All LLM providers failed")
+                can_hedge = self.hedging and len(attempts) < len(self.providers)
+                timeout = max(0.0, hedge_at - time.perf_counter()) if can_hedge else None
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Hedge: primary is slower than its p95, race the next provider
+                    self.counters["hedges"] += 1
+                    logger.info(f"⏱️ No first token from {attempts[-1].label} after "
+                                f"{attempts[-1].elapsed() * 1000:.0f}ms, hedging")
+                    launch()
+                    hedge_at = attempts[-1].started + self.hedge_delay(self.labels[len(attempts) - 1])
+                    continue
+
+                for getter in done:
+                    attempt = waiting.pop(getter)
+                    item = getter.result()
+                    if isinstance(item, _Failure) or item is _DONE:
+                        last_error = item.error if isinstance(item, _Failure) else RuntimeError(
+                            f"{attempt.label} returned an empty response")
+                        logger.warning(f"⚠️ LLM provider {attempt.label} failed: {last_error}")
+                        self.counters["failovers"] += 1
+                        if not waiting:
+                            launch()
+                            hedge_at = time.perf_counter() + self.hedge_delay(self.labels[len(attempts) - 1])
+                    elif winner is None:
+                        winner, first_chunk = attempt, item
+
+            self.histograms[winner.label].record(winner.elapsed())
+            self.wins[winner.label] += 1
+            if winner is not attempts[0]:
+                self.counters["hedge_wins"] += 1
+            for attempt in attempts:
+                if attempt is not winner and not attempt.task.done():
+                    self.censored[attempt.label] += 1
+            self._cancel_losers(waiting, attempts, winner)
+
+            yield first_chunk
+            while True:
+                item = await winner.queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._cancel_losers(waiting, attempts, None)
+
+    @staticmethod
+    def _cancel_losers(waiting, attempts, winner):
+        for getter in waiting:
+            getter.cancel()
+        waiting.clear()
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "providers": {
+                label: {**self.histograms[label].as_dict(), "wins": self.wins[label],
+                        "censored": self.censored[label],
+                        "hedge_delay_ms": _ms(self.hedge_delay(label))}
+                for label in self.labels
+            },
+        }
+
+
+def create_llm(name: str, **kwargs) -> LLMProvider:
+    """
+    Instantiate a registered LLM provider, filling API keys/models from the environment
+    """
+    from providers import create_provider
+
+    if name == "groq":
+        kwargs.setdefault("api_key", os.getenv("GROQ_API_KEY"))
+        kwargs.setdefault("model", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
+    elif name == "gemini":
+        kwargs.setdefault("api_key", os.getenv("GEMINI_API_KEY"))
+        kwargs.setdefault("model", os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp"))
+    return create_provider("llm", name, **kwargs)
+
+
+_shared_llms: Dict[tuple, LLMProvider] = {}
+
+
+def _llm_names(default: str) -> tuple:
+    return tuple(name.strip() for name in os.getenv("LLM_PROVIDERS", "").split(",") if name.strip()) or (default,)
+
+
+def llm_sdk_modules(default: str) -> List[str]:
+    """
+    SDK modules the LLM(s) chosen by LLM_PROVIDERS (or `default`) will import
+    """
+    from providers import SDK_MODULES
+
+    return [SDK_MODULES.get(("llm", name), "") for name in _llm_names(default)]
+
+
+def create_llm_from_env(default: str) -> LLMProvider:
+    """
+    LLM_PROVIDERS=groq,gemini builds a hedging router (first entry is primary);
+    otherwise returns the single `default` provider.
+
+    Instances are shared per process so TTFT histograms accumulate across sessions.
+    """
+    names = _llm_names(default)
+    if names not in _shared_llms:
+        if len(names) == 1:
+            _shared_llms[names] = create_llm(names[0])
+        else:
+            _shared_llms[names] = LLMRouter(
+                [create_llm(name) for name in names],
+                hedging=os.getenv("LLM_HEDGING", "true").lower() == "true",
+                default_hedge_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "1.0")),
+            )
+    return _shared_llms[names]
@@ -0,0 +1,197 @@
+"""
+Event Loop Monitor
+Samples event-loop lag and catches slow callbacks while they are still running.
+
+A sampler task ticks every `interval`; a watchdog thread notices when a tick
+is overdue by more than `threshold` and snapshots the loop thread's stack at
+that moment, which is the code that is blocking every session on the loop.
+Stalls are kept in a ring buffer and aggregated by stack for a debug endpoint.
+"""
+
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SlowCallback:
+    __slots__ = ("at", "duration", "stack")
+
+    def __init__(self, at: float, duration: float, stack: List[str]):
+        self.at = at
+        self.duration = duration
+        self.stack = stack
+
+    def as_dict(self) -> Dict:
+        return {"at": round(self.at, 3), "duration_ms": round(self.duration * 1000, 1), "stack": self.stack}
+
+
+class LoopMonitor:
+    """
+    Loop-lag sampler + slow-callback stack profiler for one event loop
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, history: int = 1200,
+                 ring_size: int = 50, max_stacks: int = 200, stack_depth: int = 12):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.max_stacks = max_stacks
+        self.lags: Deque[float] = deque(maxlen=history)
+        self.recent: Deque[SlowCallback] = deque(maxlen=ring_size)
+        self.by_stack: Dict[Tuple[str, ...], List[float]] = {}  # stack -> [count, total, max]
+        self.stalls = 0
+        self._lock = threading.Lock()
+        self._expected_tick = 0.0
+        self._open_stall: Optional[SlowCallback] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """
+        Start sampling the running loop (call from inside it)
+        """
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._expected_tick = time.perf_counter() + self.interval
+        self._stopping.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"🩺 Loop monitor started (interval {self.interval * 1000:.0f}ms, "
+                    f"slow callback threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sample(self):
+        while True:
+            self._expected_tick = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - self._expected_tick)
+            self.lags.append(lag)
+            if lag >= self.threshold:
+                with self._lock:
+                    stall, self._open_stall = self._open_stall, None
+                    if stall is not None:
+                        # The watchdog saw it mid-stall; now we know how long it really took
+                        self._finish_stall(stall, lag)
+                logger.warning(f"🐢 Event loop blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        check_every = self.threshold / 2
+        captured_for = None
+        while not self._stopping.wait(check_every):
+            expected = self._expected_tick
+            overdue = time.perf_counter() - expected
+            if overdue < self.threshold or captured_for == expected:
+                continue
+            captured_for = expected
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = [f"{entry.filename}:{entry.lineno} in {entry.name}"
+                     for entry in traceback.extract_stack(frame)[-self.stack_depth:]]
+            stall = SlowCallback(time.time(), overdue, stack)
+            with self._lock:
+                self.stalls += 1
+                self.recent.append(stall)
+                self._open_stall = stall
+                self._record_stall(stall)
+
+    def _record_stall(self, stall: SlowCallback):
+        key = tuple(stall.stack)
+        entry = self.by_stack.get(key)
+        if entry is None:
+            if len(self.by_stack) >= self.max_stacks:
+                del self.by_stack[min(self.by_stack, key=lambda k: self.by_stack[k][1])]
+            entry = self.by_stack[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += stall.duration
+        entry[2] = max(entry[2], stall.duration)
+
+    def _finish_stall(self, stall: SlowCallback, duration: float):
+        entry = self.by_stack.get(tuple(stall.stack))
+        if entry is not None:
+            entry[1] += duration - stall.duration
+            entry[2] = max(entry[2], duration)
+        stall.duration = duration
+
+    def snapshot(self, top: int = 10) -> Dict:
+        lags = sorted(self.lags)
+
+        def pct(p):
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2) if lags else None
+
+        with self._lock:
+            recent = [stall.as_dict() for stall in reversed(self.recent)]
+            worst = sorted(self.by_stack.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            stalls = self.stalls
+        return {
+            "lag": {
+                "interval_ms": self.interval * 1000,
+                "samples": len(lags),
+                "p50_ms": pct(0.50),
+                "p99_ms": pct(0.99),
+                "max_ms": pct(1.0),
+            },
+            "slow_callbacks": {
+                "threshold_ms": self.threshold * 1000,
+                "total": stalls,
+                "top": [
+                    {"count": count, "total_ms": round(total * 1000, 1), "max_ms": round(longest * 1000, 1),
+                     "stack": list(stack)}
+                    for stack, (count, total, longest) in worst
+                ],
+                "recent": recent,
+            },
+        }
+
+
+def install_loop_monitor(app, path: str = "/debug/loop") -> Optional[LoopMonitor]:
+    """
+    Start a LoopMonitor with the FastAPI app and expose its snapshot on `path`.
+    Off by default: LOOP_MONITOR=true enables it, and LOOP_MONITOR_TOKEN (which also
+    enables it) makes the endpoint require a matching X-Debug-Token header, since
+    the snapshot exposes source stacks. LOOP_SLOW_CALLBACK_MS sets the stack-capture threshold.
+    """
+    token = os.getenv("LOOP_MONITOR_TOKEN", "")
+    if os.getenv("LOOP_MONITOR", "false").lower() != "true" and not token:
+        return None
+    from fastapi import Header, HTTPException
+
+    monitor = LoopMonitor(
+        interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", "50")) / 1000,
+        threshold=float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100")) / 1000,
+    )
+
+    @app.on_event("startup")
+    async def start_loop_monitor():
+        monitor.start()
+
+    @app.on_event("shutdown")
+    async def stop_loop_monitor():
+        await monitor.stop()
+
+    @app.get(path)
+    async def loop_debug(top: int = 10, x_debug_token: str = Header("")):
+        if token and not hmac.compare_digest(x_debug_token.encode(), token.encode()):
+            raise HTTPException(status_code=404)  # Same answer as when the monitor is off
+        return monitor.snapshot(top)
+
+    return monitor
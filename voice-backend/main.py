@@ -6,22 +6,26 @@ Orchestrates Deepgram STT → Gemini 2.5 Pro → Deepgram TTS with <1s latency
 import asyncio
 import json
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import logging
 
-from voice_pipeline_streaming import VoicePipelineStreaming
+from pipeline_engine import create_engine, shutdown_engine_resources
+from llm_router import create_llm_from_env, llm_sdk_modules
+from providers import install_sdk_preload
+from conversation_memory import conversation_store
+from loop_monitor import install_loop_monitor
+from deepgram_pool import deepgram_pool, install_deepgram_pool
+from session_manager import admit_websocket, session_manager
+from structured_logging import configure_logging
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queue-backed: a background thread writes to stdout)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
@@ -36,6 +40,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Loop-lag sampler + slow-callback stacks on /debug/loop (LOOP_MONITOR / LOOP_MONITOR_TOKEN)
+install_loop_monitor(app)
+
+# Pre-opened Deepgram live connections so /ws sessions connect instantly
+install_deepgram_pool(app)
+
+# Provider SDKs load in the background once the app is serving (see benchmarks/bench_cold_start.py)
+install_sdk_preload(app, "deepgram", "resilient_stt", "aiohttp", *llm_sdk_modules("gemini"),
+                    "voice_pipeline_streaming" if os.getenv("VOICE_PIPELINE", "legacy").lower() != "engine" else None)
+
+if TYPE_CHECKING:
+    from voice_pipeline_streaming import VoicePipelineStreaming
+
+def create_pipeline(material_id: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    VOICE_PIPELINE=engine selects the staged pipeline engine, otherwise the legacy pipeline.
+    LLM_PROVIDERS=groq,gemini routes either one through the hedging LLM router.
+    Conversation history is kept per session_id (a new one per connection if omitted).
+    """
+    memory = conversation_store.get(session_id)
+    if os.getenv("VOICE_PIPELINE", "legacy").lower() == "engine":
+        return create_engine("gemini", material_id=material_id, memory=memory)
+    from voice_pipeline_streaming import VoicePipelineStreaming  # Legacy pipeline (and its SDKs) only when selected
+    return VoicePipelineStreaming(
+        deepgram_api_key=os.getenv("DEEPGRAM_API_KEY"),
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        material_id=material_id,
+        llm=create_llm_from_env("gemini") if os.getenv("LLM_PROVIDERS") else None,
+        memory=memory,
+        session_id=session_id
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await shutdown_engine_resources()
+
 @app.get("/")
 async def root():
     return {
@@ -49,10 +89,10 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "capacity": session_manager.capacity(), "deepgram_pool": deepgram_pool.stats()}
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
+async def websocket_endpoint(websocket: WebSocket, material_id: str = None, session_id: str = None):
     """
     Main WebSocket endpoint for real-time voice streaming
     
@@ -62,14 +102,17 @@ async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
     await websocket.accept()
     logger.info(f"🔌 Client connected (material_id: {material_id})")
     
-    # Create streaming pipeline
-    pipeline = VoicePipelineStreaming(
-        deepgram_api_key=os.getenv("DEEPGRAM_API_KEY"),
-        gemini_api_key=os.getenv("GEMINI_API_KEY"),
-        material_id=material_id
-    )
+    # Admission control: over the cap the client is queued or told to retry
+    lease = await admit_websocket(websocket, session_id)
+    if lease is None:
+        return
     
+    pipeline = None
     try:
+        # Create streaming pipeline inside the try so a failing constructor
+        # (e.g. a missing API key) still releases the session slot
+        pipeline = create_pipeline(material_id, session_id)
+        
         # Initialize pipeline
         await pipeline.initialize()
         await websocket.send_json({
@@ -113,10 +156,12 @@ async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
             pass
     finally:
         # Cleanup
-        await pipeline.cleanup()
+        if pipeline is not None:
+            await pipeline.cleanup()
+        session_manager.release(lease)
         logger.info("🧹 Pipeline cleaned up")
 
-async def receive_audio(websocket: WebSocket, pipeline: VoicePipelineStreaming):
+async def receive_audio(websocket: WebSocket, pipeline: "VoicePipelineStreaming"):
     """
     Receive binary PCM audio from client and stream to Deepgram
     """
@@ -134,7 +179,7 @@ async def receive_audio(websocket: WebSocket, pipeline: VoicePipelineStreaming):
         logger.error(f"❌ Receive error: {e}", exc_info=True)
         raise
 
-async def send_responses(websocket: WebSocket, pipeline: VoicePipelineStreaming):
+async def send_responses(websocket: WebSocket, pipeline: "VoicePipelineStreaming"):
     """
     Send transcripts and audio responses back to client
     """
@@ -150,10 +195,14 @@ async def send_responses(websocket: WebSocket, pipeline: VoicePipelineStreaming)
 
 if __name__ == "__main__":
     import uvicorn
+    from shared_store import uvicorn_workers
+    # WORKERS=N|auto: production mode, N processes sharing caches via shared_store
+    workers = uvicorn_workers("main", 8000)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=workers is None,
+        workers=workers,
         log_level="info"
     )
@@ -6,22 +6,26 @@ Orchestrates Deepgram STT → Groq LLM (ultra-fast) → Deepgram TTS with <1s la
 import asyncio
 import json
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import logging
 
-from voice_pipeline_groq import VoicePipelineGroq
+from pipeline_engine import create_engine, shutdown_engine_resources
+from llm_router import create_llm_from_env, llm_sdk_modules
+from providers import install_sdk_preload
+from conversation_memory import conversation_store
+from loop_monitor import install_loop_monitor
+from deepgram_pool import deepgram_pool, install_deepgram_pool
+from session_manager import admit_websocket, session_manager
+from structured_logging import configure_logging
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queue-backed: a background thread writes to stdout)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
@@ -37,6 +41,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Loop-lag sampler + slow-callback stacks on /debug/loop (LOOP_MONITOR / LOOP_MONITOR_TOKEN)
+install_loop_monitor(app)
+
+# Pre-opened Deepgram live connections so /ws sessions connect instantly
+install_deepgram_pool(app)
+
+# Provider SDKs load in the background once the app is serving (see benchmarks/bench_cold_start.py)
+install_sdk_preload(app, "deepgram", "resilient_stt", "aiohttp", *llm_sdk_modules("groq"),
+                    "voice_pipeline_groq" if os.getenv("VOICE_PIPELINE", "legacy").lower() != "engine" else None)
+
+if TYPE_CHECKING:
+    from voice_pipeline_groq import VoicePipelineGroq
+
+def create_pipeline(material_id: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    VOICE_PIPELINE=engine selects the staged pipeline engine, otherwise the legacy pipeline.
+    LLM_PROVIDERS=groq,gemini routes either one through the hedging LLM router.
+    Conversation history is kept per session_id (a new one per connection if omitted).
+    """
+    memory = conversation_store.get(session_id)
+    if os.getenv("VOICE_PIPELINE", "legacy").lower() == "engine":
+        return create_engine("groq", material_id=material_id, memory=memory)
+    from voice_pipeline_groq import VoicePipelineGroq  # Legacy pipeline (and its SDKs) only when selected
+    return VoicePipelineGroq(
+        deepgram_api_key=os.getenv("DEEPGRAM_API_KEY"),
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        material_id=material_id,
+        model=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
+        llm=create_llm_from_env("groq") if os.getenv("LLM_PROVIDERS") else None,
+        memory=memory,
+        session_id=session_id
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await shutdown_engine_resources()
+
 @app.get("/")
 async def root():
     return {
@@ -55,11 +96,13 @@ async def health():
     return {
         "status": "healthy",
         "llm_provider": "groq",
-        "model": os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+        "model": os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),
+        "capacity": session_manager.capacity(),
+        "deepgram_pool": deepgram_pool.stats(),
     }
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
+async def websocket_endpoint(websocket: WebSocket, material_id: str = None, session_id: str = None):
     """
     Main WebSocket endpoint for real-time voice streaming
     
@@ -69,15 +112,17 @@ async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
     await websocket.accept()
     logger.info(f"🔌 Client connected (material_id: {material_id})")
     
-    # Create streaming pipeline with Groq
-    pipeline = VoicePipelineGroq(
-        deepgram_api_key=os.getenv("DEEPGRAM_API_KEY"),
-        groq_api_key=os.getenv("GROQ_API_KEY"),
-        material_id=material_id,
-        model=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-    )
+    # Admission control: over the cap the client is queued or told to retry
+    lease = await admit_websocket(websocket, session_id)
+    if lease is None:
+        return
     
+    pipeline = None
     try:
+        # Create streaming pipeline with Groq inside the try so a failing constructor
+        # (e.g. a missing API key) still releases the session slot
+        pipeline = create_pipeline(material_id, session_id)
+        
         # Initialize pipeline
         await pipeline.initialize()
         await websocket.send_json({
@@ -121,10 +166,12 @@ async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
             pass
     finally:
         # Cleanup
-        await pipeline.cleanup()
+        if pipeline is not None:
+            await pipeline.cleanup()
+        session_manager.release(lease)
         logger.info("🧹 Pipeline cleaned up")
 
-async def receive_audio(websocket: WebSocket, pipeline: VoicePipelineGroq):
+async def receive_audio(websocket: WebSocket, pipeline: "VoicePipelineGroq"):
     """
     Receive binary PCM audio from client and stream to Deepgram
     """
@@ -142,7 +189,7 @@ async def receive_audio(websocket: WebSocket, pipeline: VoicePipelineGroq):
         logger.error(f"❌ Receive error: {e}", exc_info=True)
         raise
 
-async def send_responses(websocket: WebSocket, pipeline: VoicePipelineGroq):
+async def send_responses(websocket: WebSocket, pipeline: "VoicePipelineGroq"):
     """
     Send transcripts and audio responses back to client
     """
@@ -158,10 +205,14 @@ async def send_responses(websocket: WebSocket, pipeline: VoicePipelineGroq):
 
 if __name__ == "__main__":
     import uvicorn
+    from shared_store import uvicorn_workers
+    # WORKERS=N|auto: production mode, N processes sharing caches via shared_store
+    workers = uvicorn_workers("main_groq", int(os.getenv("PORT", 8000)))
     uvicorn.run(
         "main_groq:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", 8000)),
-        reload=True,
+        reload=workers is None,
+        workers=workers,
         log_level=os.getenv("LOG_LEVEL", "info").lower()
     )
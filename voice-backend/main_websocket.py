@@ -7,35 +7,31 @@ import asyncio
 import os
 import json
 import base64
+import logging
+import random
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from deepgram import DeepgramClient, DeepgramClientOptions, LiveTranscriptionEvents, LiveOptions, SpeakOptions
-import google.generativeai as genai
-import aiohttp
-import ssl
 from dotenv import load_dotenv
 import certifi
+from conversation_memory import ConversationMemory, conversation_store
+from prompt_cache import prompt_cache
+from loop_monitor import install_loop_monitor
+from deepgram_pool import deepgram_pool, install_deepgram_pool
+from session_manager import admit_websocket, session_manager
+from providers import NextJSRetriever, close_http_session, get_http_session, install_sdk_preload
+from shared_store import SHARED_TTS_MAX_CHARS, shared_store
+from structured_logging import SessionLogger, configure_logging
 
 load_dotenv()
 
+# Queue-backed logging: records are written to stdout by a background thread
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Fix SSL certificate issues on macOS
 os.environ['SSL_CERT_FILE'] = certifi.where()
 os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
 
-# Monkey-patch SSL for websockets
-import websockets.client
-original_connect = websockets.client.connect
-
-def patched_connect(*args, **kwargs):
-    if 'ssl' not in kwargs:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        kwargs['ssl'] = ssl_context
-    return original_connect(*args, **kwargs)
-
-websockets.client.connect = patched_connect
-
 app = FastAPI()
 
 app.add_middleware(
@@ -46,23 +42,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Loop-lag sampler + slow-callback stacks on /debug/loop (LOOP_MONITOR / LOOP_MONITOR_TOKEN)
+install_loop_monitor(app)
+
+# Pre-opened Deepgram live connections so /ws sessions connect instantly
+install_deepgram_pool(app)
+
+# Gemini/Deepgram SDKs load in the background once the app is serving
+install_sdk_preload(app, "google.generativeai", "deepgram", "resilient_stt", "aiohttp")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_session()
+
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-genai.configure(api_key=GEMINI_API_KEY)
-
 class VoicePipeline:
-    def __init__(self, websocket: WebSocket, material_id: str = None):
+    def __init__(self, websocket: WebSocket, material_id: str = None, memory: ConversationMemory = None,
+                 session_id: str = None):
         self.websocket = websocket
+        self.log = SessionLogger(logger, session_id)
         self.material_id = material_id
+        self.memory = memory if memory is not None else ConversationMemory()
         
-        # Configure Deepgram client with keepalive
-        config = DeepgramClientOptions(
-            options={"keepalive": "true"}
-        )
-        self.deepgram_client = DeepgramClient(DEEPGRAM_API_KEY, config)
+        # Live connection is checked out of deepgram_pool (pre-opened, keepalive)
         self.dg_connection = None
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.gemini_model_name = 'gemini-2.0-flash-exp'
+        import google.generativeai as genai  # Usually already preloaded at startup
+        genai.configure(api_key=GEMINI_API_KEY)
+        self.gemini_model = genai.GenerativeModel(self.gemini_model_name)
         self.is_ai_speaking = False
         self.interrupt_flag = False
         self.current_response_task = None
@@ -72,50 +81,25 @@ class VoicePipeline:
     async def start(self):
         """Initialize Deepgram WebSocket connection"""
         try:
-            import sys
-            print(f"🎙️ Starting pipeline for material: {self.material_id}", flush=True)
-            sys.stdout.flush()
-            print(f"🔑 API Key present: {bool(DEEPGRAM_API_KEY)}", flush=True)
+            self.log.info("🎙️ Starting pipeline for material: %s (Deepgram key present: %s)",
+                          self.material_id, bool(DEEPGRAM_API_KEY))
+            
+            from deepgram import LiveTranscriptionEvents
+            from resilient_stt import ResilientLiveConnection
             
-            # Create Deepgram async live connection
-            print("📡 Creating Deepgram connection...")
-            self.dg_connection = self.deepgram_client.listen.asynclive.v("1")
-            print(f"✅ Connection object created: {type(self.dg_connection)}")
+            # Pooled Deepgram connection (instant when warm) that reconnects and replays on blips
+            self.dg_connection = ResilientLiveConnection()
+            await self.dg_connection.start()
             
             # Setup event handlers
-            print("🎧 Setting up event handlers...")
             self.dg_connection.on(LiveTranscriptionEvents.Transcript, self.on_transcript)
             self.dg_connection.on(LiveTranscriptionEvents.Error, self.on_error)
             
-            # Configure for raw PCM Int16 from browser
-            options = LiveOptions(
-                model="nova-2",
-                language="en-US",
-                encoding="linear16",
-                sample_rate=48000,
-                channels=1,
-                interim_results=True,
-                punctuate=True,
-                smart_format=True,
-                endpointing=500  # ms of silence before finalizing
-            )
-            print(f"⚙️ Options configured: {options}")
-            
-            # Start connection (async)
-            print("🚀 Starting Deepgram connection...")
-            result = await self.dg_connection.start(options)
-            print(f"📊 Start result: {result}")
-            
-            if not result:
-                raise Exception("Failed to start Deepgram WebSocket")
-            
-            print("✅ Deepgram WebSocket connected")
+            self.log.info("✅ Deepgram WebSocket connected")
             await self.websocket.send_json({"type": "status", "data": "connected"})
             
         except Exception as e:
-            print(f"❌ Error starting pipeline: {e}")
-            import traceback
-            traceback.print_exc()
+            self.log.error("❌ Error starting pipeline: %s", e, exc_info=True)
             await self.websocket.send_json({"type": "error", "data": str(e)})
             raise
     
@@ -132,7 +116,11 @@ class VoicePipeline:
         if not transcript:
             return
         
-        print(f"📝 Transcript ({'final' if is_final else 'interim'}): {transcript}")
+        if is_final:
+            self.log.info("📝 Transcript (final): %s", transcript)
+        else:
+            # Interim results arrive several times a second per speaker
+            self.log.sampled("interim", 10, "📝 Transcript (interim): %s", transcript)
         
         # Send transcript to client
         await self.websocket.send_json({
@@ -145,7 +133,7 @@ class VoicePipeline:
         
         # Check for interruption
         if self.is_ai_speaking and len(transcript) > 3:
-            print("🛑 User interrupted")
+            self.log.info("🛑 User interrupted")
             self.interrupt_flag = True
             if self.current_response_task:
                 self.current_response_task.cancel()
@@ -155,11 +143,11 @@ class VoicePipeline:
         if is_final and len(transcript.strip()) > 0:
             # Prevent duplicate processing
             if transcript == self.last_processed_transcript:
-                print(f"⏭️ Skipping duplicate transcript: {transcript}")
+                self.log.debug("⏭️ Skipping duplicate transcript: %s", transcript)
                 return
             
             self.last_processed_transcript = transcript
-            print(f"📝 Final transcript: {transcript}")
+            self.log.next_turn()
             self.current_response_task = asyncio.create_task(
                 self.process_with_gemini(transcript)
             )
@@ -169,7 +157,7 @@ class VoicePipeline:
         error = kwargs.get("error")
         if error is None:
             return  # Ignore None errors
-        print(f"❌ Deepgram error: {error}")
+        self.log.error("❌ Deepgram error: %s", error)
         # Notify client of error
         await self.websocket.send_json({
             "type": "error",
@@ -179,108 +167,80 @@ class VoicePipeline:
     async def search_documents(self, query: str) -> str:
         """Search for relevant document content (RAG)"""
         if not self.material_id:
-            print(f"⚠️ search_documents called but material_id is None", flush=True)
+            self.log.warning("⚠️ search_documents called but material_id is None")
             return ""
         
         try:
-            print(f"🔍 Searching documents for query: '{query}' in material: {self.material_id}", flush=True)
-            
-            search_url = "http://localhost:3000/api/search-documents"
-            print(f"📡 Sending request to: {search_url}", flush=True)
+            self.log.debug("🔍 Searching documents for query: '%s' in material: %s", query, self.material_id)
             
-            # Use simple session without SSL overhead for localhost
-            async with aiohttp.ClientSession() as session:
-                async with session.post(search_url, json={
-                    "query": query,
-                    "materialId": self.material_id,
-                    "topK": 3
-                }) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        results = result.get("results", [])
-                        
-                        context_parts = []
-                        for item in results:
-                            content = item.get("content", "")
-                            if content:
-                                context_parts.append(content)
-                        
-                        context = "\n\n".join(context_parts)
-                        print(f"✅ Found {len(results)} chunks")
-                        return context
-                    else:
-                        return ""
+            # Shared HTTP session + RAG results cached across workers
+            context = await NextJSRetriever(self.material_id).search(query)
+            self.log.debug("✅ Found %d chars of context", len(context))
+            return context
                         
         except Exception as e:
-            print(f"❌ Search error: {e}")
+            self.log.error("❌ Search error: %s", e)
             return ""
     
     async def process_with_gemini(self, text: str):
         """Process with Gemini and stream response"""
+        full_text, remembered = "", False
         try:
             self.is_ai_speaking = True
             self.interrupt_flag = False
             
             await self.websocket.send_json({"type": "status", "data": "generating"})
             
-            # Send immediate acknowledgment filler
-            import random
-            fillers = [
-                "Let me think about that...",
-                "Just a moment...",
-                "Let me check that for you...",
-                "Hmm, interesting question...",
-                "Good question, let me see..."
-            ]
-            filler = random.choice(fillers)
-            
-            # Send filler text immediately
-            await self.websocket.send_json({
-                "type": "text",
-                "data": filler
-            })
+            # Send immediate acknowledgment filler (skipped while the node is shedding load)
+            shedding = session_manager.shedding
+            if not shedding:
+                fillers = [
+                    "Let me think about that...",
+                    "Just a moment...",
+                    "Let me check that for you...",
+                    "Hmm, interesting question...",
+                    "Good question, let me see..."
+                ]
+                filler = random.choice(fillers)
+                
+                # Send filler text immediately
+                await self.websocket.send_json({
+                    "type": "text",
+                    "data": filler
+                })
+                
+                # Generate quick filler TTS in background (non-blocking)
+                asyncio.create_task(self._send_quick_filler_audio(filler))
             
-            # Generate quick filler TTS in background (non-blocking)
-            asyncio.create_task(self._send_quick_filler_audio(filler))
+            # Per-material prompt prefix (cached after the first turn) loads alongside RAG
+            prefix_task = asyncio.create_task(prompt_cache.get_prefix(self.material_id))
             
             # Search for context in parallel with prompt building (timeout after 5s)
             context = ""
             if self.material_id:
-                print(f"🔍 Starting RAG search for material: {self.material_id}", flush=True)
                 try:
                     context = await asyncio.wait_for(
                         self.search_documents(text),
                         timeout=5.0  # Max 5 seconds for RAG
                     )
-                    print(f"✅ RAG search returned {len(context)} characters", flush=True)
+                    self.log.info("✅ RAG search returned %d characters", len(context))
                 except asyncio.TimeoutError:
-                    print("⚠️ RAG search timed out, proceeding without context", flush=True)
+                    self.log.warning("⚠️ RAG search timed out, proceeding without context")
                     context = ""
                 except Exception as e:
-                    print(f"❌ RAG search error: {e}", flush=True)
+                    self.log.error("❌ RAG search error: %s", e)
                     context = ""
             else:
-                print(f"⚠️ No material_id provided, skipping RAG", flush=True)
+                self.log.debug("⚠️ No material_id provided, skipping RAG")
             
-            # Build prompt
-            if context:
-                prompt = f"""You are Alex, a helpful AI tutor. Respond naturally and conversationally.
-
-Relevant context: {context[:500]}
-
-Student: {text}
-
-Keep response brief (2-3 sentences max)."""
-            else:
-                prompt = f"""You are Alex, a helpful AI tutor. Respond naturally and conversationally.
-
-Student: {text}
-
-Keep response brief (2-3 sentences max)."""
+            # Build prompt: stable prefix + per-turn suffix
+            prefix = await prefix_task
+            prompt = prompt_cache.render_turn(text, context[:500], self.memory.render(), brief=shedding)
+            prompt_cache.stats.record(prefix, prompt)
             
             # Stream response from Gemini
             response = await self.gemini_model.generate_content_async(
-                prompt,
+                prompt_cache.join(prefix, prompt),
                 stream=True
             )
             
@@ -288,12 +248,13 @@ Keep response brief (2-3 sentences max)."""
             
             async for chunk in response:
                 if self.interrupt_flag:
-                    print("⚠️ Response interrupted")
+                    self.log.info("⚠️ Response interrupted")
                     break
                 
                 if chunk.text:
                     chunk_text = chunk.text
                     text_buffer += chunk_text
+                    full_text += chunk_text
                     
                     # Send text chunk
                     await self.websocket.send_json({
@@ -308,6 +269,10 @@ Keep response brief (2-3 sentences max)."""
                             await self.text_to_speech(text_buffer.strip())
                         text_buffer = ""
             
+            # Remember what the student heard (partial if the interrupt flag stopped the stream)
+            self.memory.add_turn(text, full_text)
+            remembered = True
+            
             # Convert remaining text
             if text_buffer.strip() and not self.interrupt_flag:
                 await self.text_to_speech(text_buffer.strip())
@@ -318,10 +283,14 @@ Keep response brief (2-3 sentences max)."""
             self.is_ai_speaking = False
             
         except asyncio.CancelledError:
-            print("⚠️ Task cancelled")
+            self.log.debug("⚠️ Task cancelled")
             self.is_ai_speaking = False
+            # Barge-in cancels the task mid-answer: keep the part that was already streamed
+            if full_text and not remembered:
+                self.memory.add_turn(text, full_text)
+            raise
         except Exception as e:
-            print(f"❌ Gemini error: {e}")
+            self.log.error("❌ Gemini error: %s", e)
             await self.websocket.send_json({"type": "error", "data": str(e)})
             self.is_ai_speaking = False
     
@@ -330,7 +299,7 @@ Keep response brief (2-3 sentences max)."""
         try:
             await self.text_to_speech(text)
         except Exception as e:
-            print(f"⚠️ Filler TTS error: {e}")
+            self.log.warning("⚠️ Filler TTS error: %s", e)
     
     async def text_to_speech(self, text: str):
         """Convert text to speech using Deepgram"""
@@ -338,17 +307,11 @@ Keep response brief (2-3 sentences max)."""
             if self.interrupt_flag:
                 return
             
-            print(f"🔊 TTS: {text[:50]}...")
+            self.log.debug("🔊 TTS: %s...", text[:50])
             
             await self.websocket.send_json({"type": "status", "data": "speaking"})
             
-            options = SpeakOptions(
-                model="aura-asteria-en",
-                encoding="mp3"  # Use MP3 for browser compatibility
-            )
-            
             # Get audio from Deepgram using async HTTP (not blocking executor)
-            import aiohttp
             tts_url = "https://api.deepgram.com/v1/speak?model=aura-asteria-en&encoding=mp3"
             headers = {
                 "Authorization": f"Token {DEEPGRAM_API_KEY}",
@@ -356,12 +319,18 @@ Keep response brief (2-3 sentences max)."""
             }
             payload = {"text": text}
             
-            async with aiohttp.ClientSession() as session:
+            # Short phrases (fillers) repeat across sessions: synthesize once per node
+            phrase = shared_store is not None and len(text) <= SHARED_TTS_MAX_CHARS
+            audio_data = await shared_store.aget("tts", f"aura-asteria-en:mp3:{text}") if phrase else None
+            if audio_data is None:
+                session = await get_http_session()
                 async with session.post(tts_url, headers=headers, json=payload) as resp:
                     if resp.status != 200:
-                        print(f"❌ TTS API error: {resp.status}")
+                        self.log.error("❌ TTS API error: %s", resp.status)
                         return
                     audio_data = await resp.read()
+                if phrase:
+                    await shared_store.aset("tts", f"aura-asteria-en:mp3:{text}", audio_data, ttl=24 * 3600)
             
             if audio_data and not self.interrupt_flag:
                 # Send in chunks
@@ -377,25 +346,18 @@ Keep response brief (2-3 sentences max)."""
                     })
             
         except Exception as e:
-            print(f"❌ TTS error: {e}")
+            self.log.error("❌ TTS error: %s", e)
     
     async def send_audio_to_deepgram(self, audio_data: bytes):
         """Forward audio from client to Deepgram WebSocket"""
         try:
+            # Drops are handled inside the connection (buffer, reconnect with backoff, replay);
+            # if it gives up, on_error tells the client
             if self.dg_connection:
                 await self.dg_connection.send(audio_data)
         except Exception as e:
-            print(f"❌ Error sending audio: {e}")
-            # Try to reconnect if connection is lost
-            print("🔄 Attempting to reconnect to Deepgram...")
-            try:
-                await self.start()
-            except Exception as reconnect_error:
-                print(f"❌ Reconnection failed: {reconnect_error}")
-                await self.websocket.send_json({
-                    "type": "error",
-                    "data": "Speech recognition connection lost. Please refresh and try again."
-                })
+            # Once per frame when it fails: sample
+            self.log.sampled("send_error", 50, "❌ Error sending audio: %s", str(e), level=logging.ERROR)
     
     async def close(self):
         """Clean up connections"""
@@ -405,24 +367,31 @@ Keep response brief (2-3 sentences max)."""
             if self.dg_connection:
                 await self.dg_connection.finish()
         except Exception as e:
-            print(f"⚠️ Error during cleanup: {e}")
-        print("🔌 Pipeline closed")
+            self.log.warning("⚠️ Error during cleanup: %s", e)
+        self.log.info("🔌 Pipeline closed")
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
+async def websocket_endpoint(websocket: WebSocket, material_id: str = None, session_id: str = None):
     await websocket.accept()
-    print(f"🔗 Client connected (material: {material_id})", flush=True)
-    import sys
-    sys.stdout.flush()
+    logger.info("🔗 Client connected (material: %s)", material_id)
+    
+    # Admission control: over the cap the client is queued or told to retry
+    lease = await admit_websocket(websocket, session_id)
+    if lease is None:
+        return
     
-    pipeline = VoicePipeline(websocket, material_id)
-    print(f"🏗️ Pipeline created for material: {material_id}", flush=True)
+    try:
+        pipeline = VoicePipeline(websocket, material_id, memory=conversation_store.get(session_id), session_id=session_id)
+    except Exception as e:
+        # Don't leak the session slot when the pipeline can't be built
+        logger.error("❌ Could not create pipeline: %s", e, exc_info=True)
+        session_manager.release(lease)
+        await websocket.close(code=1011)
+        return
     
     try:
-        print(f"🚀 Starting pipeline...", flush=True)
         await pipeline.start()
-        print(f"✅ Pipeline started successfully", flush=True)
         
         # Main loop - receive audio from client
         while True:
@@ -439,31 +408,33 @@ async def websocket_endpoint(websocket: WebSocket, material_id: str = None):
                         break
             
             except asyncio.CancelledError:
-                print("⚠️ Connection cancelled")
+                pipeline.log.info("⚠️ Connection cancelled")
                 break
             except Exception as loop_error:
                 error_msg = str(loop_error)
-                print(f"❌ Error in receive loop: {error_msg}")
+                pipeline.log.sampled("receive_error", 20, "❌ Error in receive loop: %s", error_msg,
+                                     level=logging.ERROR)
                 # Break on disconnect errors
                 if "disconnect" in error_msg.lower():
                     break
                 await asyncio.sleep(0.1)
     
     except WebSocketDisconnect:
-        print("🔌 Client disconnected")
+        pipeline.log.info("🔌 Client disconnected")
     except Exception as e:
-        print(f"❌ WebSocket error: {e}")
-        import traceback
-        traceback.print_exc()
+        pipeline.log.error("❌ WebSocket error: %s", e, exc_info=True)
     finally:
         await pipeline.close()
+        session_manager.release(lease)
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "capacity": session_manager.capacity(), "deepgram_pool": deepgram_pool.stats()}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from shared_store import uvicorn_workers
+    # WORKERS=N|auto runs N processes sharing caches via shared_store
+    uvicorn.run("main_websocket:app", host="0.0.0.0", port=8000, workers=uvicorn_workers("main_websocket", 8000))
@@ -1,21 +1,30 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from deepgram import DeepgramClient, DeepgramClientOptions, LiveOptions
-import google.generativeai as genai
 import asyncio
 import json
+import logging
 import os
 import base64
 from dotenv import load_dotenv
-import aiohttp
 from typing import Optional
+from conversation_memory import ConversationMemory, conversation_store
+from prompt_cache import prompt_cache
+from loop_monitor import install_loop_monitor
+from deepgram_pool import deepgram_pool, install_deepgram_pool
+from session_manager import admit_websocket, session_manager
+from providers import NextJSRetriever, close_http_session, get_http_session, install_sdk_preload
+from shared_store import SHARED_TTS_MAX_CHARS, shared_store
+from structured_logging import SessionLogger, configure_logging
 
 load_dotenv()
 
+# Queue-backed logging: records are written to stdout by a background thread
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # API Keys
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
 
 app = FastAPI()
 
@@ -28,26 +37,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Loop-lag sampler + slow-callback stacks on /debug/loop (LOOP_MONITOR / LOOP_MONITOR_TOKEN)
+install_loop_monitor(app)
+
+# Pre-opened Deepgram live connections so /ws sessions connect instantly
+install_deepgram_pool(app)
+
+# Gemini/Deepgram SDKs load in the background once the app is serving
+install_sdk_preload(app, "google.generativeai", "deepgram", "resilient_stt", "aiohttp")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_session()
+
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "capacity": session_manager.capacity(), "deepgram_pool": deepgram_pool.stats()}
 
 
 class VoiceSession:
     """Production-ready voice session with robust error handling"""
     
-    def __init__(self, websocket: WebSocket, material_id: Optional[str] = None):
+    def __init__(self, websocket: WebSocket, material_id: Optional[str] = None,
+                 memory: Optional[ConversationMemory] = None, session_id: Optional[str] = None):
         self.websocket = websocket
+        self.log = SessionLogger(logger, session_id)
         self.material_id = material_id
         self.is_active = True
+        self.memory = memory if memory is not None else ConversationMemory()
         
-        # Deepgram STT
-        config = DeepgramClientOptions(options={"keepalive": "true"})
-        self.dg_client = DeepgramClient(DEEPGRAM_API_KEY, config)
+        # Deepgram STT (checked out of deepgram_pool on start)
         self.dg_connection = None
         
         # Gemini LLM
-        self.llm = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.llm_model_name = 'gemini-2.0-flash-exp'
+        import google.generativeai as genai  # Usually already preloaded at startup
+        genai.configure(api_key=GEMINI_API_KEY)
+        self.llm = genai.GenerativeModel(self.llm_model_name)
         
         # State
         self.is_processing = False
@@ -56,51 +82,33 @@ class VoiceSession:
     async def start(self):
         """Initialize Deepgram STT connection"""
         try:
-            self.dg_connection = self.dg_client.listen.asynclive.v("1")
-            
-            # Event handlers with proper async callbacks
-            @self.dg_connection.on("open")
-            async def on_open(*args, **kwargs):
-                print("🎙️ Deepgram STT connected")
+            from deepgram import LiveTranscriptionEvents
+            from resilient_stt import ResilientLiveConnection
             
-            @self.dg_connection.on("transcript")
-            async def on_transcript(*args, **kwargs):
-                await self._on_transcript(*args, **kwargs)
+            # Pooled connection (already past the handshake, so no Open event follows)
+            # that reconnects and replays buffered audio on upstream blips
+            self.dg_connection = ResilientLiveConnection()
+            await self.dg_connection.start()
+            self.log.info("🎙️ Deepgram STT connected")
             
-            @self.dg_connection.on("error")
+            # Event handlers with proper async callbacks
             async def on_error(*args, **kwargs):
                 error = kwargs.get("error") or (args[1] if len(args) > 1 else None)
                 if error and str(error) != "None":
-                    print(f"⚠️ Deepgram error: {error}")
+                    self.log.warning("⚠️ Deepgram error: %s", error)
             
-            @self.dg_connection.on("close")
             async def on_close(*args, **kwargs):
-                print("🔌 Deepgram STT closed")
+                self.log.info("🔌 Deepgram STT closed")
             
-            # Start connection
-            options = LiveOptions(
-                model="nova-2",
-                language="en-US",
-                encoding="linear16",
-                sample_rate=48000,
-                channels=1,
-                interim_results=True,
-                punctuate=True,
-                smart_format=True,
-                endpointing=500
-            )
+            self.dg_connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+            self.dg_connection.on(LiveTranscriptionEvents.Error, on_error)
+            self.dg_connection.on(LiveTranscriptionEvents.Close, on_close)
             
-            result = await self.dg_connection.start(options)
-            if not result:
-                raise Exception("Failed to start Deepgram connection")
-                
-            print(f"✅ Session started (material: {self.material_id})")
+            self.log.info("✅ Session started (material: %s)", self.material_id)
             return True
             
         except Exception as e:
-            print(f"❌ Session start error: {e}")
-            import traceback
-            traceback.print_exc()
+            self.log.error("❌ Session start error: %s", e, exc_info=True)
             return False
     
     async def _on_transcript(self, *args, **kwargs):
@@ -118,6 +126,7 @@ class VoiceSession:
             
             # Send interim transcripts to client
             if not is_final:
+                self.log.sampled("interim", 10, "📝 Transcript (interim): %s", transcript, level=logging.DEBUG)
                 await self.websocket.send_json({
                     "type": "transcript",
                     "data": transcript,
@@ -130,6 +139,8 @@ class VoiceSession:
                 return  # Skip duplicates
                 
             self.last_transcript = transcript
+            self.log.next_turn()
+            self.log.info("📝 Transcript (final): %s", transcript)
             
             await self.websocket.send_json({
                 "type": "transcript",
@@ -142,7 +153,7 @@ class VoiceSession:
                 asyncio.create_task(self._process_with_llm(transcript))
                 
         except Exception as e:
-            print(f"❌ Transcript error: {e}")
+            self.log.error("❌ Transcript error: %s", e)
     
     async def _process_with_llm(self, text: str):
         """Process transcript with RAG + LLM"""
@@ -155,10 +166,11 @@ class VoiceSession:
             # Send status
             await self.websocket.send_json({"type": "status", "data": "generating"})
             
-            # Quick filler
-            filler = "Let me check that for you..."
-            await self.websocket.send_json({"type": "text", "data": filler})
-            asyncio.create_task(self._stream_tts(filler))
+            # Quick filler (skipped while the node is shedding load)
+            if not session_manager.shedding:
+                filler = "Let me check that for you..."
+                await self.websocket.send_json({"type": "text", "data": filler})
+                asyncio.create_task(self._stream_tts(filler))
             
             # RAG search
             context = ""
@@ -169,26 +181,29 @@ class VoiceSession:
                         timeout=5.0
                     )
                     if context:
-                        print(f"✅ RAG: {len(context)} chars")
+                        self.log.info("✅ RAG: %d chars", len(context))
                 except Exception as e:
-                    print(f"⚠️ RAG failed: {e}")
+                    self.log.warning("⚠️ RAG failed: %s", e)
             
             # Generate LLM response
+            prefix = await prompt_cache.get_prefix(self.material_id)
             prompt = self._build_prompt(text, context)
+            prompt_cache.stats.record(prefix, prompt)
             
             response = await asyncio.to_thread(
                 self.llm.generate_content,
-                prompt
+                prompt_cache.join(prefix, prompt)
             )
             
             answer = response.text.strip()
+            self.memory.add_turn(text, answer)
             
             # Stream TTS response
             await self.websocket.send_json({"type": "text", "data": answer})
             await self._stream_tts(answer)
             
         except Exception as e:
-            print(f"❌ LLM error: {e}")
+            self.log.error("❌ LLM error: %s", e)
             error_msg = "I'm having trouble processing that. Can you try again?"
             await self.websocket.send_json({"type": "text", "data": error_msg})
             await self._stream_tts(error_msg)
@@ -197,20 +212,8 @@ class VoiceSession:
             await self.websocket.send_json({"type": "status", "data": "listening"})
     
     def _build_prompt(self, query: str, context: str) -> str:
-        """Build RAG-enhanced prompt"""
-        if context:
-            return f"""You are Alex, an AI tutor helping students understand their study materials.
-
-Context from the student's material:
-{context}
-
-Student's question: {query}
-
-Provide a clear, concise answer based on the context. Keep it conversational and under 3 sentences."""
-        else:
-            return f"""You are Alex, an AI tutor. The student asked: "{query}"
-
-Provide a brief, helpful response. Keep it under 2 sentences."""
+        """Build the per-turn part of the prompt (persona and material summary are in the cached prefix)"""
+        return prompt_cache.render_turn(query, context, self.memory.render(), brief=session_manager.shedding)
     
     async def _search_rag(self, query: str) -> str:
         """Search documents using RAG"""
@@ -218,22 +221,10 @@ Provide a brief, helpful response. Keep it under 2 sentences."""
             return ""
         
         try:
-            url = "http://localhost:3000/api/search-documents"
-            payload = {
-                "query": query,
-                "materialId": self.material_id,
-                "topK": 3
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=4)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        chunks = data.get("results", [])
-                        return "\n\n".join([c["content"] for c in chunks])
-            return ""
+            # Shared HTTP session + RAG results cached across workers
+            return await NextJSRetriever(self.material_id).search(query)
         except Exception as e:
-            print(f"❌ RAG search error: {e}")
+            self.log.error("❌ RAG search error: %s", e)
             return ""
     
     async def _stream_tts(self, text: str):
@@ -247,26 +238,33 @@ Provide a brief, helpful response. Keep it under 2 sentences."""
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
+            # Short phrases (fillers) repeat across sessions: synthesize once per node
+            phrase = shared_store is not None and len(text) <= SHARED_TTS_MAX_CHARS
+            audio_data = await shared_store.aget("tts", f"aura-asteria-en:mp3:{text}") if phrase else None
+            if audio_data is None:
+                session = await get_http_session()
                 async with session.post(url, headers=headers, json={"text": text}) as resp:
                     if resp.status == 200:
                         audio_data = await resp.read()
-                        
-                        # Send in chunks
-                        chunk_size = 4096
-                        for i in range(0, len(audio_data), chunk_size):
-                            chunk = audio_data[i:i+chunk_size]
-                            encoded = base64.b64encode(chunk).decode('utf-8')
-                            await self.websocket.send_json({
-                                "type": "audio",
-                                "data": encoded
-                            })
-                        
-                        # Signal completion
-                        await self.websocket.send_json({"type": "status", "data": "complete"})
+                        if phrase:
+                            await shared_store.aset("tts", f"aura-asteria-en:mp3:{text}", audio_data, ttl=24 * 3600)
+            
+            if audio_data:
+                # Send in chunks
+                chunk_size = 4096
+                for i in range(0, len(audio_data), chunk_size):
+                    chunk = audio_data[i:i+chunk_size]
+                    encoded = base64.b64encode(chunk).decode('utf-8')
+                    await self.websocket.send_json({
+                        "type": "audio",
+                        "data": encoded
+                    })
+                
+                # Signal completion
+                await self.websocket.send_json({"type": "status", "data": "complete"})
                         
         except Exception as e:
-            print(f"❌ TTS error: {e}")
+            self.log.error("❌ TTS error: %s", e)
     
     async def send_audio(self, audio_bytes: bytes):
         """Forward audio to Deepgram STT"""
@@ -274,7 +272,8 @@ Provide a brief, helpful response. Keep it under 2 sentences."""
             try:
                 await self.dg_connection.send(audio_bytes)
             except Exception as e:
-                print(f"❌ Audio send error: {e}")
+                # Once per frame when it fails: sample
+                self.log.sampled("send_error", 50, "❌ Audio send error: %s", str(e), level=logging.ERROR)
     
     async def close(self):
         """Clean shutdown"""
@@ -284,14 +283,26 @@ Provide a brief, helpful response. Keep it under 2 sentences."""
                 await self.dg_connection.finish()
             except:
                 pass
-        print("✅ Session closed")
+        self.log.info("✅ Session closed")
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, material_id: Optional[str] = None):
+async def websocket_endpoint(websocket: WebSocket, material_id: Optional[str] = None, session_id: Optional[str] = None):
     """Main WebSocket endpoint with robust error handling"""
     await websocket.accept()
-    session = VoiceSession(websocket, material_id)
+    
+    # Admission control: over the cap the client is queued or told to retry
+    lease = await admit_websocket(websocket, session_id)
+    if lease is None:
+        return
+    try:
+        session = VoiceSession(websocket, material_id, memory=conversation_store.get(session_id), session_id=session_id)
+    except Exception as e:
+        # Don't leak the session slot when the session can't be built (SDK missing, bad key)
+        logger.error("❌ Could not create session: %s", e, exc_info=True)
+        session_manager.release(lease)
+        await websocket.close(code=1011)
+        return
     
     try:
         # Start session
@@ -317,11 +328,12 @@ async def websocket_endpoint(websocket: WebSocket, material_id: Optional[str] =
             except WebSocketDisconnect:
                 break
             except Exception as e:
-                print(f"❌ Receive error: {e}")
+                session.log.error("❌ Receive error: %s", e)
                 break
     
     finally:
         await session.close()
+        session_manager.release(lease)
         try:
             await websocket.close()
         except:
@@ -330,4 +342,6 @@ async def websocket_endpoint(websocket: WebSocket, material_id: Optional[str] =
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from shared_store import uvicorn_workers
+    # WORKERS=N|auto runs N processes sharing caches via shared_store
+    uvicorn.run("main_websocket_v2:app", host="0.0.0.0", port=8000, workers=uvicorn_workers("main_websocket_v2", 8000))
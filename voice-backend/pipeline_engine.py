@@ -0,0 +1,691 @@
+"""
+Unified Voice Pipeline Engine
+ingest → VAD → STT → turn detector → retrieval → LLM → segmenter → TTS → packetizer → egress
+(the VAD stage only runs when barge-in is enabled)
+
+Each stage runs as its own task and talks to the next one through a bounded
+async channel, so backpressure is explicit and every stage can be measured
+(and benchmarked) on its own. STT/LLM/TTS are provider plugins from providers.py.
+"""
+
+import asyncio
+import base64
+import logging
+import math
+import os
+import re
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import audioop  # C RMS; removed from the stdlib in Python 3.13
+except ImportError:
+    audioop = None
+
+from answer_cache import AnswerCache, CachedAnswer, PendingAnswer, answer_cache
+from conversation_memory import ConversationMemory
+from prompt_cache import PromptCache, prompt_cache
+from session_manager import session_manager
+from providers import (
+    LLMProvider,
+    NextJSRetriever,
+    STTProvider,
+    TTSProvider,
+    close_http_session,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = object()  # Channel end-of-stream marker
+
+
+# ---------------------------------------------------------------------------
+# Items flowing between stages
+# ---------------------------------------------------------------------------
+
+@dataclass
+class AudioFrame:
+    pcm: bytes
+    is_speech: bool = False
+
+
+@dataclass
+class Transcript:
+    text: str
+    is_final: bool
+    speech_final: bool = False
+
+
+@dataclass
+class Turn:
+    turn_id: int
+    text: str
+    context: str = ""
+
+
+@dataclass
+class TextDelta:
+    turn_id: int
+    text: str
+    last: bool = False
+
+
+@dataclass
+class Segment:
+    turn_id: int
+    text: str
+    last: bool = False
+
+
+@dataclass
+class AudioChunk:
+    turn_id: int
+    data: bytes
+    last: bool = False
+
+
+# ---------------------------------------------------------------------------
+# Channels and stage base class
+# ---------------------------------------------------------------------------
+
+class Channel:
+    """
+    Bounded async channel between two stages
+    """
+
+    def __init__(self, name: str, maxsize: int = 64):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.max_depth = 0
+
+    async def put(self, item):
+        await self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def put_nowait(self, item) -> bool:
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self):
+        await self.queue.put(CLOSED)
+
+
+@dataclass
+class StageStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+    service_times: List[float] = field(default_factory=list)
+
+    def record(self, seconds: float):
+        self.busy_seconds += seconds
+        self.service_times.append(seconds)
+        if len(self.service_times) > 1000:
+            del self.service_times[:500]
+
+    def as_dict(self) -> Dict[str, Any]:
+        times = sorted(self.service_times)
+
+        def pct(p):
+            if not times:
+                return 0.0
+            return times[min(len(times) - 1, int(math.ceil(p * len(times))) - 1)]
+
+        return {
+            "stage": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_s": round(self.busy_seconds, 4),
+            "blocked_s": round(self.blocked_seconds, 4),
+            "throughput_per_s": round(self.items_in / self.busy_seconds, 1) if self.busy_seconds else None,
+            "p50_ms": round(pct(0.50) * 1000, 3),
+            "p95_ms": round(pct(0.95) * 1000, 3),
+        }
+
+
+class Stage:
+    """
+    A pipeline stage: consumes items from its inbox and yields items to its outbox.
+
+    Subclasses implement process(); time spent waiting on a full outbox is
+    counted as blocked, not busy, so throughput reflects the stage itself.
+    """
+
+    name = "stage"
+
+    def __init__(self, engine: Optional["VoicePipelineEngine"] = None):
+        self.engine = engine
+        self.stats = StageStats(self.name)
+
+    async def process(self, item) -> AsyncIterator[Any]:
+        yield item
+
+    def is_stale(self, item) -> bool:
+        turn_id = getattr(item, "turn_id", None)
+        return self.engine is not None and turn_id is not None and turn_id != self.engine.turn_id
+
+    async def run(self, inbox: Channel, outbox: Optional[Channel]):
+        while True:
+            item = await inbox.get()
+            if item is CLOSED:
+                if outbox is not None:
+                    await outbox.close()
+                return
+            if self.is_stale(item):
+                continue
+            self.stats.items_in += 1
+            started = time.perf_counter()
+            blocked = 0.0
+            try:
+                async for out in self.process(item):
+                    self.stats.items_out += 1
+                    if outbox is not None:
+                        put_started = time.perf_counter()
+                        await outbox.put(out)
+                        blocked += time.perf_counter() - put_started
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stage {self.name} error: {e}", exc_info=True)
+                if self.engine:
+                    await self.engine.emit({"type": "error", "data": str(e)})
+            self.stats.blocked_seconds += blocked
+            self.stats.record(time.perf_counter() - started - blocked)
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+class IngestStage(Stage):
+    """
+    Raw PCM bytes from the client → AudioFrame
+    """
+
+    name = "ingest"
+
+    async def process(self, item):
+        yield AudioFrame(pcm=item)
+
+
+class VADStage(Stage):
+    """
+    Energy-based voice activity detection on Int16 PCM.
+
+    Frames are always forwarded (Deepgram does its own endpointing); the VAD
+    only flags speech, and with barge_in enabled interrupts the AI before the
+    first transcript arrives. The engine leaves the stage out when barge-in
+    is off, since nothing else reads the flag.
+    """
+
+    name = "vad"
+
+    def __init__(self, engine=None, threshold: float = 500.0, min_speech_frames: int = 5, barge_in: bool = False):
+        super().__init__(engine)
+        self.threshold = threshold
+        self.min_speech_frames = min_speech_frames
+        self.barge_in = barge_in
+        self.speech_frames = 0
+
+    @staticmethod
+    def rms(pcm: bytes) -> float:
+        pcm = pcm[: len(pcm) - (len(pcm) % 2)]
+        if audioop is not None:
+            return float(audioop.rms(pcm, 2))
+        samples = array("h")
+        samples.frombytes(pcm)
+        if not samples:
+            return 0.0
+        return math.sqrt(sum(map(int.__mul__, samples, samples)) / len(samples))
+
+    async def process(self, item: AudioFrame):
+        item.is_speech = self.rms(item.pcm) >= self.threshold
+        self.speech_frames = self.speech_frames + 1 if item.is_speech else 0
+        if self.barge_in and self.speech_frames == self.min_speech_frames and self.engine:
+            await self.engine.on_speech_start()
+        yield item
+
+
+class STTStage(Stage):
+    """
+    Streams frames to the STT provider; transcripts arrive asynchronously
+    through the provider callback and are pushed to the outbox.
+    """
+
+    name = "stt"
+
+    def __init__(self, engine, provider: STTProvider):
+        super().__init__(engine)
+        self.provider = provider
+        self.outbox: Optional[Channel] = None
+
+    async def start(self):
+        await self.provider.start(self._on_transcript)
+
+    async def _on_transcript(self, text: str, is_final: bool, speech_final: bool):
+        self.stats.items_out += 1
+        if self.outbox is not None:
+            await self.outbox.put(Transcript(text, is_final, speech_final))
+
+    async def run(self, inbox: Channel, outbox: Optional[Channel]):
+        self.outbox = outbox
+        while True:
+            item = await inbox.get()
+            if item is CLOSED:
+                await self.provider.finish()
+                if outbox is not None:
+                    await outbox.close()
+                return
+            self.stats.items_in += 1
+            started = time.perf_counter()
+            try:
+                await self.provider.send(item.pcm)
+            except Exception as e:
+                logger.error(f"❌ Error sending audio to STT: {e}")
+            self.stats.record(time.perf_counter() - started)
+
+
+class TurnDetectorStage(Stage):
+    """
+    Forwards transcripts to the client and groups final segments into turns.
+
+    A turn closes on Deepgram's speech_final (endpointing); duplicate turns are
+    dropped, and an interim transcript while the AI is speaking is a barge-in.
+    """
+
+    name = "turn_detector"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.pending: List[str] = []
+        self.last_turn_text = ""
+
+    async def process(self, item: Transcript):
+        await self.engine.emit({
+            "type": "transcript",
+            "data": {"text": item.text, "is_final": item.is_final}
+        })
+        if self.engine.is_ai_speaking and len(item.text) > 3:
+            await self.engine.interrupt()
+
+        if not item.is_final:
+            return
+        self.pending.append(item.text.strip())
+        if not item.speech_final:
+            return
+
+        text = " ".join(part for part in self.pending if part)
+        self.pending = []
+        if not text or text == self.last_turn_text:
+            return
+        self.last_turn_text = text
+        yield Turn(turn_id=self.engine.next_turn(), text=text)
+
+
+class RetrievalStage(Stage):
+    """
+    Attaches RAG context to a turn (bounded by a timeout)
+    """
+
+    name = "retrieval"
+
+    def __init__(self, engine, retriever: Optional[NextJSRetriever], timeout: float = 5.0):
+        super().__init__(engine)
+        self.retriever = retriever
+        self.timeout = timeout
+
+    async def process(self, item: Turn):
+        if self.engine:
+            await self.engine.emit({"type": "status", "data": "generating"})
+            cache = self.engine.answer_cache
+            if cache and self.engine.material_id:
+                version = (await prompt_cache.get_prefix(self.engine.material_id)).version
+                hit = await cache.lookup(self.engine.material_id, version, item.text)
+                if hit:
+                    await self.engine.serve_cached(item, hit)
+                    return
+                self.engine.pending_answers[item.turn_id] = PendingAnswer(item.text, version)
+        if self.retriever:
+            try:
+                item.context = await asyncio.wait_for(self.retriever.search(item.text), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ RAG search timed out, proceeding without context")
+        yield item
+
+
+class LLMStage(Stage):
+    """
+    Streams the LLM response for a turn as TextDelta items
+    """
+
+    name = "llm"
+
+    def __init__(self, engine, provider: LLMProvider, prompts: PromptCache = prompt_cache):
+        super().__init__(engine)
+        self.provider = provider
+        self.prompts = prompts
+
+    async def process(self, item: Turn):
+        memory = self.engine.memory if self.engine else None
+        # Stable per-material prefix goes in the system slot so providers can reuse it
+        prefix = await self.prompts.get_prefix(self.engine.material_id if self.engine else None)
+        brief = session_manager.shedding
+        pending = self.engine.pending_answers.get(item.turn_id) if self.engine else None
+        if pending:
+            pending.brief = brief  # Shedding-mode answers aren't cached
+        prompt = self.prompts.render_turn(item.text, item.context, memory.render() if memory else "",
+                                          brief=brief)
+        self.prompts.stats.record(prefix, prompt)
+        full_text = ""
+        try:
+            async for chunk in self.provider.stream(prompt, system=prefix.text):
+                if self.is_stale(item):
+                    return
+                full_text += chunk
+                if self.engine:
+                    await self.engine.emit({"type": "text_chunk", "data": chunk})
+                yield TextDelta(item.turn_id, chunk)
+        finally:
+            # Interrupted answers are remembered up to the point the student cut in
+            if memory and full_text:
+                memory.add_turn(item.text, full_text)
+        if self.engine:
+            await self.engine.emit({"type": "text", "data": full_text})
+            pending = self.engine.pending_answers.get(item.turn_id)
+            if pending:
+                pending.text = full_text
+        yield TextDelta(item.turn_id, "", last=True)
+
+
+class SegmenterStage(Stage):
+    """
+    Cuts the token stream into speakable segments.
+
+    The first segment of a turn is flushed early (first_words) to get audio
+    started; later segments wait for a sentence boundary or max_words.
+    """
+
+    name = "segmenter"
+
+    # Sentence punctuation followed by whitespace, so "3.14" is never split
+    SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+    def __init__(self, engine=None, first_words: int = 6, max_words: int = 25):
+        super().__init__(engine)
+        self.first_words = first_words
+        self.max_words = max_words
+        self.buffer = ""
+        self.buffer_turn = None
+        self.emitted = 0
+
+    async def process(self, item: TextDelta):
+        if item.turn_id != self.buffer_turn:
+            self.buffer, self.buffer_turn, self.emitted = "", item.turn_id, 0
+        self.buffer += item.text
+        if item.last:
+            text = self.buffer.strip()
+            self.buffer = ""
+            yield Segment(item.turn_id, text, last=True)
+            return
+
+        words = len(self.buffer.split())
+        limit = self.first_words if self.emitted == 0 else self.max_words
+        boundary = max((m.end() - 1 for m in self.SENTENCE_END.finditer(self.buffer)), default=-1)
+        if boundary >= 0 and len(self.buffer[:boundary + 1].split()) >= 2:
+            text, self.buffer = self.buffer[:boundary + 1], self.buffer[boundary + 1:]
+        elif words >= limit:
+            cut = self.buffer.rstrip().rfind(" ")
+            text, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        else:
+            return
+        if text.strip():
+            self.emitted += 1
+            yield Segment(item.turn_id, text.strip())
+
+
+class TTSStage(Stage):
+    """
+    Synthesizes each segment, yielding audio as the provider streams it
+    """
+
+    name = "tts"
+
+    def __init__(self, engine, provider: TTSProvider):
+        super().__init__(engine)
+        self.provider = provider
+
+    async def process(self, item: Segment):
+        if item.text:
+            if self.engine:
+                await self.engine.emit({"type": "status", "data": "speaking"})
+            async for chunk in self.provider.synthesize(item.text):
+                if self.is_stale(item):
+                    return
+                yield AudioChunk(item.turn_id, chunk)
+        if item.last:
+            yield AudioChunk(item.turn_id, b"", last=True)
+
+
+class PacketizerStage(Stage):
+    """
+    Re-chunks audio to fixed-size base64 packets for the client
+    """
+
+    name = "packetizer"
+
+    def __init__(self, engine=None, packet_size: int = 4096):
+        super().__init__(engine)
+        self.packet_size = packet_size
+        self.pending = bytearray()
+
+    async def process(self, item: AudioChunk):
+        answer = self.engine.pending_answers.get(item.turn_id) if self.engine else None
+        self.pending.extend(item.data)
+        while len(self.pending) >= self.packet_size or (item.last and self.pending):
+            packet = bytes(self.pending[:self.packet_size])
+            del self.pending[:self.packet_size]
+            encoded = base64.b64encode(packet).decode("utf-8")
+            if answer:
+                answer.audio.append(encoded)
+            yield {"type": "audio", "data": encoded}
+        if item.last:
+            if answer:
+                await self.engine.store_answer(item.turn_id)
+            yield {"type": "status", "data": "complete", "turn_id": item.turn_id}
+
+
+class EgressStage(Stage):
+    """
+    Final hop to the client-facing output queue
+    """
+
+    name = "egress"
+
+    async def process(self, item: Dict[str, Any]):
+        if item.get("type") == "status" and item.get("data") == "complete" and self.engine:
+            if item.pop("turn_id", None) == self.engine.turn_id:
+                self.engine.is_ai_speaking = False
+        yield item
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class VoicePipelineEngine:
+    """
+    Staged voice pipeline with pluggable providers.
+
+    Exposes the same interface as the legacy pipelines (initialize,
+    process_audio_chunk, get_output_stream, cleanup) so the FastAPI apps can
+    swap it in.
+    """
+
+    def __init__(self, stt: STTProvider, llm: LLMProvider, tts: TTSProvider,
+                 material_id: Optional[str] = None, retriever: Optional[NextJSRetriever] = None,
+                 channel_size: int = 64, vad_barge_in: bool = False,
+                 memory: Optional[ConversationMemory] = None,
+                 cache: Optional[AnswerCache] = answer_cache):
+        self.material_id = material_id
+        self.memory = memory if memory is not None else ConversationMemory()
+        self.answer_cache = cache
+        self.pending_answers: Dict[int, PendingAnswer] = {}
+        self.turn_id = 0
+        self.is_ai_speaking = False
+        self.output: Channel = Channel("output", maxsize=256)
+
+        self.ingest = IngestStage(self)
+        self.vad = VADStage(self, barge_in=True) if vad_barge_in else None
+        self.stt = STTStage(self, stt)
+        self.turns = TurnDetectorStage(self)
+        self.retrieval = RetrievalStage(self, retriever if retriever is not None else NextJSRetriever(material_id))
+        self.llm = LLMStage(self, llm)
+        self.segmenter = SegmenterStage(self)
+        self.tts = TTSStage(self, tts)
+        self.packetizer = PacketizerStage(self)
+        self.egress = EgressStage(self)
+
+        self.stages: List[Stage] = [
+            stage for stage in (self.ingest, self.vad, self.stt, self.turns, self.retrieval,
+                                self.llm, self.segmenter, self.tts, self.packetizer, self.egress)
+            if stage is not None
+        ]
+        self.channels: List[Channel] = [Channel(f"{stage.name}.in", channel_size) for stage in self.stages]
+        self.tasks: List[asyncio.Task] = []
+
+        logger.info(f"🎙️ Voice pipeline (ENGINE) created for material: {material_id}, "
+                    f"stt={stt.provider_name} llm={llm.provider_name} tts={tts.provider_name}")
+
+    async def initialize(self):
+        """
+        Start the STT provider and spawn one task per stage
+        """
+        await self.stt.start()
+        for index, stage in enumerate(self.stages):
+            inbox = self.channels[index]
+            outbox = self.channels[index + 1] if index + 1 < len(self.stages) else self.output
+            self.tasks.append(asyncio.create_task(stage.run(inbox, outbox), name=f"stage:{stage.name}"))
+        logger.info("✅ Pipeline engine started")
+        return True
+
+    async def process_audio_chunk(self, audio_bytes: bytes):
+        await self.channels[0].put(audio_bytes)
+
+    async def finalize_audio(self):
+        logger.info("🎤 Audio finalize called (streaming mode - no-op)")
+
+    async def emit(self, message: Dict[str, Any]):
+        """
+        Side channel for client messages (transcripts, status) that skip the downstream stages
+        """
+        await self.output.put(message)
+
+    def next_turn(self) -> int:
+        self.turn_id += 1
+        self.is_ai_speaking = True
+        return self.turn_id
+
+    async def serve_cached(self, turn: Turn, answer: CachedAnswer):
+        """
+        Replay a cached answer (text + audio packets) instead of running RAG/LLM/TTS
+        """
+        started = time.perf_counter()
+        await self.emit({"type": "text", "data": answer.text})
+        for packet in answer.audio:
+            if turn.turn_id != self.turn_id:
+                return  # Interrupted mid-answer
+            await self.emit({"type": "audio", "data": packet})
+        await self.emit({"type": "status", "data": "complete"})
+        self.is_ai_speaking = False
+        self.memory.add_turn(turn.text, answer.text)
+        self.answer_cache.record_saved(answer, time.perf_counter() - started)
+
+    async def store_answer(self, turn_id: int):
+        pending = self.pending_answers.pop(turn_id, None)
+        if pending and pending.text and turn_id == self.turn_id:
+            await self.answer_cache.store(self.material_id, pending.version, pending.question, pending.text,
+                                          pending.audio, time.perf_counter() - pending.started, pending.brief)
+
+    async def on_speech_start(self):
+        if self.is_ai_speaking:
+            await self.interrupt()
+
+    async def interrupt(self):
+        """
+        Barge-in: invalidate the current turn so every stage drops its items
+        """
+        logger.info("🛑 User interrupted")
+        self.turn_id += 1
+        self.is_ai_speaking = False
+        self.segmenter.buffer = ""
+        self.packetizer.pending.clear()
+        self.pending_answers.clear()
+        await self.emit({"type": "status", "data": "interrupted"})
+
+    async def get_output_stream(self):
+        while True:
+            message = await self.output.get()
+            if message is CLOSED:
+                return
+            yield message
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-stage throughput/service-time report plus channel high-water marks
+        """
+        report = []
+        for stage, channel in zip(self.stages, self.channels):
+            entry = stage.stats.as_dict()
+            entry["max_queue_depth"] = channel.max_depth
+            report.append(entry)
+        return report
+
+    async def cleanup(self):
+        try:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.stt.provider.finish()
+            logger.info(f"📊 Stage stats: {self.stats()}")
+            logger.info(f"📊 Prompt stats: {self.llm.prompts.stats.as_dict()}")
+            if self.answer_cache:
+                logger.info(f"📊 Answer cache: {self.answer_cache.stats()}")
+            logger.info("✅ Pipeline cleanup complete")
+        except Exception as e:
+            logger.error(f"❌ Cleanup error: {e}", exc_info=True)
+
+
+def create_engine(llm_provider: str, material_id: Optional[str] = None,
+                  memory: Optional[ConversationMemory] = None) -> VoicePipelineEngine:
+    """
+    Build an engine from registered provider names and environment API keys.
+    LLM_PROVIDERS=groq,gemini swaps the single LLM for a hedging router.
+    """
+    from llm_router import create_llm_from_env
+    from providers import create_provider
+
+    deepgram_api_key = os.getenv("DEEPGRAM_API_KEY")
+    return VoicePipelineEngine(
+        stt=create_provider("stt", "deepgram", api_key=deepgram_api_key),
+        llm=create_llm_from_env(llm_provider),
+        tts=create_provider("tts", "deepgram", api_key=deepgram_api_key),
+        material_id=material_id,
+        memory=memory,
+        vad_barge_in=os.getenv("VAD_BARGE_IN", "false").lower() == "true",
+    )
+
+
+async def shutdown_engine_resources():
+    await close_http_session()
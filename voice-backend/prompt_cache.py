@@ -0,0 +1,213 @@
+"""
+Prompt Prefix Cache
+Splits every tutor prompt into a stable prefix (persona + instructions +
+material summary), built once per material, and a small per-turn suffix
+(history, retrieved passages, question). The prefix is byte-identical across
+turns so providers with automatic prefix caching can reuse it, and it is kept
+smaller than the per-turn material excerpt the legacy prompts sent, so input
+shrinks even where nothing is cached (see benchmarks/bench_prompt_tokens.py).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from conversation_memory import estimate_tokens
+from providers import get_http_session
+from shared_store import SharedStore, shared_store
+
+logger = logging.getLogger(__name__)
+
+PERSONA = "You are Alex, a friendly, encouraging AI tutor. Your answers are spoken aloud, so be conversational."
+INSTRUCTIONS = "Keep responses brief (2-3 sentences max)."
+# Per-turn override while the node is shedding load (see session_manager)
+BRIEF_INSTRUCTIONS = "Answer in one short sentence."
+
+
+class PromptPrefix:
+    """
+    Stable, cacheable part of the prompt for one material
+    """
+
+    __slots__ = ("material_id", "version", "text", "tokens", "key")
+
+    def __init__(self, material_id: Optional[str], version: str, text: str):
+        self.material_id = material_id
+        self.version = version
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class PromptStats:
+    """
+    Input tokens per turn, split into the reusable prefix and the per-turn suffix
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.input_tokens = 0
+        self.prefix_tokens = 0
+        self.prefix_builds = 0
+
+    def record(self, prefix: PromptPrefix, suffix: str):
+        self.turns += 1
+        self.input_tokens += prefix.tokens + estimate_tokens(suffix)
+        self.prefix_tokens += prefix.tokens
+
+    def as_dict(self) -> Dict:
+        turns = self.turns or 1
+        return {
+            "turns": self.turns,
+            "prefix_builds": self.prefix_builds,
+            "avg_input_tokens": round(self.input_tokens / turns, 1),
+            "avg_prefix_tokens": round(self.prefix_tokens / turns, 1),
+            "avg_suffix_tokens": round((self.input_tokens - self.prefix_tokens) / turns, 1),
+        }
+
+
+class PromptCache:
+    """
+    Per-material prompt prefixes with TTL and stale-while-revalidate.
+
+    The material summary comes from the Next.js /api/materials/{id} route and
+    is fetched once per material (concurrent sessions share one fetch, other
+    worker processes read it from the shared store).
+    """
+
+    def __init__(self, persona: str = PERSONA, instructions: str = INSTRUCTIONS,
+                 material_url: str = "http://localhost:3000/api/materials",
+                 summary_chars: int = 1500, ttl: float = 900.0, max_materials: int = 256,
+                 shared: Optional[SharedStore] = shared_store):
+        self.persona = persona
+        self.instructions = instructions
+        self.material_url = material_url.rstrip("/")
+        self.summary_chars = summary_chars
+        self.ttl = ttl
+        self.max_materials = max_materials
+        self.shared = shared
+        self.base = PromptPrefix(None, "base", f"{persona}\n\n{instructions}")
+        self.stats = PromptStats()
+        self._prefixes: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get_prefix(self, material_id: Optional[str]) -> PromptPrefix:
+        if not material_id:
+            return self.base
+        entry = self._prefixes.get(material_id)
+        if entry:
+            self._prefixes.move_to_end(material_id)
+            if time.monotonic() - entry[0] >= self.ttl and material_id not in self._inflight:
+                # Serve the current prefix, refresh in the background
+                self._refresh(material_id)
+            return entry[1]
+        task = self._inflight.get(material_id) or self._refresh(material_id)
+        return await asyncio.shield(task)
+
+    def _refresh(self, material_id: str) -> asyncio.Task:
+        task = asyncio.create_task(self._load(material_id))
+        self._inflight[material_id] = task
+        task.add_done_callback(lambda _: self._inflight.pop(material_id, None))
+        return task
+
+    async def _load(self, material_id: str) -> PromptPrefix:
+        import aiohttp
+
+        current = self._prefixes.get(material_id)
+        # Another worker may have fetched it within the TTL
+        data = await self.shared.aget_json("materials", material_id) if self.shared else None
+        if data is None:
+            try:
+                session = await get_http_session()
+                async with session.get(f"{self.material_url}/{material_id}",
+                                       timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    if response.status != 200:
+                        logger.warning(f"⚠️ Material fetch failed: {response.status}")
+                        return current[1] if current else self.base
+                    data = await response.json()
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                logger.warning(f"⚠️ Material fetch error: {e}")
+                return current[1] if current else self.base
+            data = self.material_fields(data)
+            if self.shared:
+                await self.shared.aset_json("materials", material_id, data, ttl=self.ttl)
+
+        version = str(data.get("updatedAt") or "")
+        if current and version and current[1].version == version:
+            prefix = current[1]  # Unchanged: keep the same object so provider caches stay valid
+        else:
+            prefix = self.build_prefix(material_id, data, version)
+            self.stats.prefix_builds += 1
+            logger.info(f"📌 Prompt prefix for material {material_id}: ~{prefix.tokens} tokens")
+
+        self._prefixes[material_id] = (time.monotonic(), prefix)
+        self._prefixes.move_to_end(material_id)
+        while len(self._prefixes) > self.max_materials:
+            self._prefixes.popitem(last=False)
+        return prefix
+
+    def material_fields(self, material: Dict) -> Dict:
+        """
+        The parts of an /api/materials response the prefix uses, with the summary already cut
+        """
+        summary = material.get("wholeSummary") or material.get("content") or "\n".join(
+            chapter["summaryBrief"] for chapter in material.get("chapters", []) if chapter.get("summaryBrief"))
+        return {
+            "title": material.get("title"),
+            "author": material.get("author"),
+            "updatedAt": material.get("updatedAt"),
+            "wholeSummary": _truncate(summary or "", self.summary_chars),
+        }
+
+    def build_prefix(self, material_id: Optional[str], material: Dict, version: str = "") -> PromptPrefix:
+        """
+        Persona + instructions + material summary as one stable string
+        """
+        summary = self.material_fields(material)["wholeSummary"]
+
+        header = f"The student is studying \"{material.get('title') or 'their material'}\""
+        if material.get("author"):
+            header += f" by {material['author']}"
+        parts = [self.persona, self.instructions, f"{header}."]
+        if summary:
+            parts.append(f"Summary of the material:\n{summary}")
+        return PromptPrefix(material_id, version or "unversioned", "\n\n".join(parts))
+
+    @staticmethod
+    def render_turn(question: str, context: str = "", history: str = "", brief: bool = False) -> str:
+        """
+        Per-turn suffix; everything here changes every turn
+        """
+        parts = []
+        if history:
+            parts.append(history)
+        if context:
+            parts.append(f"Relevant passages from the material:\n{context}")
+        parts.append(f"Student: {question}")
+        if brief:
+            parts.append(BRIEF_INSTRUCTIONS)
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def join(prefix: PromptPrefix, suffix: str) -> str:
+        """
+        Single-string prompt for callers without a separate system slot
+        """
+        return f"{prefix.text}\n\n{suffix}"
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+prompt_cache = PromptCache(
+    summary_chars=int(os.getenv("PROMPT_SUMMARY_CHARS", "1500")),
+    ttl=float(os.getenv("PROMPT_PREFIX_TTL", "900")),
+)
@@ -0,0 +1,370 @@
+"""
+Provider plugins for the voice pipeline engine
+STT (Deepgram), LLM (Gemini, Groq) and TTS (Deepgram) behind small async interfaces
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEEPGRAM_BASE_URL = "https://api.deepgram.com/v1"
+DEFAULT_SYSTEM_PROMPT = "You are Alex, a helpful and friendly AI tutor. Be encouraging and educational. Keep responses brief and conversational."
+
+# Registries: provider kind -> name -> factory
+PROVIDERS: Dict[str, Dict[str, Callable]] = {"stt": {}, "llm": {}, "tts": {}}
+
+
+def register_provider(kind: str, name: str):
+    """
+    Class decorator that registers a provider plugin under (kind, name)
+    """
+    def decorator(cls):
+        PROVIDERS[kind][name] = cls
+        cls.provider_name = name
+        return cls
+    return decorator
+
+
+def create_provider(kind: str, name: str, **kwargs):
+    """
+    Instantiate a registered provider plugin
+    """
+    try:
+        factory = PROVIDERS[kind][name]
+    except KeyError:
+        available = ", ".join(sorted(PROVIDERS.get(kind, {}))) or "none"
+        raise ValueError(f"Unknown {kind} provider '{name}' (available: {available})")
+    return factory(**kwargs)
+
+
+# SDK each provider imports on first use; nothing here is imported at module load
+SDK_MODULES = {
+    ("stt", "deepgram"): "deepgram",
+    ("llm", "gemini"): "google.generativeai",
+    ("llm", "groq"): "groq",
+    ("llm", "openai_compat"): "aiohttp",
+    ("tts", "deepgram"): "aiohttp",
+}
+
+
+def _import_sdks(modules) -> Dict[str, float]:
+    timings = {}
+    for module in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"⚠️ SDK preload skipped {module}: {e}")
+            continue
+        timings[module] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def install_sdk_preload(app, *modules: str):
+    """
+    Import the SDKs this app will use in a worker thread once it is serving, so
+    readiness doesn't wait for them and the first session doesn't import them
+    on the event loop
+    """
+    modules = list(dict.fromkeys(module for module in modules if module))
+
+    @app.on_event("startup")
+    async def preload_sdks():
+        async def preload():
+            timings = await asyncio.to_thread(_import_sdks, modules)
+            logger.info(f"📦 SDKs preloaded: {timings}")
+
+        app.state.sdk_preload = asyncio.create_task(preload(), name="sdk-preload")
+
+
+_http_session = None
+
+
+async def get_http_session():
+    """
+    Process-wide aiohttp session so TTS and RAG calls reuse warm TCP/TLS connections
+    """
+    global _http_session
+    import aiohttp
+
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=30)
+        )
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+class STTProvider:
+    """
+    Streaming speech-to-text: audio in via send(), transcripts out via the on_transcript callback
+    """
+
+    provider_name = "base"
+
+    async def start(self, on_transcript: Callable[[str, bool, bool], Awaitable[None]]):
+        raise NotImplementedError
+
+    async def send(self, audio_bytes: bytes):
+        raise NotImplementedError
+
+    async def finish(self):
+        pass
+
+
+class LLMProvider:
+    """
+    Streaming LLM: yields text chunks as they arrive
+    """
+
+    provider_name = "base"
+
+    def stream(self, prompt: str, system: Optional[str] = None) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class TTSProvider:
+    """
+    Text-to-speech: yields encoded audio chunks as they arrive
+    """
+
+    provider_name = "base"
+
+    def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+
+@register_provider("stt", "deepgram")
+class DeepgramSTT(STTProvider):
+    """
+    Deepgram live transcription over the asyncio client (no SDK threads)
+    """
+
+    def __init__(self, api_key: str, model: str = "nova-2", sample_rate: int = 48000, endpointing: int = 500):
+        self.api_key = api_key
+        self.model = model
+        self.sample_rate = sample_rate
+        self.endpointing = endpointing
+        self.connection = None
+
+    async def start(self, on_transcript):
+        from deepgram import LiveTranscriptionEvents
+        from deepgram_pool import STANDARD_LIVE_OPTIONS
+        from resilient_stt import ResilientLiveConnection
+
+        # Warm pooled connection when these match the standard options, fresh one otherwise;
+        # reconnects and replays buffered audio if Deepgram drops
+        options = {**STANDARD_LIVE_OPTIONS, "model": self.model, "sample_rate": self.sample_rate,
+                   "endpointing": self.endpointing}
+        self.connection = ResilientLiveConnection(options=options)
+        await self.connection.start()
+
+        async def _on_transcript(_connection, *args, **kwargs):
+            result = kwargs.get("result")
+            if not result:
+                return
+            text = result.channel.alternatives[0].transcript
+            if text:
+                await on_transcript(text, bool(result.is_final), bool(getattr(result, "speech_final", False)))
+
+        async def _on_error(_connection, *args, **kwargs):
+            error = kwargs.get("error")
+            if error is not None:
+                logger.error(f"❌ Deepgram error: {error}")
+
+        self.connection.on(LiveTranscriptionEvents.Transcript, _on_transcript)
+        self.connection.on(LiveTranscriptionEvents.Error, _on_error)
+
+        logger.info("✅ Deepgram streaming connection established")
+
+    async def send(self, audio_bytes: bytes):
+        if self.connection:
+            await self.connection.send(audio_bytes)
+
+    async def finish(self):
+        if self.connection:
+            await self.connection.finish()
+            self.connection = None
+
+
+@register_provider("llm", "gemini")
+class GeminiLLM(LLMProvider):
+    """
+    Gemini streaming generation
+    """
+
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash-exp"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model
+        self.model = genai.GenerativeModel(model)
+
+    async def stream(self, prompt: str, system: Optional[str] = None):
+        if system:
+            prompt = f"{system}\n\n{prompt}"
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+@register_provider("llm", "groq")
+class GroqLLM(LLMProvider):
+    """
+    Groq chat completions streaming
+    """
+
+    def __init__(self, api_key: str, model: str = "llama-3.3-70b-versatile", base_url: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 500):
+        from groq import AsyncGroq
+
+        self.model_name = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url) if base_url else AsyncGroq(api_key=api_key)
+
+    async def stream(self, prompt: str, system: Optional[str] = None):
+        messages = [{"role": "system", "content": system or DEFAULT_SYSTEM_PROMPT}]
+        messages.append({"role": "user", "content": prompt})
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            model=self.model_name,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+
+
+@register_provider("llm", "openai_compat")
+class OpenAICompatLLM(LLMProvider):
+    """
+    Any OpenAI-compatible /chat/completions endpoint streamed over SSE (local servers, fakes)
+    """
+
+    def __init__(self, base_url: str, model: str = "default", api_key: Optional[str] = None,
+                 label: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 500):
+        self.base_url = base_url.rstrip("/")
+        self.model_name = model
+        self.api_key = api_key
+        self.label = label or self.base_url
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    async def stream(self, prompt: str, system: Optional[str] = None):
+        import json
+
+        session = await get_http_session()
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": system or DEFAULT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": True,
+        }
+        async with session.post(f"{self.base_url}/chat/completions", json=payload, headers=headers) as response:
+            if response.status != 200:
+                raise Exception(f"LLM request failed: {response.status} - {await response.text()}")
+            async for line in response.content:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    return
+                content = json.loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+
+
+@register_provider("tts", "deepgram")
+class DeepgramTTS(TTSProvider):
+    """
+    Deepgram Aura TTS, streamed chunk-by-chunk from the HTTP response body
+    """
+
+    def __init__(self, api_key: str, model: str = "aura-asteria-en", encoding: str = "mp3", chunk_size: int = 4096):
+        self.api_key = api_key
+        self.model = model
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+
+    async def synthesize(self, text: str):
+        session = await get_http_session()
+        url = f"{DEEPGRAM_BASE_URL}/speak"
+        params = {"model": self.model, "encoding": self.encoding}
+        headers = {
+            "Authorization": f"Token {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        async with session.post(url, params=params, headers=headers, json={"text": text}) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"❌ Deepgram TTS error: {response.status} - {error_text}")
+                return
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                yield chunk
+
+
+class NextJSRetriever:
+    """
+    RAG lookup against the Next.js /api/search-documents route.
+    Results are kept for `ttl` seconds in the store shared by all workers.
+    """
+
+    def __init__(self, material_id: Optional[str], url: str = "http://localhost:3000/api/search-documents",
+                 top_k: int = 3, timeout: float = 4.0, ttl: float = 600.0, shared=None):
+        from shared_store import shared_store
+
+        self.material_id = material_id
+        self.url = url
+        self.top_k = top_k
+        self.timeout = timeout
+        self.ttl = ttl
+        self.shared = shared if shared is not None else shared_store
+
+    async def search(self, query: str) -> str:
+        if not self.material_id:
+            return ""
+        key = f"{self.material_id}:{self.top_k}:{' '.join(query.lower().split())}"
+        cached = await self.shared.aget("rag", key) if self.shared else None
+        if cached is not None:
+            return cached.decode("utf-8")
+        context = await self._fetch(query)
+        if context and self.shared:
+            await self.shared.aset("rag", key, context.encode("utf-8"), ttl=self.ttl)
+        return context
+
+    async def _fetch(self, query: str) -> str:
+        import aiohttp
+
+        session = await get_http_session()
+        payload = {"query": query, "materialId": self.material_id, "topK": self.top_k}
+        try:
+            async with session.post(self.url, json=payload, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                if response.status != 200:
+                    logger.warning(f"⚠️ Search failed: {response.status}")
+                    return ""
+                data = await response.json()
+                return "\n\n".join(item["content"] for item in data.get("results", []) if item.get("content"))
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            logger.warning(f"⚠️ RAG search error: {e}")
+            return ""
@@ -0,0 +1,259 @@
+"""
+Resilient Deepgram STT Connection
+Wraps a pooled live connection so an upstream blip does not cost the turn.
+
+Every PCM frame from the browser also goes into a ring buffer covering the
+last few seconds. When the connection drops (failed send, Error or Close),
+a new one is acquired with exponential backoff while incoming audio keeps
+buffering, so the student is never paused. On reconnect the audio after the
+last final transcript is replayed, starting a little earlier so the
+recognizer has context for the first word; words that fall before the seam
+were already delivered and are trimmed from the new results.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from deepgram import LiveTranscriptionEvents
+
+from deepgram_pool import DeepgramLivePool, PooledLiveConnection, deepgram_pool
+
+logger = logging.getLogger(__name__)
+
+_FORWARDED = (
+    LiveTranscriptionEvents.Metadata,
+    LiveTranscriptionEvents.UtteranceEnd,
+    LiveTranscriptionEvents.SpeechStarted,
+)
+SEAM_TOLERANCE = 0.02  # seconds of timestamp jitter between connections
+
+
+class ResilientLiveConnection:
+    """
+    Live transcription connection with replay buffer and automatic reconnect.
+    Same surface as the pooled connection: on/start/send/finish.
+    """
+
+    def __init__(self, pool: DeepgramLivePool = deepgram_pool, options: Optional[Dict] = None,
+                 buffer_seconds: float = 5.0, seam_overlap: float = 0.5, initial_backoff: float = 0.25,
+                 max_backoff: float = 8.0, max_outage: float = 30.0):
+        self.pool = pool
+        self.options = options
+        live = options or pool.options
+        self.frame_bytes = 2 * live.get("channels", 1)  # linear16
+        self.bytes_per_second = live["sample_rate"] * self.frame_bytes
+        self.buffer_bytes = int(buffer_seconds * self.bytes_per_second)
+        self.seam_overlap = seam_overlap
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_outage = max_outage
+
+        self.connection: Optional[PooledLiveConnection] = None
+        self.handlers: Dict[LiveTranscriptionEvents, List[Callable]] = {}
+        self.frames: Deque[Tuple[int, bytes]] = deque()  # (stream offset, chunk)
+        self.buffered = 0
+        self.position = 0  # bytes received from the client so far
+        self.connection_base = 0  # stream offset the current connection's timestamps start at
+        self.acked = 0.0  # stream seconds covered by final transcripts
+        self.reconnect_task: Optional[asyncio.Task] = None
+        self.finishing = False
+        self.failed = False
+        self.counters = {"reconnects": 0, "replayed_bytes": 0, "lost_bytes": 0, "trimmed_words": 0,
+                         "dropped_results": 0}
+
+    def on(self, event: LiveTranscriptionEvents, handler: Callable):
+        self.handlers.setdefault(event, []).append(handler)
+        return handler
+
+    async def _emit(self, event: LiveTranscriptionEvents, *args, **kwargs):
+        for handler in self.handlers.get(event, ()):
+            await handler(self, *args, **kwargs)
+
+    async def start(self, options=None, **kwargs) -> bool:
+        self._attach(await self.pool.acquire(self.options))
+        return True
+
+    def _attach(self, connection: PooledLiveConnection):
+        self.connection = connection
+        connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+        connection.on(LiveTranscriptionEvents.Error, self._on_error)
+        connection.on(LiveTranscriptionEvents.Close, self._on_close)
+        for event in _FORWARDED:
+            connection.on(event, self._forwarder(event))
+
+    def _forwarder(self, event):
+        async def forward(connection, *args, **kwargs):
+            if connection is self.connection:
+                await self._emit(event, *args, **kwargs)
+        return forward
+
+    async def _on_transcript(self, connection, *args, **kwargs):
+        result = kwargs.get("result")
+        if connection is not self.connection or result is None:
+            return
+        base = self.connection_base / self.bytes_per_second
+        start = base + result.start
+        end = start + result.duration
+        if start < self.acked - SEAM_TOLERANCE:
+            # Overlaps audio already transcribed before the reconnect
+            if end <= self.acked + SEAM_TOLERANCE or not self._trim(result, base):
+                self.counters["dropped_results"] += 1
+                return
+        if result.is_final:
+            self.acked = max(self.acked, end)
+        await self._emit(LiveTranscriptionEvents.Transcript, *args, **kwargs)
+
+    def _trim(self, result, base: float) -> bool:
+        """
+        Drop words that start before the seam; False if nothing is left
+        """
+        alternative = result.channel.alternatives[0]
+        words = alternative.words or []
+        kept = [word for word in words if base + word.start >= self.acked - SEAM_TOLERANCE]
+        self.counters["trimmed_words"] += len(words) - len(kept)
+        if not kept:
+            return False
+        alternative.words = kept
+        alternative.transcript = " ".join(word.punctuated_word or word.word for word in kept)
+        return True
+
+    async def _on_error(self, connection, *args, **kwargs):
+        if connection is self.connection:
+            error = kwargs.get("error") or (args[0] if args else None)
+            self._connection_lost(f"error: {error}")
+
+    async def _on_close(self, connection, *args, **kwargs):
+        if connection is not self.connection:
+            return
+        if self.finishing:
+            await self._emit(LiveTranscriptionEvents.Close, *args, **kwargs)
+        else:
+            self._connection_lost("closed by Deepgram")
+
+    def _buffer(self, data: bytes):
+        self.frames.append((self.position, data))
+        self.position += len(data)
+        self.buffered += len(data)
+        while self.frames and self.buffered - len(self.frames[0][1]) >= self.buffer_bytes:
+            self.buffered -= len(self.frames.popleft()[1])
+
+    def _audio_from(self, offset: int) -> bytes:
+        parts = []
+        for frame_offset, chunk in self.frames:
+            if frame_offset + len(chunk) <= offset:
+                continue
+            parts.append(chunk[max(0, offset - frame_offset):])
+        return b"".join(parts)
+
+    async def send(self, data: bytes) -> bool:
+        """
+        Buffer the frame and forward it; False only once reconnecting has been given up
+        """
+        if self.failed:
+            return False
+        self._buffer(data)
+        if self.reconnect_task is None and self.connection is not None:
+            try:
+                sent = await self.connection.send(data)
+            except Exception as e:
+                logger.debug(f"Deepgram send error: {e}")
+                sent = False
+            if not sent or not self.connection.is_alive():
+                self._connection_lost("send failed")
+        return True
+
+    def _connection_lost(self, reason: str):
+        if self.finishing or self.failed or self.reconnect_task is not None:
+            return
+        logger.warning(f"🔄 Deepgram connection lost ({reason}); reconnecting")
+        self.reconnect_task = asyncio.create_task(self._reconnect(self.connection), name="deepgram-reconnect")
+
+    async def _reconnect(self, old: Optional[PooledLiveConnection]):
+        started = time.monotonic()
+        if old is not None:
+            await self._discard(old)
+
+        delay = self.initial_backoff
+        attempt = 0
+        while not self.finishing:
+            attempt += 1
+            connection = None
+            try:
+                connection = await self.pool.acquire(self.options)
+                if await self._replay(connection):
+                    break
+                error = "replay send failed"
+            except Exception as e:
+                error = e
+            if connection is not None:
+                await self._discard(connection)
+            if time.monotonic() - started > self.max_outage:
+                await self._give_up(error)
+                return
+            logger.warning(f"⚠️ Deepgram reconnect attempt {attempt} failed ({error}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.max_backoff)
+        if self.finishing:
+            return
+
+        self.counters["reconnects"] += 1
+        self.reconnect_task = None
+        logger.info(f"✅ Deepgram reconnected in {(time.monotonic() - started) * 1000:.0f}ms "
+                    f"(attempt {attempt})")
+
+    async def _replay(self, connection: PooledLiveConnection) -> bool:
+        """
+        Attach `connection` and send it the audio after the last final transcript,
+        including frames that keep arriving while the replay is in flight
+        """
+        seam = int((self.acked - self.seam_overlap) * self.bytes_per_second)
+        seam -= seam % self.frame_bytes
+        earliest = self.frames[0][0] if self.frames else self.position
+        acked_bytes = int(self.acked * self.bytes_per_second)
+        if acked_bytes < earliest:
+            self.counters["lost_bytes"] += earliest - acked_bytes
+            logger.warning(f"⚠️ {(earliest - acked_bytes) / self.bytes_per_second:.1f}s of audio fell out "
+                           f"of the replay buffer during the outage")
+        offset = max(seam, earliest)
+
+        self.connection_base = offset
+        self._attach(connection)
+        while offset < self.position:
+            audio = self._audio_from(offset)
+            if not await connection.send(audio):
+                return False
+            offset += len(audio)
+            self.counters["replayed_bytes"] += len(audio)
+        return connection.is_alive()
+
+    @staticmethod
+    async def _discard(connection: PooledLiveConnection):
+        try:
+            await asyncio.wait_for(connection.finish(), timeout=1.0)
+        except Exception:
+            pass
+
+    async def _give_up(self, error):
+        self.failed = True
+        self.reconnect_task = None
+        logger.error(f"❌ Deepgram unavailable for {self.max_outage:.0f}s, giving up: {error}")
+        await self._emit(LiveTranscriptionEvents.Error, error=f"Speech recognition connection lost: {error}")
+
+    async def finish(self) -> bool:
+        self.finishing = True
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        if self.connection is not None:
+            return await self.connection.finish()
+        return True
+
+    def is_alive(self) -> bool:
+        return not self.failed and not self.finishing
+
+    def stats(self) -> Dict:
+        return {**self.counters, "buffered_seconds": round(self.buffered / self.bytes_per_second, 2)}
@@ -0,0 +1,177 @@
+"""
+Session Manager
+Admission control for voice sessions on one node.
+
+MAX_SESSIONS is the node's cap. Each worker process runs its own manager, so with
+SESSION_WORKERS (set by uvicorn_workers, else WEB_CONCURRENCY) above 1 every worker
+takes an equal share of it, and /health reports that worker's share.
+
+Each session holds a Deepgram connection, LLM client, queues and a share of
+the event loop, so past some number of sessions every turn gets slower for
+everyone. The manager caps live sessions (MAX_SESSIONS), either rejecting new
+ones immediately or queueing them for up to SESSION_QUEUE_TIMEOUT seconds,
+and reports capacity for /health. Above SESSION_SHED_AT of the cap it asks
+pipelines to shed load (no filler audio, shorter answers) before latency
+collapses.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class CapacityExceeded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SessionLease:
+    __slots__ = ("id", "session_id", "admitted_at", "waited")
+
+    def __init__(self, lease_id: int, session_id: Optional[str]):
+        self.id = lease_id
+        self.session_id = session_id
+        self.admitted_at = time.monotonic()
+        self.waited = 0.0
+
+
+class SessionManager:
+    """
+    Concurrency cap with fast-fail or bounded FIFO queueing
+    """
+
+    def __init__(self, max_sessions: int = 40, queue_timeout: float = 0.0, max_queue: int = 20,
+                 shed_at: float = 0.8, retry_after: float = 5.0, workers: int = 1):
+        self.workers = max(1, workers)
+        self.node_max_sessions = max_sessions
+        self.max_sessions = max(1, max_sessions // self.workers)
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.shed_threshold = max(1, math.ceil(shed_at * self.max_sessions))
+        self.retry_after = retry_after
+        self.active: Dict[int, SessionLease] = {}
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._ids = itertools.count(1)
+        self.peak = 0
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def shedding(self) -> bool:
+        """
+        True while the node is close enough to the cap that pipelines should do less per turn
+        """
+        return len(self.active) >= self.shed_threshold
+
+    def _admit(self, session_id: Optional[str]) -> SessionLease:
+        lease = SessionLease(next(self._ids), session_id)
+        self.active[lease.id] = lease
+        self.peak = max(self.peak, len(self.active))
+        self.counters["admitted"] += 1
+        if len(self.active) == self.shed_threshold:
+            logger.warning(f"🪫 {len(self.active)}/{self.max_sessions} sessions: shedding load "
+                           f"(no fillers, shorter answers)")
+        return lease
+
+    def would_queue(self) -> bool:
+        return len(self.active) >= self.max_sessions or bool(self._waiters)
+
+    def can_queue(self) -> bool:
+        return self.queue_timeout > 0 and len(self._waiters) < self.max_queue
+
+    async def acquire(self, session_id: Optional[str] = None) -> SessionLease:
+        """
+        Admit a session, waiting up to `queue_timeout` for a slot; raises CapacityExceeded
+        """
+        if not self.would_queue():
+            return self._admit(session_id)
+        if not self.can_queue():
+            self.counters["rejected"] += 1
+            raise CapacityExceeded(f"At capacity ({self.max_sessions} sessions)", self.retry_after)
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.counters["queued"] += 1
+        try:
+            lease = await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise CapacityExceeded(f"No session slot within {self.queue_timeout:.0f}s", self.retry_after)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(waiter.result())  # Client went away just as a slot was handed over
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        lease.session_id = session_id
+        lease.waited = time.monotonic() - started
+        if lease.waited > 1.0:
+            logger.info(f"⏳ Session admitted after {lease.waited:.1f}s in queue")
+        return lease
+
+    def release(self, lease: Optional[SessionLease]):
+        if lease is None or self.active.pop(lease.id, None) is None:
+            return
+        # Hand the freed slot straight to the longest waiter so new arrivals can't jump the queue
+        while self._waiters and len(self.active) < self.max_sessions:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(self._admit(None))
+                break
+
+    def capacity(self) -> Dict:
+        """
+        This worker's share: with several workers, other processes hold their own sessions
+        """
+        return {
+            "scope": "worker",
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "node_max_sessions": self.node_max_sessions,
+            "max_sessions": self.max_sessions,
+            "active": len(self.active),
+            "available": max(0, self.max_sessions - len(self.active)),
+            "queued": len(self._waiters),
+            "shedding": self.shedding,
+            "peak": self.peak,
+            **self.counters,
+        }
+
+
+session_manager = SessionManager(
+    max_sessions=int(os.getenv("MAX_SESSIONS", "40")),
+    queue_timeout=float(os.getenv("SESSION_QUEUE_TIMEOUT", "0")),
+    max_queue=int(os.getenv("SESSION_MAX_QUEUE", "20")),
+    shed_at=float(os.getenv("SESSION_SHED_AT", "0.8")),
+    workers=int(os.getenv("SESSION_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"),
+)
+
+
+async def admit_websocket(websocket, session_id: Optional[str] = None,
+                          manager: SessionManager = session_manager) -> Optional[SessionLease]:
+    """
+    Admit an accepted /ws connection, or tell the client to retry later and close it.
+    Returns None when the session was turned away.
+    """
+    try:
+        if manager.would_queue() and manager.can_queue():
+            await websocket.send_json({"type": "status", "data": "queued"})
+        return await manager.acquire(session_id)
+    except CapacityExceeded as e:
+        logger.warning(f"🚫 Session rejected: {e.reason}")
+        try:
+            await websocket.send_json({"type": "error", "data": f"Server busy, please retry in {e.retry_after:.0f}s",
+                                       "retry_after": e.retry_after})
+            await websocket.close(code=1013, reason="Try again later")
+        except Exception:
+            pass
+        return None
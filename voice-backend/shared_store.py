@@ -0,0 +1,221 @@
+"""
+Shared Cache Store
+Key/value store shared by all worker processes on a node.
+
+Backed by one SQLite file in /dev/shm (tmpfs) opened with mmap I/O in WAL
+mode, so every worker reads the same pages from shared memory instead of
+keeping its own copy of material content, RAG results and cached answer
+audio. Values are bytes (or JSON) with a per-entry TTL; the oldest entries
+are dropped when the store grows past `max_bytes`.
+
+SQLite calls block (up to the 1 s busy timeout when another worker holds the
+write lock), so async code uses the `a*` methods, which run on a small
+dedicated thread pool, and pruning runs there in the background.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# TTS audio for phrases up to this length (fillers, greetings) is cached node-wide
+SHARED_TTS_MAX_CHARS = 80
+
+
+def default_path(namespace: str = "default") -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"voice-backend-{namespace}.sqlite")
+
+
+def store_path() -> str:
+    """
+    SHARED_CACHE_PATH, else a file per SHARED_CACHE_NAMESPACE (set per app and port by uvicorn_workers)
+    """
+    return os.getenv("SHARED_CACHE_PATH") or default_path(os.getenv("SHARED_CACHE_NAMESPACE", "default"))
+
+
+class SharedStore:
+    """
+    Cross-process bytes/JSON cache (namespace, key) -> value with TTL
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024,
+                 mmap_bytes: int = 256 * 1024 * 1024, threads: int = 2):
+        self.path = path or default_path()
+        self.max_bytes = max_bytes
+        self.mmap_bytes = mmap_bytes
+        self.threads = threads
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = 0
+        self._pruning = threading.Lock()
+        self._writes = 0
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: opened lazily after fork)
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=OFF")  # tmpfs: nothing to fsync
+            db.execute("PRAGMA journal_size_limit=67108864")  # Truncate the WAL back to 64 MB after checkpoints
+            db.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            db.execute("CREATE TABLE IF NOT EXISTS store (namespace TEXT, key TEXT, value BLOB, "
+                       "expires REAL, PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+            db.execute("CREATE INDEX IF NOT EXISTS store_expires ON store (expires)")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Worker threads don't survive fork: each process starts its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="shared-store")
+            self._executor_pid = os.getpid()
+            self._pruning = threading.Lock()
+        return self._executor
+
+    async def _run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), functools.partial(fn, *args, **kwargs))
+
+    async def aget(self, namespace: str, key: str) -> Optional[bytes]:
+        return await self._run(self.get, namespace, key)
+
+    async def aset(self, namespace: str, key: str, value: bytes, ttl: float = 3600.0):
+        await self._run(self.set, namespace, key, value, ttl)
+
+    async def aget_json(self, namespace: str, key: str) -> Any:
+        return await self._run(self.get_json, namespace, key)
+
+    async def aset_json(self, namespace: str, key: str, value: Any, ttl: float = 3600.0):
+        await self._run(self.set_json, namespace, key, value, ttl)
+
+    async def akeys(self, namespace: str, prefix: str = "") -> List[str]:
+        return await self._run(self.keys, namespace, prefix)
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        try:
+            row = self._db().execute("SELECT value FROM store WHERE namespace = ? AND key = ? AND expires > ?",
+                                     (namespace, key, time.time())).fetchone()
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            logger.debug(f"Shared store read error: {e}")
+            return None
+        self.counters["hits" if row else "misses"] += 1
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float = 3600.0):
+        try:
+            self._db().execute("INSERT OR REPLACE INTO store VALUES (?, ?, ?, ?)",
+                               (namespace, key, value, time.time() + ttl))
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            logger.debug(f"Shared store write error: {e}")
+            return
+        self.counters["writes"] += 1
+        self._writes += 1
+        if self._writes % 200 == 0:
+            self.prune_in_background()
+
+    def get_json(self, namespace: str, key: str) -> Any:
+        value = self.get(namespace, key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, namespace: str, key: str, value: Any, ttl: float = 3600.0):
+        self.set(namespace, key, json.dumps(value, separators=(",", ":")).encode("utf-8"), ttl)
+
+    def keys(self, namespace: str, prefix: str = "") -> List[str]:
+        try:
+            rows = self._db().execute(
+                "SELECT key FROM store WHERE namespace = ? AND key >= ? AND key < ? AND expires > ?",
+                (namespace, prefix, prefix + "\U0010ffff", time.time())).fetchall()
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            logger.debug(f"Shared store read error: {e}")
+            return []
+        return [row[0] for row in rows]
+
+    def delete(self, namespace: str, prefix: str = ""):
+        try:
+            self._db().execute("DELETE FROM store WHERE namespace = ? AND key >= ? AND key < ?",
+                               (namespace, prefix, prefix + "\U0010ffff"))
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            logger.debug(f"Shared store delete error: {e}")
+
+    def prune_in_background(self):
+        """
+        Start a prune on the store's pool unless one is already running
+        """
+        if self._pruning.acquire(blocking=False):
+            future = self._pool().submit(self.prune)
+            future.add_done_callback(lambda _: self._pruning.release())
+
+    def prune(self):
+        """
+        Drop expired entries, then the soonest-expiring ones while over `max_bytes`
+        """
+        try:
+            db = self._db()
+            db.execute("DELETE FROM store WHERE expires <= ?", (time.time(),))
+            size = db.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM store").fetchone()[0]
+            if size > self.max_bytes:
+                excess = size - int(self.max_bytes * 0.9)
+                freed = 0
+                for namespace, key, length in db.execute(
+                        "SELECT namespace, key, LENGTH(value) FROM store ORDER BY expires").fetchall():
+                    db.execute("DELETE FROM store WHERE namespace = ? AND key = ?", (namespace, key))
+                    freed += length
+                    if freed >= excess:
+                        break
+                logger.info(f"🧹 Shared store trimmed {freed / 1e6:.1f} MB")
+        except sqlite3.Error as e:
+            self.counters["errors"] += 1
+            logger.debug(f"Shared store prune error: {e}")
+
+    def stats(self) -> Dict:
+        return {**self.counters, "path": self.path, "pid": os.getpid()}
+
+
+def uvicorn_workers(app: str, port: int) -> Optional[int]:
+    """
+    Worker processes from WORKERS ("auto" = one per core); None when unset (dev: single worker with reload).
+
+    With more than one worker the shared store is switched on for the workers (unless SHARED_CACHE is
+    set), in a file named after `app` and `port` so other apps on the host never read its entries.
+    Called before the workers start, so the previous run's file is removed here. SESSION_WORKERS is
+    set too, so each worker's session_manager takes its share of MAX_SESSIONS.
+    """
+    workers = os.getenv("WORKERS")
+    if not workers:
+        return None
+    count = os.cpu_count() or 1 if workers == "auto" else max(1, int(workers))
+    os.environ["SESSION_WORKERS"] = str(count)
+    if count > 1:
+        os.environ.setdefault("SHARED_CACHE", "true")
+        os.environ.setdefault("SHARED_CACHE_NAMESPACE", f"{app}-{port}")
+        if os.environ["SHARED_CACHE"].lower() == "true":
+            path = store_path()
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+    return count
+
+
+# Off unless enabled: uvicorn_workers turns it on for multi-worker runs (workers inherit the environment)
+shared_store = SharedStore(
+    path=store_path(),
+    max_bytes=int(os.getenv("SHARED_CACHE_MB", "512")) * 1024 * 1024,
+) if os.getenv("SHARED_CACHE", "false").lower() == "true" else None
@@ -0,0 +1,139 @@
+"""
+Structured Logging
+Non-blocking log pipeline for the voice apps.
+
+Log calls on the event loop only put the record on a queue; a background
+QueueListener thread formats it and writes it to stdout, so a slow or
+blocked stdout never stalls audio handling. Messages use %-style arguments
+and are formatted in that thread, and only when the level is enabled.
+
+SessionLogger attaches `session` / `turn` ids to every record and samples
+high-rate events (interim transcripts, audio frames). LOG_FORMAT=json emits
+one JSON object per line for log shippers.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+FIELDS = ("session", "turn", "sampled")
+
+_listener: Optional[QueueListener] = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread and drops records when the queue is full
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats here, on the caller's thread. Deferring it means
+        # args must not be mutated after the call: pass strings/numbers, not live objects
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The existing human-readable format, with session/turn ids appended when present
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{name}={getattr(record, name)}" for name in FIELDS
+                          if getattr(record, name, None) is not None)
+        return f"{line} [{fields}]" if fields else line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                      max_queue: int = 10000) -> QueueListener:
+    """
+    Route the root logger through a bounded queue to a stdout writer thread (idempotent)
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(max_queue)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush what's queued on shutdown
+    return _listener
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """
+    Logger for one voice session: adds session/turn fields and samples high-rate events
+    """
+
+    def __init__(self, logger: logging.Logger, session_id: Optional[str] = None):
+        super().__init__(logger, {"session": session_id or uuid.uuid4().hex[:8], "turn": 0})
+        self._counters: Dict[str, itertools.count] = {}
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    @property
+    def session_id(self) -> str:
+        return self.extra["session"]
+
+    def next_turn(self) -> int:
+        self.extra["turn"] += 1
+        return self.extra["turn"]
+
+    def sampled(self, key: str, every: int, msg: str, *args, level: int = logging.INFO):
+        """
+        Log the 1st, (every+1)th, ... occurrence of `key`; the record carries `sampled=every`
+        """
+        if not self.isEnabledFor(level):
+            return
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = itertools.count()
+        if next(counter) % every == 0:
+            self.log(level, msg, *args, extra={"sampled": every})
@@ -4,6 +4,8 @@ Deepgram STT (streaming) + Groq LLM (ultra-fast) + Deepgram TTS
 """
 
 import asyncio
+import base64
+import time
 import logging
 import ssl
 import os
@@ -25,12 +27,15 @@ ssl._create_default_https_context = ssl._create_unverified_context
 
 from groq import AsyncGroq
 from typing import Optional
-from deepgram import (
-    DeepgramClient,
-    DeepgramClientOptions,
-    LiveTranscriptionEvents,
-    LiveOptions,
-)
+import aiohttp
+from providers import LLMProvider
+from answer_cache import PendingAnswer, answer_cache
+from conversation_memory import ConversationMemory
+from prompt_cache import prompt_cache
+from deepgram import LiveTranscriptionEvents
+from resilient_stt import ResilientLiveConnection
+from session_manager import session_manager
+from structured_logging import SessionLogger
 
 logger = logging.getLogger(__name__)
 
@@ -39,19 +44,21 @@ class VoicePipelineGroq:
     Real-time voice pipeline using Deepgram streaming + Groq for ultra-fast LLM
     """
     
-    def __init__(self, deepgram_api_key: str, groq_api_key: str, material_id: Optional[str] = None, model: str = "llama-3.3-70b-versatile"):
+    def __init__(self, deepgram_api_key: str, groq_api_key: str, material_id: Optional[str] = None, model: str = "llama-3.3-70b-versatile", llm: Optional[LLMProvider] = None, memory: Optional[ConversationMemory] = None, session_id: Optional[str] = None):
+        self.log = SessionLogger(logger, session_id)
         self.deepgram_api_key = deepgram_api_key
         self.groq_api_key = groq_api_key
         self.material_id = material_id
         self.model = model
         
-        self.deepgram_client = None
         self.dg_connection = None
         self.output_queue = asyncio.Queue()
         self.current_transcript = ""
-        self.loop = None  # Store event loop for callbacks
+        self.memory = memory if memory is not None else ConversationMemory()
+        self.tasks = set()  # Response/TTS tasks spawned from transcript events
         
-        # Initialize Groq client
+        # Initialize Groq client (or use a provided LLM, e.g. a failover router)
+        self.llm = llm
         self.groq_client = AsyncGroq(api_key=self.groq_api_key)
         
         logger.info(f"🎙️ Voice pipeline (GROQ) created for material: {material_id}, model: {model}")
@@ -61,39 +68,14 @@ class VoicePipelineGroq:
         Initialize Deepgram streaming connection
         """
         try:
-            # Store event loop for callbacks
-            self.loop = asyncio.get_running_loop()
-            
-            # Create Deepgram client
-            config = DeepgramClientOptions(
-                options={
-                    "keepalive": "true",
-                    "termination_exception_connect": "true",
-                    "termination_exception_exit": "true",
-                }
-            )
-            self.deepgram_client = DeepgramClient(self.deepgram_api_key, config)
-            
-            # Create live transcription connection
-            self.dg_connection = self.deepgram_client.listen.live.v("1")
+            # Pooled live connection (STANDARD_LIVE_OPTIONS) that reconnects and replays on blips
+            self.dg_connection = ResilientLiveConnection()
+            await self.dg_connection.start()
             
             # Set up event handlers
             self.dg_connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
             self.dg_connection.on(LiveTranscriptionEvents.Error, self._on_error)
             
-            # Start connection
-            options = LiveOptions(
-                model="nova-2",
-                language="en",
-                smart_format=True,
-                encoding="linear16",
-                sample_rate=48000,
-                channels=1,
-            )
-            
-            if self.dg_connection.start(options) is False:
-                raise Exception("Failed to start Deepgram connection")
-            
             logger.info("✅ Deepgram streaming connection established")
             logger.info(f"✅ Groq client initialized with model: {self.model}")
             return True
@@ -102,7 +84,7 @@ class VoicePipelineGroq:
             logger.error(f"❌ Failed to initialize: {e}", exc_info=True)
             raise
     
-    def _on_transcript(self, *args, **kwargs):
+    async def _on_transcript(self, *args, **kwargs):
         """
         Handle incoming transcripts from Deepgram
         """
@@ -118,48 +100,52 @@ class VoicePipelineGroq:
             
             is_final = result.is_final
             
-            logger.info(f"📝 Transcript ({'final' if is_final else 'interim'}): {sentence}")
+            if is_final:
+                self.log.next_turn()
+                self.log.info("📝 Transcript (final): %s", sentence)
+            else:
+                self.log.sampled("interim", 10, "📝 Transcript (interim): %s", sentence)
             
-            # Send transcript to client using run_coroutine_threadsafe
-            if self.loop:
-                asyncio.run_coroutine_threadsafe(
-                    self.output_queue.put({
-                        "type": "transcript",
-                        "data": {
-                            "text": sentence,
-                            "is_final": is_final
-                        }
-                    }),
-                    self.loop
-                )
+            await self.output_queue.put({
+                "type": "transcript",
+                "data": {
+                    "text": sentence,
+                    "is_final": is_final
+                }
+            })
             
             # If final transcript, generate AI response
             if is_final:
                 self.current_transcript = sentence
-                if self.loop:
-                    asyncio.run_coroutine_threadsafe(
-                        self._generate_and_stream_response(sentence),
-                        self.loop
-                    )
+                self._spawn(self._generate_and_stream_response(sentence))
                 
         except Exception as e:
             logger.error(f"❌ Error in _on_transcript: {e}", exc_info=True)
     
-    def _on_error(self, *args, **kwargs):
+    async def _on_error(self, *args, **kwargs):
         """
         Handle Deepgram errors
         """
         error = kwargs.get("error")
         logger.error(f"❌ Deepgram error: {error}")
     
+    def _spawn(self, coro):
+        """
+        Run a coroutine as a task, keeping a reference until it finishes
+        """
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+    
     async def process_audio_chunk(self, audio_bytes: bytes):
         """
         Send binary PCM audio directly to Deepgram streaming
         """
         try:
             if self.dg_connection:
-                self.dg_connection.send(audio_bytes)
-                logger.debug(f"📤 Sent {len(audio_bytes)} bytes to Deepgram")
+                await self.dg_connection.send(audio_bytes)
+                self.log.debug("📤 Sent %d bytes to Deepgram", len(audio_bytes))
             
         except Exception as e:
             logger.error(f"❌ Error sending audio to Deepgram: {e}")
@@ -183,52 +169,40 @@ class VoicePipelineGroq:
                 "data": "generating"
             })
             
-            # Build prompt with RAG context
-            context = await self._search_documents(transcript)
+            # Stable persona + material summary prefix, cached per material
+            prefix = await prompt_cache.get_prefix(self.material_id)
             
-            prompt = f"""You are an AI tutor helping students learn. 
-
-Context from learning materials:
-{context}
-
-Student said: {transcript}
-
-Provide a helpful, clear, and concise response. Be encouraging and educational. Keep it brief and conversational."""
+            # Repeated question about this material: replay the cached text + audio
+            cached = await answer_cache.lookup(self.material_id, prefix.version, transcript) if answer_cache else None
+            if cached:
+                started = time.perf_counter()
+                await self.output_queue.put({"type": "text", "data": cached.text})
+                for packet in cached.audio:
+                    await self.output_queue.put({"type": "audio", "data": packet})
+                await self.output_queue.put({"type": "status", "data": "complete"})
+                self.memory.add_turn(transcript, cached.text)
+                answer_cache.record_saved(cached, time.perf_counter() - started)
+                return
+            pending = PendingAnswer(transcript, prefix.version, brief=session_manager.shedding)
+            
+            prompt = prompt_cache.render_turn(transcript, history=self.memory.render(), brief=pending.brief)
+            prompt_cache.stats.record(prefix, prompt)
             
             # Generate response with Groq (streaming)
             full_text = ""
             
-            # Use Groq streaming API for ultra-fast response
-            stream = await self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an AI tutor. Be helpful, encouraging, and educational. Keep responses brief and conversational."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=500,
-                stream=True
-            )
-            
             # Stream text chunks as they arrive
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    text_chunk = chunk.choices[0].delta.content
-                    full_text += text_chunk
-                    
-                    # Send each chunk immediately
-                    await self.output_queue.put({
-                        "type": "text_chunk",
-                        "data": text_chunk
-                    })
+            async for text_chunk in self._stream_llm(prompt, prefix.text):
+                full_text += text_chunk
+                
+                # Send each chunk immediately
+                await self.output_queue.put({
+                    "type": "text_chunk",
+                    "data": text_chunk
+                })
             
             logger.info(f"💬 Full response: {full_text}")
+            self.memory.add_turn(transcript, full_text)
             
             # Send complete text
             await self.output_queue.put({
@@ -237,11 +211,7 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
             })
             
             # Generate TTS in background (non-blocking)
-            if self.loop:
-                asyncio.run_coroutine_threadsafe(
-                    self._generate_tts_background(full_text),
-                    self.loop
-                )
+            self._spawn(self._generate_tts_background(full_text, pending))
             
             await self.output_queue.put({
                 "type": "status",
@@ -255,7 +225,39 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
                 "data": str(e)
             })
     
-    async def _generate_tts_background(self, text: str):
+    async def _stream_llm(self, prompt: str, system: str):
+        """
+        Stream the response from the configured LLM provider, or Groq directly.
+        The system message is identical across turns so Groq can reuse the prefix.
+        """
+        if self.llm:
+            async for text_chunk in self.llm.stream(prompt, system=system):
+                yield text_chunk
+            return
+        
+        # Use Groq streaming API for ultra-fast response
+        stream = await self.groq_client.chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": system
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            model=self.model,
+            temperature=0.7,
+            max_tokens=150 if session_manager.shedding else 500,
+            stream=True
+        )
+        
+        async for chunk in stream:
+            if chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def _generate_tts_background(self, text: str, pending: Optional[PendingAnswer] = None):
         """
         Generate TTS in background and send when ready
         """
@@ -267,6 +269,9 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
                     "type": "audio",
                     "data": audio_data
                 })
+                if pending and answer_cache:
+                    await answer_cache.store(self.material_id, pending.version, pending.question, text,
+                                             [audio_data], time.perf_counter() - pending.started, pending.brief)
         except Exception as e:
             logger.error(f"❌ Background TTS error: {e}")
     
@@ -276,9 +281,6 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
         Returns base64-encoded audio
         """
         try:
-            import aiohttp
-            import base64
-            
             url = "https://api.deepgram.com/v1/speak?model=aura-asteria-en"
             
             headers = {
@@ -306,17 +308,6 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
             logger.error(f"❌ TTS error: {e}", exc_info=True)
             return None
     
-    async def _search_documents(self, query: str) -> str:
-        """
-        Search learning materials using RAG
-        TODO: Implement Pinecone vector search
-        """
-        if not self.material_id:
-            return "No specific learning material context available."
-        
-        # Placeholder - implement Pinecone search
-        return f"Learning material ID: {self.material_id} (RAG search not yet implemented)"
-    
     async def get_output_stream(self):
         """
         Generator that yields output messages
@@ -334,8 +325,10 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
         Clean up resources
         """
         try:
+            for task in self.tasks:
+                task.cancel()
             if self.dg_connection:
-                self.dg_connection.finish()
+                await self.dg_connection.finish()
                 logger.info("🧹 Deepgram connection closed")
         except Exception as e:
             logger.error(f"❌ Cleanup error: {e}")
@@ -11,12 +11,8 @@ import ssl
 import aiohttp
 import google.generativeai as genai
 from typing import Optional
-from deepgram import (
-    DeepgramClient,
-    DeepgramClientOptions,
-    LiveTranscriptionEvents,
-    LiveOptions,
-)
+from deepgram import LiveTranscriptionEvents
+from resilient_stt import ResilientLiveConnection
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +28,11 @@ class VoicePipelineREST:
         self.material_id = material_id
         
         # State
-        self.audio_buffer = bytearray()
+        self.dg_connection = None
+        self.audio_buffer = bytearray()  # Only used if the live connection is down (REST fallback)
         self.is_processing = False
         self.output_queue = asyncio.Queue()
+        self.tasks = set()
         
         # Initialize Gemini
         genai.configure(api_key=self.gemini_api_key)
@@ -46,30 +44,14 @@ class VoicePipelineREST:
         """
         Initialize Deepgram streaming connection
         """
-        # Create Deepgram client
-        config = DeepgramClientOptions(options={"keepalive": "true"})
-        self.deepgram_client = DeepgramClient(self.deepgram_api_key, config)
-        
-        # Create live transcription connection
-        self.dg_connection = self.deepgram_client.listen.live.v("1")
+        # Pooled live connection (STANDARD_LIVE_OPTIONS) that reconnects and replays on blips
+        self.dg_connection = ResilientLiveConnection()
+        await self.dg_connection.start()
         
         # Set up event handlers
         self.dg_connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
         self.dg_connection.on(LiveTranscriptionEvents.Error, self._on_error)
         
-        # Start connection
-        options = LiveOptions(
-            model="nova-2",
-            language="en",
-            smart_format=True,
-            encoding="linear16",
-            sample_rate=48000,
-            channels=1,
-        )
-        
-        if self.dg_connection.start(options) is False:
-            raise Exception("Failed to start Deepgram connection")
-        
         logger.info("✅ Deepgram streaming connection established")
         return True
     
@@ -78,46 +60,90 @@ class VoicePipelineREST:
         Send binary PCM audio directly to Deepgram streaming
         """
         try:
-            # Send binary PCM data directly to Deepgram
-            self.dg_connection.send(audio_bytes)
-            logger.debug(f"📤 Sent {len(audio_bytes)} bytes to Deepgram")
+            # Send binary PCM data directly to Deepgram; keep it for REST if the socket is gone
+            if self.dg_connection is None or await self.dg_connection.send(audio_bytes) is False:
+                self.audio_buffer.extend(audio_bytes)
+                return
+            logger.debug("📤 Sent %d bytes to Deepgram", len(audio_bytes))
             
         except Exception as e:
             logger.error(f"❌ Error sending audio to Deepgram: {e}")
+            self.audio_buffer.extend(audio_bytes)
+    
+    async def _on_transcript(self, *args, **kwargs):
+        """
+        Handle incoming transcripts from Deepgram
+        """
+        result = kwargs.get("result")
+        if not result:
+            return
+        
+        transcript = result.channel.alternatives[0].transcript
+        if not transcript:
+            return
+        
+        await self.output_queue.put({
+            "type": "transcript",
+            "data": {
+                "text": transcript,
+                "is_final": result.is_final
+            }
+        })
+        
+        if result.is_final and not self.is_processing:
+            task = asyncio.create_task(self._respond(transcript))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+    
+    async def _on_error(self, *args, **kwargs):
+        """
+        Handle Deepgram errors
+        """
+        error = kwargs.get("error")
+        if error is not None:
+            logger.error(f"❌ Deepgram error: {error}")
     
     async def finalize_audio(self):
         """
-        Process accumulated audio when user stops speaking
+        Process accumulated audio when user stops speaking (REST fallback)
         """
-        if self.is_processing:
         if self.is_processing or len(self.audio_buffer) == 0:
             return
         
-        self.is_processing = True
-        
         try:
             logger.info(f"🎙️ Processing {len(self.audio_buffer)} bytes of audio")
             
             # Step 1: Transcribe with Deepgram
             transcript = await self._transcribe_audio(bytes(self.audio_buffer))
-            
-            if not transcript or len(transcript.strip()) == 0:
-                logger.warning("⚠️ No transcript received")
-                self.audio_buffer.clear()
-                self.is_processing = False
-                return
-            
-            logger.info(f"📝 Transcript: {transcript}")
-            
-            # Send transcript to client
-            await self.output_queue.put({
-                "type": "transcript",
-                "data": {
-                    "text": transcript,
-                    "is_final": True
-                }
-            })
-            
+        finally:
+            self.audio_buffer.clear()
+        
+        if not transcript or len(transcript.strip()) == 0:
+            logger.warning("⚠️ No transcript received")
+            return
+        
+        logger.info(f"📝 Transcript: {transcript}")
+        
+        # Send transcript to client
+        await self.output_queue.put({
+            "type": "transcript",
+            "data": {
+                "text": transcript,
+                "is_final": True
+            }
+        })
+        await self._respond(transcript)
+    
+    async def _respond(self, transcript: str):
+        """
+        Generate and stream the answer for one transcript
+        """
+        if self.is_processing:
+            return
+        
+        self.is_processing = True
+        
+        try:
             # Step 2: Generate and stream response (Gemini + Deepgram TTS)
             await self.output_queue.put({
                 "type": "status",
@@ -134,13 +160,12 @@ class VoicePipelineREST:
             })
             
         except Exception as e:
-            logger.error(f"❌ Error in finalize_audio: {e}", exc_info=True)
+            logger.error(f"❌ Error generating response: {e}", exc_info=True)
             await self.output_queue.put({
                 "type": "error",
                 "data": str(e)
             })
         finally:
-            self.audio_buffer.clear()
             self.is_processing = False
     
     async def _transcribe_audio(self, audio_bytes: bytes) -> str:
@@ -194,7 +219,8 @@ class VoicePipelineREST:
                             return ""
                         
                         result = await response.json()
-                        logger.info(f"📊 Full Deepgram response: {json.dumps(result, indent=2)}")
+                        # Formatted by the log thread, and only when DEBUG is on
+                        logger.debug("📊 Full Deepgram response: %s", result)
                         
                         # Extract transcript
                         transcript = result.get("results", {}).get("channels", [{}])[0].get("alternatives", [{}])[0].get("transcript", "")
@@ -426,5 +452,10 @@ Keep your response concise (2-3 sentences) and helpful."""
     
     async def cleanup(self):
         """Cleanup resources"""
+        for task in self.tasks:
+            task.cancel()
+        if self.dg_connection:
+            await self.dg_connection.finish()
+            self.dg_connection = None
         self.audio_buffer.clear()
         logger.info("✅ Pipeline cleanup complete")
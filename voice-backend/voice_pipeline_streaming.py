@@ -4,6 +4,8 @@ Deepgram STT (streaming) + Gemini LLM + Deepgram TTS
 """
 
 import asyncio
+import base64
+import time
 import logging
 import ssl
 import os
@@ -25,12 +27,15 @@ ssl._create_default_https_context = ssl._create_unverified_context
 
 import google.generativeai as genai
 from typing import Optional
-from deepgram import (
-    DeepgramClient,
-    DeepgramClientOptions,
-    LiveTranscriptionEvents,
-    LiveOptions,
-)
+import aiohttp
+from providers import LLMProvider
+from answer_cache import PendingAnswer, answer_cache
+from conversation_memory import ConversationMemory
+from prompt_cache import prompt_cache
+from deepgram import LiveTranscriptionEvents
+from resilient_stt import ResilientLiveConnection
+from session_manager import session_manager
+from structured_logging import SessionLogger
 
 logger = logging.getLogger(__name__)
 
@@ -39,20 +44,25 @@ class VoicePipelineStreaming:
     Real-time voice pipeline using Deepgram streaming WebSocket
     """
     
-    def __init__(self, deepgram_api_key: str, gemini_api_key: str, material_id: Optional[str] = None):
+    def __init__(self, deepgram_api_key: str, gemini_api_key: str, material_id: Optional[str] = None, llm: Optional[LLMProvider] = None, memory: Optional[ConversationMemory] = None, session_id: Optional[str] = None):
+        self.log = SessionLogger(logger, session_id)
         self.deepgram_api_key = deepgram_api_key
         self.gemini_api_key = gemini_api_key
         self.material_id = material_id
         
-        self.deepgram_client = None
         self.dg_connection = None
         self.output_queue = asyncio.Queue()
         self.current_transcript = ""
-        self.loop = None  # Store event loop for callbacks
+        self.memory = memory if memory is not None else ConversationMemory()
+        self.tasks = set()  # Response/TTS tasks spawned from transcript events
+        
+        # Optional LLM provider (e.g. a failover router) used instead of Gemini directly
+        self.llm = llm
         
         # Initialize Gemini
         genai.configure(api_key=self.gemini_api_key)
-        self.gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.gemini_model_name = 'gemini-2.0-flash-exp'
+        self.gemini_model = genai.GenerativeModel(self.gemini_model_name)
         
         logger.info(f"🎙️ Voice pipeline (STREAMING) created for material: {material_id}")
     
@@ -61,39 +71,14 @@ class VoicePipelineStreaming:
         Initialize Deepgram streaming connection
         """
         try:
-            # Store event loop for callbacks
-            self.loop = asyncio.get_running_loop()
-            
-            # Create Deepgram client
-            config = DeepgramClientOptions(
-                options={
-                    "keepalive": "true",
-                    "termination_exception_connect": "true",
-                    "termination_exception_exit": "true",
-                }
-            )
-            self.deepgram_client = DeepgramClient(self.deepgram_api_key, config)
-            
-            # Create live transcription connection
-            self.dg_connection = self.deepgram_client.listen.live.v("1")
+            # Pooled live connection (STANDARD_LIVE_OPTIONS) that reconnects and replays on blips
+            self.dg_connection = ResilientLiveConnection()
+            await self.dg_connection.start()
             
             # Set up event handlers
             self.dg_connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
             self.dg_connection.on(LiveTranscriptionEvents.Error, self._on_error)
             
-            # Start connection
-            options = LiveOptions(
-                model="nova-2",
-                language="en",
-                smart_format=True,
-                encoding="linear16",
-                sample_rate=48000,
-                channels=1,
-            )
-            
-            if self.dg_connection.start(options) is False:
-                raise Exception("Failed to start Deepgram connection")
-            
             logger.info("✅ Deepgram streaming connection established")
             return True
             
@@ -101,7 +86,7 @@ class VoicePipelineStreaming:
             logger.error(f"❌ Failed to initialize Deepgram: {e}", exc_info=True)
             raise
     
-    def _on_transcript(self, *args, **kwargs):
+    async def _on_transcript(self, *args, **kwargs):
         """
         Handle incoming transcripts from Deepgram
         """
@@ -117,48 +102,52 @@ class VoicePipelineStreaming:
             
             is_final = result.is_final
             
-            logger.info(f"📝 Transcript ({'final' if is_final else 'interim'}): {sentence}")
+            if is_final:
+                self.log.next_turn()
+                self.log.info("📝 Transcript (final): %s", sentence)
+            else:
+                self.log.sampled("interim", 10, "📝 Transcript (interim): %s", sentence)
             
-            # Send transcript to client using run_coroutine_threadsafe
-            if self.loop:
-                asyncio.run_coroutine_threadsafe(
-                    self.output_queue.put({
-                        "type": "transcript",
-                        "data": {
-                            "text": sentence,
-                            "is_final": is_final
-                        }
-                    }),
-                    self.loop
-                )
+            await self.output_queue.put({
+                "type": "transcript",
+                "data": {
+                    "text": sentence,
+                    "is_final": is_final
+                }
+            })
             
             # If final transcript, generate AI response
             if is_final:
                 self.current_transcript = sentence
-                if self.loop:
-                    asyncio.run_coroutine_threadsafe(
-                        self._generate_and_stream_response(sentence),
-                        self.loop
-                    )
+                self._spawn(self._generate_and_stream_response(sentence))
                 
         except Exception as e:
             logger.error(f"❌ Error in _on_transcript: {e}", exc_info=True)
     
-    def _on_error(self, *args, **kwargs):
+    async def _on_error(self, *args, **kwargs):
         """
         Handle Deepgram errors
         """
         error = kwargs.get("error")
         logger.error(f"❌ Deepgram error: {error}")
     
+    def _spawn(self, coro):
+        """
+        Run a coroutine as a task, keeping a reference until it finishes
+        """
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+    
     async def process_audio_chunk(self, audio_bytes: bytes):
         """
         Send binary PCM audio directly to Deepgram streaming
         """
         try:
             if self.dg_connection:
-                self.dg_connection.send(audio_bytes)
-                logger.debug(f"📤 Sent {len(audio_bytes)} bytes to Deepgram")
+                await self.dg_connection.send(audio_bytes)
+                self.log.debug("📤 Sent %d bytes to Deepgram", len(audio_bytes))
             
         except Exception as e:
             logger.error(f"❌ Error sending audio to Deepgram: {e}")
@@ -182,23 +171,35 @@ class VoicePipelineStreaming:
                 "data": "generating"
             })
             
-            # Build prompt with RAG context
-            context = await self._search_documents(transcript)
+            # Material summary lives in the cached per-material prefix, fetched once
+            prefix = await prompt_cache.get_prefix(self.material_id)
+            
+            # Repeated question about this material: replay the cached text + audio
+            cached = await answer_cache.lookup(self.material_id, prefix.version, transcript) if answer_cache else None
+            if cached:
+                started = time.perf_counter()
+                await self.output_queue.put({"type": "text", "data": cached.text})
+                for packet in cached.audio:
+                    await self.output_queue.put({"type": "audio", "data": packet})
+                await self.output_queue.put({"type": "status", "data": "complete"})
+                self.memory.add_turn(transcript, cached.text)
+                answer_cache.record_saved(cached, time.perf_counter() - started)
+                return
+            pending = PendingAnswer(transcript, prefix.version, brief=session_manager.shedding)
             
-            prompt = f"""You are an AI tutor helping students learn. 
-
-Context from learning materials:
-{context}
-
-Student said: {transcript}
-
-Provide a helpful, clear, and concise response. Be encouraging and educational. Keep it brief and conversational."""
+            prompt = prompt_cache.render_turn(transcript, history=self.memory.render(), brief=pending.brief)
             
             # Generate full response
-            response = await self.gemini_model.generate_content_async(prompt)
-            full_text = response.text
+            if self.llm:
+                prompt_cache.stats.record(prefix, prompt)
+                full_text = "".join([chunk async for chunk in self.llm.stream(prompt, system=prefix.text)])
+            else:
+                prompt_cache.stats.record(prefix, prompt)
+                response = await self.gemini_model.generate_content_async(prompt_cache.join(prefix, prompt))
+                full_text = response.text
             
             logger.info(f"💬 Full response: {full_text}")
+            self.memory.add_turn(transcript, full_text)
             
             # Send text IMMEDIATELY (don't wait for TTS)
             await self.output_queue.put({
@@ -207,11 +208,7 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
             })
             
             # Generate TTS in background (non-blocking)
-            if self.loop:
-                asyncio.run_coroutine_threadsafe(
-                    self._generate_tts_background(full_text),
-                    self.loop
-                )
+            self._spawn(self._generate_tts_background(full_text, pending))
             
             await self.output_queue.put({
                 "type": "status",
@@ -225,7 +222,7 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
                 "data": str(e)
             })
     
-    async def _generate_tts_background(self, text: str):
+    async def _generate_tts_background(self, text: str, pending: Optional[PendingAnswer] = None):
         """
         Generate TTS in background and send when ready
         """
@@ -237,6 +234,9 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
                     "type": "audio",
                     "data": audio_data
                 })
+                if pending and answer_cache:
+                    await answer_cache.store(self.material_id, pending.version, pending.question, text,
+                                             [audio_data], time.perf_counter() - pending.started, pending.brief)
         except Exception as e:
             logger.error(f"❌ Background TTS error: {e}")
     
@@ -246,9 +246,6 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
         Returns base64-encoded audio
         """
         try:
-            import aiohttp
-            import base64
-            
             logger.info(f"🔊 Converting to speech: {text[:50]}...")
             
             url = "https://api.deepgram.com/v1/speak?model=aura-asteria-en"
@@ -274,43 +271,6 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
             logger.error(f"❌ TTS error: {e}", exc_info=True)
             return ""
     
-    async def _search_documents(self, query: str) -> str:
-        """
-        Search for relevant document content (RAG)
-        """
-        if not self.material_id:
-            return ""
-        
-        try:
-            import aiohttp
-            
-            logger.info(f"🔍 Searching documents for: {query}")
-            
-            # Fetch material content from your API
-            api_url = f"http://localhost:3000/api/materials/{self.material_id}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url) as response:
-                    if response.status != 200:
-                        logger.warning(f"⚠️ Material fetch failed: {response.status}")
-                        return ""
-                    
-                    data = await response.json()
-                    content = data.get('content', '')
-                    
-                    if content:
-                        # Return first 2000 chars as context
-                        context = content[:2000]
-                        logger.info(f"✅ Retrieved {len(context)} chars of material content")
-                        return context
-                    else:
-                        logger.warning("⚠️ Material content is empty")
-                        return ""
-            
-        except Exception as e:
-            logger.error(f"❌ Document search error: {e}")
-            return ""
-    
     async def get_output_stream(self):
         """
         Async generator for output messages
@@ -324,8 +284,10 @@ Provide a helpful, clear, and concise response. Be encouraging and educational.
         Clean up resources
         """
         try:
+            for task in self.tasks:
+                task.cancel()
             if self.dg_connection:
-                self.dg_connection.finish()
+                await self.dg_connection.finish()
                 logger.info("✅ Deepgram connection closed")
             
             logger.info("✅ Pipeline cleanup complete")